@@ -0,0 +1,167 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# --- Configuração do Registro de Ações ---
+# Status e contatos registrados no Painel de Alertas ficam em disco e valem para todos os operadores.
+ACOES_PADRAO = "acoes_atendimento.sqlite"
+GRAVAR_A_CADA = 50 # Registros pendentes acumulados antes de gravar sozinho
+
+STATUS_ABERTO = 'Aberto'
+STATUS_EM_TRATATIVA = 'Em Tratativa'
+STATUS_CONCLUIDO = 'Concluído'
+STATUS_ACOES = [STATUS_ABERTO, STATUS_EM_TRATATIVA, STATUS_CONCLUIDO]
+
+
+def chave_cliente(cliente_id):
+    """IDs gravados sempre como texto (mesma conversão de 'Series.astype(str)' usada no índice de filtros)."""
+    return str(cliente_id)
+
+
+class RegistroAcoes:
+    """
+    Registro persistente (SQLite em WAL) das ações dos operadores.
+
+    - status_atual: o status corrente de cada cliente (chave primária = ID Cliente).
+    - log_contato: histórico só de inserção com cada contato registrado.
+    Gravações entram num buffer e vão para o disco numa única transação ('gravar').
+    Toda transação incrementa a versão do banco; as leituras ficam em memória até a versão mudar
+    (inclusive por gravações de outros processos/operadores).
+    """
+
+    def __init__(self, caminho=ACOES_PADRAO, gravar_a_cada=GRAVAR_A_CADA):
+        self.caminho = caminho
+        self.gravar_a_cada = gravar_a_cada
+        self.pendentes_status = {}
+        self.pendentes_log = []
+        self.cache = {} # nome -> (versão, valor)
+        self.lock = threading.RLock()
+        # Uma conexão por processo, compartilhada pelas sessões do Streamlit (protegida pelo lock)
+        self.conexao = sqlite3.connect(caminho, timeout=30, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS status_atual (
+                cliente_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                atualizado_em TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS log_contato (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cliente_id TEXT NOT NULL,
+                registrado_em TEXT NOT NULL,
+                novo_status TEXT,
+                contato_op1 TEXT,
+                contato_op2 TEXT,
+                meio TEXT,
+                observacoes TEXT
+            );
+            CREATE INDEX IF NOT EXISTS log_contato_cliente ON log_contato (cliente_id);
+            CREATE INDEX IF NOT EXISTS status_atual_status ON status_atual (status);
+            CREATE TABLE IF NOT EXISTS versao (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                numero INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO versao (id, numero) VALUES (1, 0);
+            """
+        )
+        self.conexao.commit()
+
+    # ---- Escrita (em lote) ----
+    def registrar_status(self, cliente_id, status):
+        with self.lock:
+            self.pendentes_status[chave_cliente(cliente_id)] = (status, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            self.gravar_se_cheio()
+
+    def registrar_contato(self, cliente_id, novo_status, contato_op1="", contato_op2="", meio=(), observacoes=""):
+        """Anexa o contato ao histórico e atualiza o status do cliente."""
+        agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        chave = chave_cliente(cliente_id)
+        with self.lock:
+            self.pendentes_log.append(
+                (chave, agora, novo_status, contato_op1, contato_op2, json.dumps(list(meio), ensure_ascii=False), observacoes)
+            )
+            self.pendentes_status[chave] = (novo_status, agora)
+            self.gravar_se_cheio()
+
+    def gravar_se_cheio(self):
+        if len(self.pendentes_status) + len(self.pendentes_log) >= self.gravar_a_cada:
+            self.gravar()
+
+    def gravar(self):
+        """Grava tudo que está pendente numa única transação (e incrementa a versão)."""
+        with self.lock:
+            if not self.pendentes_status and not self.pendentes_log:
+                return
+            with self.conexao:
+                self.conexao.executemany(
+                    "INSERT INTO log_contato (cliente_id, registrado_em, novo_status, contato_op1, contato_op2, meio, observacoes) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self.pendentes_log
+                )
+                self.conexao.executemany(
+                    "INSERT OR REPLACE INTO status_atual (cliente_id, status, atualizado_em) VALUES (?, ?, ?)",
+                    [(chave, status, quando) for chave, (status, quando) in self.pendentes_status.items()]
+                )
+                self.conexao.execute("UPDATE versao SET numero = numero + 1 WHERE id = 1")
+            self.pendentes_status.clear()
+            self.pendentes_log.clear()
+
+    # ---- Leitura (em cache por versão) ----
+    def versao(self):
+        with self.lock:
+            return self.conexao.execute("SELECT numero FROM versao WHERE id = 1").fetchone()[0]
+
+    def em_cache(self, nome, carregar):
+        """Valor guardado em memória enquanto a versão do banco não mudar."""
+        versao = self.versao()
+        with self.lock:
+            guardado = self.cache.get(nome)
+            if guardado is not None and guardado[0] == versao:
+                return guardado[1]
+            valor = carregar()
+            self.cache[nome] = (versao, valor)
+            return valor
+
+    def status_por_cliente(self):
+        """Series ID Cliente (texto) -> status atual."""
+        def carregar():
+            linhas = self.conexao.execute("SELECT cliente_id, status FROM status_atual").fetchall()
+            return pd.Series(dict(linhas), dtype=object)
+        return self.em_cache('status_por_cliente', carregar)
+
+    def clientes_com_status(self, status):
+        """IDs (texto) com o status atual informado, pelo índice de 'status'."""
+        def carregar():
+            linhas = self.conexao.execute("SELECT cliente_id FROM status_atual WHERE status = ?", (status,)).fetchall()
+            return np.array([linha[0] for linha in linhas], dtype=object)
+        return self.em_cache(f'clientes_{status}', carregar)
+
+    def status(self, cliente_id):
+        return self.status_por_cliente().get(chave_cliente(cliente_id), STATUS_ABERTO)
+
+    def historico(self, cliente_id):
+        """Contatos registrados para o cliente, do mais recente para o mais antigo."""
+        with self.lock:
+            linhas = self.conexao.execute(
+                "SELECT registrado_em, novo_status, contato_op1, contato_op2, meio, observacoes "
+                "FROM log_contato WHERE cliente_id = ? ORDER BY id DESC",
+                (chave_cliente(cliente_id),)
+            ).fetchall()
+        return [
+            {"timestamp": r[0], "novo_status": r[1], "contato_op1": r[2], "contato_op2": r[3],
+             "meio": json.loads(r[4] or "[]"), "observacoes": r[5]}
+            for r in linhas
+        ]
+
+    def fechar(self):
+        self.gravar()
+        self.conexao.close()
+
+
+# Instância única por processo do Streamlit (como 'dados.REGISTRO')
+REGISTRO = RegistroAcoes()
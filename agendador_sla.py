@@ -0,0 +1,285 @@
+import heapq
+import itertools
+import json
+import threading
+import urllib.request
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import acoes
+import config
+import dados
+import monitor_pasta
+from ao_vivo import EPOCA, agora_epoch, para_epoch
+
+# --- Configuração do Agendador de SLA ---
+# Cada chamado aberto entra num heap pelo instante da próxima transição (entrada no alerta, estouro).
+# A thread dorme até a transição mais próxima: nada é varrido periodicamente.
+# Um único agendamento para o processo: a versão publicada pela pasta monitorada ou, enquanto a pasta
+# não publicou nada (só upload manual/mesclagem), a última planilha carregada. O heap é remontado
+# quando esse dataset muda, não a cada rerun das páginas.
+EVENTO_ALERTA = "entrou_em_alerta"
+EVENTO_ESTOURO = "estourou"
+EVENTOS_SLA_ARQUIVO = "eventos_sla.jsonl"
+WEBHOOK_SLA_URL = None      # Ex.: "http://127.0.0.1:8765/sla" (None = desligado)
+WEBHOOK_TIMEOUT_SEGUNDOS = 5
+TOAST_MAX_EVENTOS = 200     # Eventos guardados em memória para os avisos nas páginas
+ESPERA_MAXIMA_SEGUNDOS = 3600 # Acorda ao menos de hora em hora (relógio do sistema ajustado, etc.)
+
+
+# ---- Destinos dos eventos ----
+class DestinoJsonl:
+    """Uma linha JSON por evento, só acrescentando no arquivo."""
+
+    def __init__(self, caminho=EVENTOS_SLA_ARQUIVO):
+        self.caminho = caminho
+        self.lock = threading.Lock()
+
+    def enviar(self, evento):
+        with self.lock, open(self.caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write(json.dumps(evento, ensure_ascii=False) + "\n")
+
+
+class DestinoWebhook:
+    """POST do evento em JSON para um endpoint local. Falhas são contadas e não interrompem o agendador."""
+
+    def __init__(self, url, timeout=WEBHOOK_TIMEOUT_SEGUNDOS):
+        self.url = url
+        self.timeout = timeout
+        self.falhas = 0
+
+    def enviar(self, evento):
+        requisicao = urllib.request.Request(
+            self.url, data=json.dumps(evento, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(requisicao, timeout=self.timeout):
+                pass
+        except OSError:
+            self.falhas += 1
+
+
+class DestinoToast:
+    """Últimos eventos em memória, numerados, para cada sessão mostrar só os que ainda não viu."""
+
+    def __init__(self, max_eventos=TOAST_MAX_EVENTOS):
+        self.eventos = deque(maxlen=max_eventos)
+        self.sequencia = 0
+        self.lock = threading.Lock()
+
+    def enviar(self, evento):
+        with self.lock:
+            self.sequencia += 1
+            self.eventos.append((self.sequencia, evento))
+
+    def ultima_sequencia(self):
+        with self.lock:
+            return self.sequencia
+
+    def novos_desde(self, sequencia):
+        """Eventos com número maior que `sequencia` e o número do último."""
+        with self.lock:
+            return [evento for numero, evento in self.eventos if numero > sequencia], self.sequencia
+
+
+def destinos_padrao():
+    destinos = [DestinoJsonl(), DestinoToast()]
+    if WEBHOOK_SLA_URL:
+        destinos.append(DestinoWebhook(WEBHOOK_SLA_URL))
+    return destinos
+
+def como_data(epoch):
+    return (EPOCA + pd.Timedelta(seconds=float(epoch))).isoformat(timespec="seconds")
+
+
+class AgendadorSla:
+    """
+    Transições de SLA dos chamados abertos de um dataset, em ordem de prazo.
+
+    - O heap guarda (instante, desempate, tipo, posição da linha). Carregar um dataset monta o heap
+      de uma vez (heapify, O(n)) só com as transições ainda por vir.
+    - A thread espera numa Condition até o topo do heap vencer (ou até um dataset novo chegar);
+      então tira só as transições vencidas e envia um evento para cada destino.
+    - Chamados marcados como 'Concluído' no registro de ações não geram eventos.
+    """
+
+    def __init__(self, destinos=None, registro=dados.REGISTRO):
+        self.destinos = destinos if destinos is not None else destinos_padrao()
+        self.registro = registro
+        self.condicao = threading.Condition()
+        self.heap = []
+        self.chave = None
+        self.chamados = None # Colunas dos chamados do dataset atual, para montar os eventos
+        self.desempate = itertools.count()
+        self.thread = None
+        self.parar = False
+        self.enviados = 0
+
+    def toast(self):
+        for destino in self.destinos:
+            if isinstance(destino, DestinoToast):
+                return destino
+        return None
+
+    # ---- Dataset acompanhado ----
+    def acompanhar(self, chave):
+        """Passa a agendar o dataset da chave (não faz nada se já for o atual) e inicia a thread."""
+        self.iniciar()
+        if chave is None or chave == self.chave:
+            return
+        df = self.registro.obter(chave)
+        if df is None:
+            return
+        self.carregar(df, chave)
+
+    def carregar(self, df, chave=None, agora=None):
+        """Monta o heap com as próximas transições dos chamados abertos de `df`."""
+        agora = agora_epoch() if agora is None else agora
+        if config.COLUNA_STATUS in df.columns:
+            df = df[df[config.COLUNA_STATUS].isin(config.STATUS_ABERTOS).to_numpy()]
+        if config.COLUNA_ABERTURA in df.columns:
+            aberturas = df[config.COLUNA_ABERTURA]
+        else:
+            aberturas = pd.Series(pd.NaT, index=df.index)
+        assuntos = df[config.COLUNA_ASSUNTO] if config.COLUNA_ASSUNTO in df.columns else None
+        df_sla = config.calcular_sla(assuntos, aberturas)
+        inicio_alerta = para_epoch(df_sla['SLA_Inicio_Alerta'])
+        prazo = para_epoch(df_sla['SLA_Prazo'])
+
+        # Só transições futuras (vazios são NaN e ficam de fora na comparação)
+        posicoes_alerta = np.flatnonzero(inicio_alerta > agora)
+        posicoes_prazo = np.flatnonzero(prazo > agora)
+        heap = [(instante, next(self.desempate), EVENTO_ALERTA, p)
+                for instante, p in zip(inicio_alerta[posicoes_alerta].tolist(), posicoes_alerta.tolist())]
+        heap += [(instante, next(self.desempate), EVENTO_ESTOURO, p)
+                 for instante, p in zip(prazo[posicoes_prazo].tolist(), posicoes_prazo.tolist())]
+        heapq.heapify(heap)
+
+        colunas = [config.COLUNA_ID_CLIENTE, config.COLUNA_NOME_CLIENTE, config.COLUNA_ASSUNTO,
+                   config.COLUNA_TECNICO, config.COLUNA_CIDADE]
+        chamados = {col: df[col].to_numpy(dtype=object) for col in colunas if col in df.columns}
+        chamados['prazo'] = prazo
+
+        with self.condicao:
+            self.heap = heap
+            self.chamados = chamados
+            self.chave = chave
+            self.condicao.notify()
+
+    def proxima_transicao(self):
+        """(instante epoch, tipo) da próxima transição agendada, ou None."""
+        with self.condicao:
+            if not self.heap:
+                return None
+            instante, _, tipo, _ = self.heap[0]
+            return instante, tipo
+
+    def pendentes(self):
+        with self.condicao:
+            return len(self.heap)
+
+    # ---- Thread ----
+    def iniciar(self):
+        with self.condicao:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.parar = False
+            self.thread = threading.Thread(target=self.executar, name="agendador-sla", daemon=True)
+            self.thread.start()
+
+    def encerrar(self):
+        with self.condicao:
+            self.parar = True
+            self.condicao.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+    def executar(self):
+        while True:
+            with self.condicao:
+                if self.parar:
+                    return
+                espera = ESPERA_MAXIMA_SEGUNDOS
+                if self.heap:
+                    espera = min(max(self.heap[0][0] - agora_epoch(), 0), ESPERA_MAXIMA_SEGUNDOS)
+                if espera > 0:
+                    self.condicao.wait(espera)
+                    continue
+                vencidos = self.retirar_vencidos(agora_epoch())
+                chamados = self.chamados
+            for instante, tipo, posicao in vencidos:
+                self.emitir(tipo, instante, posicao, chamados)
+
+    def retirar_vencidos(self, agora):
+        """Tira do heap as transições com instante <= agora (chamar com a condição travada)."""
+        vencidos = []
+        while self.heap and self.heap[0][0] <= agora:
+            instante, _, tipo, posicao = heapq.heappop(self.heap)
+            vencidos.append((instante, tipo, posicao))
+        return vencidos
+
+    def evento(self, tipo, instante, posicao, chamados):
+        evento = {
+            "tipo": tipo,
+            "instante": como_data(instante),
+            "prazo": como_data(chamados['prazo'][posicao]),
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        }
+        for col, valores in chamados.items():
+            if col != 'prazo':
+                valor = valores[posicao]
+                evento[col] = None if pd.isna(valor) else (valor.item() if hasattr(valor, 'item') else valor)
+        return evento
+
+    def emitir(self, tipo, instante, posicao, chamados):
+        cliente_id = chamados.get(config.COLUNA_ID_CLIENTE)
+        if cliente_id is not None and acoes.REGISTRO.status(cliente_id[posicao]) == acoes.STATUS_CONCLUIDO:
+            return
+        evento = self.evento(tipo, instante, posicao, chamados)
+        for destino in self.destinos:
+            try:
+                destino.enviar(evento)
+            except Exception: # Um destino com problema não impede os outros
+                pass
+        self.enviados += 1
+
+
+# Instância única por processo do Streamlit (como 'dados.REGISTRO')
+AGENDADOR = AgendadorSla()
+
+
+def acompanhar_publicacoes(agendador=AGENDADOR, monitor=monitor_pasta.MONITOR, registro=dados.REGISTRO):
+    """
+    Inicia o agendador e passa a agendar cada versão que o monitor publicar (e a atual, se já houver).
+    Sem versão publicada, agenda a última planilha carregada ou mesclada no registro.
+    """
+    agendador.iniciar()
+    monitor.assinar(lambda versao: agendador.acompanhar(versao.chave))
+
+    def carregada(chave):
+        if monitor.publicada() is None:
+            agendador.acompanhar(chave)
+    registro.assinar(carregada)
+
+def origem_agendada(monitor=monitor_pasta.MONITOR):
+    """Texto curto de onde vêm os chamados agendados (para as páginas), ou None se nada está agendado."""
+    if AGENDADOR.chave is None:
+        return None
+    return "versão publicada pela pasta" if monitor.publicada() is not None else "última planilha carregada"
+
+# Começa ao importar o módulo (qualquer página), antes de alguém abrir o Painel de Alertas
+acompanhar_publicacoes()
+
+def avisos_novos(estado, chave_estado='sla_avisos_vistos'):
+    """Eventos de SLA ainda não mostrados nesta sessão (a sessão começa a partir dos eventos atuais)."""
+    toast = AGENDADOR.toast()
+    if toast is None:
+        return []
+    if chave_estado not in estado:
+        estado[chave_estado] = toast.ultima_sequencia()
+    novos, estado[chave_estado] = toast.novos_desde(estado[chave_estado])
+    return novos
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+import config
+
+# --- Atualização ao vivo dos tempos ---
+INTERVALO_AO_VIVO_PADRAO = 30 # segundos
+
+EPOCA = pd.Timestamp(0)
+
+
+def para_epoch(valores):
+    """Datas (naive, horário local como no Excel) -> segundos desde 1970. NaT vira NaN."""
+    datas = pd.to_datetime(pd.Series(valores), errors='coerce')
+    return (datas - EPOCA).dt.total_seconds().to_numpy(dtype=float, na_value=np.nan)
+
+def agora_epoch():
+    """'Agora' na mesma referência de 'para_epoch' (horário local naive, como pd.Timestamp.now())."""
+    return (pd.Timestamp.now() - EPOCA).total_seconds()
+
+
+class TemposAoVivo:
+    """
+    Tempos dos chamados guardados como arrays epoch, para atualizar os cronômetros sem refazer a página.
+
+    - Contagens (estourados, em alerta, faixas de tempo aberto) saem de buscas binárias nos instantes
+      de transição ordenados: não percorrem as linhas.
+    - Tempo aberto/restante é recalculado só para as linhas pedidas (as visíveis).
+    """
+
+    def __init__(self, df):
+        self.aberturas = pd.to_datetime(df[config.COLUNA_ABERTURA], errors='coerce').to_numpy(dtype='datetime64[s]')
+        self.abertura = para_epoch(df[config.COLUNA_ABERTURA])
+        self.inicio_alerta = para_epoch(df['SLA_Inicio_Alerta'])
+        self.prazo = para_epoch(df['SLA_Prazo'])
+        self.codigos = df['SLA_Codigo'].to_numpy()
+        self.sla_total = df['SLA_Total_Segundos'].to_numpy(dtype=float)
+        self.sla_alerta = df['SLA_Alerta_Segundos'].to_numpy(dtype=float)
+
+        self.abertura_ordenada = np.sort(self.abertura[~np.isnan(self.abertura)])
+        self.inicio_alerta_ordenado = np.sort(self.inicio_alerta[~np.isnan(self.inicio_alerta)])
+        self.prazo_ordenado = np.sort(self.prazo[~np.isnan(self.prazo)])
+
+    def contagens_sla(self, agora):
+        """(total estourado, total em alerta) no instante `agora` (epoch)."""
+        estourados = np.searchsorted(self.prazo_ordenado, agora, side='left')
+        prazo_ate_agora = np.searchsorted(self.prazo_ordenado, agora, side='right')
+        alerta_ate_agora = np.searchsorted(self.inicio_alerta_ordenado, agora, side='right')
+        # Em alerta: já entrou na janela de alerta e o prazo ainda não chegou
+        return int(estourados), int(alerta_ate_agora - prazo_ate_agora)
+
+    def contar_por_idade(self, agora, limites_segundos):
+        """
+        Histograma do tempo aberto no instante `agora`: chamados em [limite[i], limite[i + 1]) e, na última
+        posição, os com tempo >= último limite. Uma busca binária por limite, sem percorrer as linhas.
+        """
+        # tempo aberto >= limite  <=>  abertura <= agora - limite
+        ate = np.searchsorted(self.abertura_ordenada, agora - np.asarray(limites_segundos, dtype=float), side='right')
+        return np.append(ate[:-1] - ate[1:], ate[-1]).astype(int)
+
+    def tempos(self, posicoes, agora):
+        """
+        Para as linhas em `posicoes`: (tempo aberto, tempo restante, estourado, em alerta).
+        O restante respeita os calendários de horário comercial de cada categoria.
+        """
+        decorrido = agora - self.abertura[posicoes]
+        agora_ts = EPOCA + pd.Timedelta(seconds=agora)
+        consumido = config.tempo_sla_consumido(self.codigos[posicoes], self.aberturas[posicoes], agora_ts)
+        restante = self.sla_total[posicoes] - consumido
+        # Mesma regra de 'config.calcular_sla'
+        estourado = restante < 0
+        alerta = (restante > 0) & (restante <= self.sla_alerta[posicoes])
+        return decorrido, restante, estourado, alerta
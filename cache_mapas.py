@@ -0,0 +1,103 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# --- Cache dos Mapas Renderizados ---
+MAPAS_CACHE_MAX_BYTES = 256 * 1024 ** 2 # Memória dos HTMLs guardados (todas as sessões); passando disso sai o usado há mais tempo
+MAPAS_INTERVALO_CORES_SEGUNDOS = 60 # Por quanto tempo um mapa vale antes de recalcular as cores do SLA
+# Rotas planejadas e despachos montados, pela mesma chave dos mapas
+CALCULOS_CACHE_MAX_BYTES = 128 * 1024 ** 2
+
+
+def assinatura_filtros(mascara):
+    """Identifica a seleção de linhas ativa (resultado de todos os filtros) por um hash curto da máscara."""
+    return hashlib.blake2b(np.packbits(np.asarray(mascara, dtype=bool)).tobytes(), digest_size=16).hexdigest()
+
+def faixa_de_tempo(intervalo=MAPAS_INTERVALO_CORES_SEGUNDOS):
+    return int(time.time() // intervalo)
+
+def chave_cache(chave_dataset, pagina, mascara):
+    """(dataset, página, filtros, faixa de tempo): o que muda o mapa e os cálculos feitos sobre ele."""
+    return (chave_dataset, pagina, assinatura_filtros(mascara), faixa_de_tempo())
+
+def bytes_dataframes(valor):
+    """Memória dos DataFrames de um valor (DataFrame, tupla/lista deles ou objeto com 'memoria_bytes')."""
+    if hasattr(valor, 'memoria_bytes'):
+        return valor.memoria_bytes()
+    if hasattr(valor, 'memory_usage'):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (tuple, list)):
+        return sum(bytes_dataframes(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """
+    Valores por chave, do menos para o mais usado, limitados pela memória total (`medir(valor)` em bytes).
+    Passando do limite, sai o usado há mais tempo. Compartilhado por todas as sessões: os valores
+    guardados são SOMENTE LEITURA.
+    """
+
+    def __init__(self, memoria_max_bytes, medir=sys.getsizeof):
+        self.memoria_max_bytes = memoria_max_bytes
+        self.medir = medir
+        self.valores = OrderedDict() # chave -> (valor, bytes), do menos para o mais usado
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def obter(self, chave, gerar):
+        """Retorna o valor da chave; se não estiver no cache, chama `gerar()` e guarda o resultado."""
+        with self.lock:
+            if chave in self.valores:
+                self.valores.move_to_end(chave)
+                return self.valores[chave][0]
+
+        valor = gerar()
+        tamanho = self.medir(valor)
+
+        with self.lock:
+            if chave in self.valores: # Outra sessão gerou o mesmo valor enquanto este era calculado
+                self.total_bytes -= self.valores[chave][1]
+            self.valores[chave] = (valor, tamanho)
+            self.valores.move_to_end(chave)
+            self.total_bytes += tamanho
+            # Nunca remove o valor recém-gerado, mesmo que sozinho passe do limite
+            while self.total_bytes > self.memoria_max_bytes and len(self.valores) > 1:
+                _, (_, tamanho_removido) = self.valores.popitem(last=False)
+                self.total_bytes -= tamanho_removido
+        return valor
+
+
+class CacheMapas(CacheLRU):
+    """
+    HTML final dos mapas Folium, pela chave (dataset, página, filtros, faixa de tempo).
+    Reexecuções que não mudam nada disso (formulário, anotações, outros widgets) reaproveitam o HTML
+    sem montar nem renderizar o mapa de novo.
+    """
+
+    def __init__(self, memoria_max_bytes=MAPAS_CACHE_MAX_BYTES):
+        super().__init__(memoria_max_bytes, sys.getsizeof)
+
+    def obter_html(self, chave, gerar_mapa):
+        """Retorna o HTML do mapa da chave; se não estiver no cache, chama `gerar_mapa()` (-> folium.Map)."""
+        return self.obter(chave, lambda: gerar_mapa().get_root().render())
+
+
+# Instâncias únicas por processo do Streamlit (como 'dados.REGISTRO')
+CACHE = CacheMapas()
+CALCULOS = CacheLRU(CALCULOS_CACHE_MAX_BYTES, bytes_dataframes)
+
+def html_mapa(chave_dataset, pagina, mascara, gerar_mapa):
+    """HTML do mapa para o dataset, a página e a seleção de filtros atuais, na faixa de tempo atual."""
+    return CACHE.obter_html(chave_cache(chave_dataset, pagina, mascara), gerar_mapa)
+
+def calculo(nome, chave_dataset, pagina, mascara, calcular):
+    """
+    Resultado de `calcular()` (rotas, despacho...) guardado pela mesma chave do mapa da página:
+    só é refeito quando o dataset, os filtros ou a faixa de tempo mudam.
+    """
+    return CALCULOS.obter((nome,) + chave_cache(chave_dataset, pagina, mascara), calcular)
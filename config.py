@@ -1,187 +1,510 @@
-import pandas as pd
-import folium 
-from folium import DivIcon 
-from branca.element import Template, MacroElement
-
-# ---- Nomes das Colunas ----
-COLUNA_ID_CLIENTE = "ID Cliente"
-COLUNA_NOME_CLIENTE = "Nome Cliente"
-COLUNA_CIDADE = "Cidade"
-COLUNA_STATUS = "Status Atendimento"
-COLUNA_ABERTURA = "Abertura"
-COLUNA_ASSUNTO = "Assunto"
-COLUNA_ENCAMINHAMENTO = "Encaminhamento Operacional"
-COLUNA_AGENDAMENTO = "Agendamento Visita"
-COLUNA_TECNICO = "Tecnico Visita"
-COLUNA_LATITUDE = "latitude"
-COLUNA_LONGITUDE = "longitude"
-
-# --- CONFIGURAÇÃO DE SLA DINÂMICO ---
-SLAS_POR_CATEGORIA = {
-    'MANUTENCAO_RURAL': {'sla_hours': 168, 'alerta_hours': 24},
-    'ATIVACAO': {'sla_hours': 24, 'alerta_hours': 4},
-    'MUDANCA': {'sla_hours': 24, 'alerta_hours': 4},
-    'MANUTENCAO': {'sla_hours': 24, 'alerta_hours': 4},
-    'SERVICOS': {'sla_hours': 24, 'alerta_hours': 4},
-    'DESCONEXAO': {'sla_hours': 24, 'alerta_hours': 4},
-    'DEFAULT': {'sla_hours': 24, 'alerta_hours': 4}
-}
-
-# --- CORES FIXAS DO SEMÁFORO ---
-COR_SAFE = '#28a745'     # Verde (Até 20h)
-COR_ALERT = '#FFD700'    # Amarelo/Dourado (4h ou menos restantes)
-COR_OVERDUE = '#DC3545'  # Vermelho (Vencido)
-
-# --- CONFIGURAÇÃO DE ALERTA ---
-STATUS_ABERTOS = ["VISITA_AGENDADA"] 
-ALERTA_SEGUNDOS = 4 * 60 * 60 # 4 horas
-
-# Mapeamento de nomes do Excel
-MAPA_NOMES = {
-    'ATIVAÇÃO INICIAL (ADAPTER)': 'ATIVACAO', 'ATIVACAO INICIAL (ADAPTER)': 'ATIVACAO',
-    'MUDANÇA DE ENDEREÇO (ADAPTER)': 'MUDANCA', 'MUDANCA DE ENDERECO (ADAPTER)': 'MUDANCA',
-    'MANUTENÇÃO EXTERNA (ADAPTER)': 'MANUTENCAO', 'MANUTENCAO EXTERNA (ADAPTER)': 'MANUTENCAO',
-    'MANUTENÇÃO ZONA RURAL (ADAPTER)': 'MANUTENCAO_RURAL', 'MANUTENCAO ZONA RURAL (ADAPTER)': 'MANUTENCAO_RURAL',
-    'SERVIÇOS EXTRAS (ADAPTER)': 'SERVICOS', 'SERVICOS EXTRAS (ADAPTER)': 'SERVICOS',
-    'DESCONEXÃO/RECOLHIMENTO (ADAPTER)': 'DESCONEXAO', 'DESCONEXAO/RECOLHIMENTO (ADAPTER)': 'DESCONEXAO'
-}
-
-# ---- FUNÇÕES HELPERS ----
-def obter_sla_segundos(assunto):
-    assunto_upper = str(assunto).strip().upper()
-    chave = MAPA_NOMES.get(assunto_upper, 'DEFAULT')
-    sla_config = SLAS_POR_CATEGORIA.get(chave, SLAS_POR_CATEGORIA['DEFAULT'])
-    return sla_config['sla_hours'] * 3600, sla_config['alerta_hours'] * 3600
-
-def formatar_hms(segundos_totais):
-    if pd.isna(segundos_totais): return "N/A"
-    segundos_totais = int(segundos_totais)
-    sinal = '-' if segundos_totais < 0 else ''
-    segundos_totais = abs(segundos_totais)
-    horas = segundos_totais // 3600
-    minutos = (segundos_totais % 3600) // 60
-    segundos = segundos_totais % 60
-    return f"{sinal}{horas:02}:{minutos:02}:{segundos:02}"
-
-# ---- FUNÇÃO DE COR DO SEMÁFORO ----
-def obter_dados_cor(row):
-    if 'SLA_Estourado' in row and row['SLA_Estourado']:
-        return COR_OVERDUE 
-    elif 'SLA_Alerta' in row and row['SLA_Alerta']:
-        return COR_ALERT 
-    else:
-        return COR_SAFE 
-
-def get_text_color(bg_color):
-    return 'black' if bg_color == COR_ALERT else 'white'
-
-def highlight_sla(row):
-    bg_color = obter_dados_cor(row)
-    text_color = get_text_color(bg_color)
-    return [f'background-color: {bg_color}; color: {text_color}; font-weight: bold'] * len(row)
-
-
-# ---- CRIAR MAPA FOLIUM COM ROTAS ----
-def criar_mapa_folium(df_mapa):
-    if df_mapa.empty:
-        return folium.Map(location=[-15.788497, -47.879873], zoom_start=4)
-
-    map_center = [df_mapa[COLUNA_LATITUDE].mean(), df_mapa[COLUNA_LONGITUDE].mean()]
-    m = folium.Map(location=map_center, zoom_start=12)
-
-    # 1. Desenha os Marcadores (Pontos)
-    for idx, row in df_mapa.iterrows():
-        prioridade = row.get('Prioridade', idx + 1)
-        cor_fundo = obter_dados_cor(row)
-        cor_texto = get_text_color(cor_fundo)
-        cor_borda = cor_fundo 
-        
-        tecnico = row.get(COLUNA_TECNICO, "N/A")
-        if pd.isna(tecnico): tecnico = "N/A"
-        
-        t_aberto = formatar_hms(row.get('Tempo_Decorrido_Segundos', pd.NA))
-        t_restante = ""
-        if 'Tempo_Restante_Segundos' in row and pd.notna(row['Tempo_Restante_Segundos']):
-            t_restante = f"<b>Restante:</b> {formatar_hms(row['Tempo_Restante_Segundos'])}<br>"
-
-        icon_html = f"""
-        <div style="
-            background-color: {cor_fundo}; border: 2px solid {cor_borda}; color: {cor_texto};
-            border-radius: 50%; width: 24px; height: 24px;
-            display: flex; align-items: center; justify-content: center;
-            font-weight: bold; font-family: sans-serif; font-size: 10pt;
-            box-shadow: 2px 2px 4px rgba(0,0,0,0.4);
-        ">
-        {prioridade}
-        </div>
-        """
-
-        popup_html = f"""
-        <div style="font-family: sans-serif; font-size: 12px;">
-            <b style="font-size:14px;">Prioridade #{prioridade}</b><br>
-            <hr style='margin: 4px 0;'>
-            <b>ID:</b> {row[COLUNA_ID_CLIENTE]}<br>
-            <b>Técnico:</b> {tecnico}<br>
-            <b>Assunto:</b> {row[COLUNA_ASSUNTO]}<br>
-            <b>Aberto há:</b> {t_aberto}<br>
-            {t_restante}
-        </div>
-        """
-        
-        folium.Marker(
-            location=[row[COLUNA_LATITUDE], row[COLUNA_LONGITUDE]],
-            icon=DivIcon(html=icon_html), 
-            popup=folium.Popup(popup_html, max_width=300)
-        ).add_to(m)
-
-    # 2. Desenha as Rotas (Linhas) por Técnico
-    if COLUNA_TECNICO in df_mapa.columns:
-        tecnicos_unicos = df_mapa[COLUNA_TECNICO].unique()
-        
-        # Cores para as rotas (cíclicas para diferenciar técnicos)
-        cores_rota = ['#3388ff', '#ff3388', '#88ff33', '#33ffff', '#ff9933']
-        
-        for i, tecnico in enumerate(tecnicos_unicos):
-            if pd.isna(tecnico): continue
-            
-            # Filtra os pontos deste técnico, mantendo a ordem de prioridade
-            df_rota = df_mapa[df_mapa[COLUNA_TECNICO] == tecnico]
-            
-            # Extrai coordenadas como lista de tuplas
-            pontos_rota = df_rota[[COLUNA_LATITUDE, COLUNA_LONGITUDE]].values.tolist()
-            
-            if len(pontos_rota) > 1:
-                cor_linha = cores_rota[i % len(cores_rota)]
-                folium.PolyLine(
-                    locations=pontos_rota,
-                    color=cor_linha,
-                    weight=3,
-                    opacity=0.7,
-                    dash_array='5, 10', # Linha tracejada para indicar sugestão
-                    tooltip=f"Rota Sugerida: {tecnico}"
-                ).add_to(m)
-
-    # 3. Legenda Semáforo
-    template_legenda = f"""
-    {{% macro html(this, kwargs) %}}
-    <div style="
-        position: fixed; 
-        bottom: 30px; left: 30px; width: auto; height: auto; 
-        z-index:9999; font-size:13px; font-family: sans-serif;
-        background-color: white; border: 2px solid #666; border-radius: 8px;
-        padding: 10px; opacity: 0.95; box-shadow: 3px 3px 5px rgba(0,0,0,0.3);
-        ">
-        <b style="font-size:14px;">Legenda (Semáforo SLA)</b><br><hr style="margin: 5px 0;">
-        <i style="background:{COR_SAFE}; width:12px; height:12px; display:inline-block; border-radius:50%; margin-right:5px;"></i> &nbsp; **Verde:** No Prazo<br>
-        <i style="background:{COR_ALERT}; width:12px; height:12px; display:inline-block; border-radius:50%; margin-right:5px;"></i> &nbsp; **Amarelo:** Alerta (< 4h)<br>
-        <i style="background:{COR_OVERDUE}; width:12px; height:12px; display:inline-block; border-radius:50%; margin-right:5px;"></i> &nbsp; **Vermelho:** Vencido<br>
-        <hr style="margin: 5px 0;">
-        <span style="border-bottom: 2px dashed grey;">---</span> &nbsp; Rota Sugerida
-    </div>
-    {{% endmacro %}}
-    """
-    macro = MacroElement()
-    macro._template = Template(template_legenda)
-    m.get_root().add_child(macro)
-
-    return m
+import json
+import pandas as pd
+import numpy as np
+import folium 
+from folium import DivIcon 
+from folium.plugins import FastMarkerCluster
+from branca.element import Template, MacroElement
+
+# ---- Nomes das Colunas ----
+COLUNA_ID_CLIENTE = "ID Cliente"
+COLUNA_NOME_CLIENTE = "Nome Cliente"
+COLUNA_CIDADE = "Cidade"
+COLUNA_STATUS = "Status Atendimento"
+COLUNA_ABERTURA = "Abertura"
+COLUNA_ASSUNTO = "Assunto"
+COLUNA_ENCAMINHAMENTO = "Encaminhamento Operacional"
+COLUNA_AGENDAMENTO = "Agendamento Visita"
+COLUNA_TECNICO = "Tecnico Visita"
+COLUNA_LATITUDE = "latitude"
+COLUNA_LONGITUDE = "longitude"
+
+# Colunas da exportação mantidas em memória além das usadas pelas páginas (ex.: ["Bairro", "Protocolo"])
+COLUNAS_EXTRAS = []
+
+# --- CONFIGURAÇÃO DE SLA DINÂMICO ---
+SLAS_POR_CATEGORIA = {
+    'MANUTENCAO_RURAL': {'sla_hours': 168, 'alerta_hours': 24},
+    'ATIVACAO': {'sla_hours': 24, 'alerta_hours': 4},
+    'MUDANCA': {'sla_hours': 24, 'alerta_hours': 4},
+    'MANUTENCAO': {'sla_hours': 24, 'alerta_hours': 4},
+    'SERVICOS': {'sla_hours': 24, 'alerta_hours': 4},
+    'DESCONEXAO': {'sla_hours': 24, 'alerta_hours': 4},
+    'DEFAULT': {'sla_hours': 24, 'alerta_hours': 4}
+}
+
+# --- CORES FIXAS DO SEMÁFORO ---
+COR_SAFE = '#28a745'     # Verde (Até 20h)
+COR_ALERT = '#FFD700'    # Amarelo/Dourado (4h ou menos restantes)
+COR_OVERDUE = '#DC3545'  # Vermelho (Vencido)
+
+# --- CONFIGURAÇÃO DE ALERTA ---
+STATUS_ABERTOS = ["VISITA_AGENDADA"] 
+ALERTA_SEGUNDOS = 4 * 60 * 60 # 4 horas
+
+# Mapeamento de nomes do Excel
+MAPA_NOMES = {
+    'ATIVAÇÃO INICIAL (ADAPTER)': 'ATIVACAO', 'ATIVACAO INICIAL (ADAPTER)': 'ATIVACAO',
+    'MUDANÇA DE ENDEREÇO (ADAPTER)': 'MUDANCA', 'MUDANCA DE ENDERECO (ADAPTER)': 'MUDANCA',
+    'MANUTENÇÃO EXTERNA (ADAPTER)': 'MANUTENCAO', 'MANUTENCAO EXTERNA (ADAPTER)': 'MANUTENCAO',
+    'MANUTENÇÃO ZONA RURAL (ADAPTER)': 'MANUTENCAO_RURAL', 'MANUTENCAO ZONA RURAL (ADAPTER)': 'MANUTENCAO_RURAL',
+    'SERVIÇOS EXTRAS (ADAPTER)': 'SERVICOS', 'SERVICOS EXTRAS (ADAPTER)': 'SERVICOS',
+    'DESCONEXÃO/RECOLHIMENTO (ADAPTER)': 'DESCONEXAO', 'DESCONEXAO/RECOLHIMENTO (ADAPTER)': 'DESCONEXAO'
+}
+
+# ---- FUNÇÕES HELPERS ----
+def obter_sla_segundos(assunto):
+    assunto_upper = str(assunto).strip().upper()
+    chave = MAPA_NOMES.get(assunto_upper, 'DEFAULT')
+    sla_config = SLAS_POR_CATEGORIA.get(chave, SLAS_POR_CATEGORIA['DEFAULT'])
+    return sla_config['sla_hours'] * 3600, sla_config['alerta_hours'] * 3600
+
+# ---- MOTOR DE SLA VETORIZADO ----
+# Calendário de horário comercial (opcional) por categoria. Categorias sem calendário contam o SLA
+# em horas corridas (24x7). Ex.:
+# 'MANUTENCAO_RURAL': {'inicio_hora': 8, 'fim_hora': 18, 'dias_semana': '1111100', 'feriados': ['2025-12-25']}
+CALENDARIOS_POR_CATEGORIA = {}
+
+SLA_ESTADO_OK = 0
+SLA_ESTADO_ALERTA = 1
+SLA_ESTADO_ESTOURADO = 2
+
+# Ordem fixa das categorias: a posição é o código usado nos arrays abaixo
+CATEGORIAS_SLA = list(SLAS_POR_CATEGORIA)
+SLA_TOTAL_POR_CODIGO = np.array([SLAS_POR_CATEGORIA[c]['sla_hours'] * 3600 for c in CATEGORIAS_SLA], dtype=float)
+SLA_ALERTA_POR_CODIGO = np.array([SLAS_POR_CATEGORIA[c]['alerta_hours'] * 3600 for c in CATEGORIAS_SLA], dtype=float)
+
+def codigos_categoria_sla(assuntos):
+    """Código da categoria de SLA de cada assunto. Cada assunto distinto é resolvido uma única vez."""
+    normalizados = pd.Series(assuntos, dtype='string').str.strip().str.upper()
+    categorico = pd.Categorical(normalizados)
+    codigo_default = CATEGORIAS_SLA.index('DEFAULT')
+    # O último elemento atende o código -1 (assunto vazio) -> DEFAULT
+    por_assunto = np.array(
+        [CATEGORIAS_SLA.index(MAPA_NOMES.get(a, 'DEFAULT')) for a in categorico.categories] + [codigo_default],
+        dtype=np.int16
+    )
+    return por_assunto[categorico.codes]
+
+def parametros_calendario(calendario):
+    inicio = int(calendario.get('inicio_hora', 8) * 3600)
+    fim = int(calendario.get('fim_hora', 18) * 3600)
+    dias = calendario.get('dias_semana', '1111100')
+    feriados = np.array(calendario.get('feriados', []), dtype='datetime64[D]')
+    return inicio, fim, dias, feriados
+
+def segundos_uteis_entre(inicios, fim_periodo, calendario):
+    """Segundos dentro do horário comercial entre cada início (datetime64[s]) e `fim_periodo`."""
+    ini, fim, dias, feriados = parametros_calendario(calendario)
+    duracao = fim - ini
+    t1 = np.broadcast_to(np.asarray(fim_periodo, dtype='datetime64[s]'), inicios.shape)
+    d0, d1 = inicios.astype('datetime64[D]'), t1.astype('datetime64[D]')
+    s0 = (inicios - d0).astype('timedelta64[s]').astype(np.int64)
+    s1 = (t1 - d1).astype('timedelta64[s]').astype(np.int64)
+    util0 = np.is_busday(d0, weekmask=dias, holidays=feriados)
+    util1 = np.is_busday(d1, weekmask=dias, holidays=feriados)
+
+    mesmo_dia = np.where(util0, np.maximum(0, np.minimum(s1, fim) - np.maximum(s0, ini)), 0)
+    primeiro_dia = np.where(util0, fim - np.clip(s0, ini, fim), 0)
+    ultimo_dia = np.where(util1, np.clip(s1, ini, fim) - ini, 0)
+    dias_inteiros = np.busday_count(np.minimum(d0 + 1, d1), d1, weekmask=dias, holidays=feriados)
+
+    total = np.where(d0 == d1, mesmo_dia, primeiro_dia + dias_inteiros * duracao + ultimo_dia)
+    return np.where(t1 < inicios, 0, total).astype(float)
+
+def prazo_util(inicios, segundos, calendario):
+    """Data/hora em que cada início (datetime64[s]) completa `segundos` de horário comercial."""
+    ini, fim, dias, feriados = parametros_calendario(calendario)
+    duracao = fim - ini
+    segundos = np.asarray(segundos, dtype=float)
+    d0 = inicios.astype('datetime64[D]')
+    s0 = (inicios - d0).astype('timedelta64[s]').astype(np.int64)
+    util0 = np.is_busday(d0, weekmask=dias, holidays=feriados)
+
+    comeco = np.clip(s0, ini, fim)
+    disponivel_hoje = np.where(util0, fim - comeco, 0)
+    resto = segundos - disponivel_hoje
+    dias_extras = np.maximum(np.ceil(resto / duracao), 1).astype(np.int64)
+    dia_final = np.busday_offset(d0 + 1, dias_extras - 1, roll='forward', weekmask=dias, holidays=feriados)
+    no_dia_final = ini + resto - (dias_extras - 1) * duracao
+
+    prazo_hoje = d0.astype('datetime64[s]') + (comeco + segundos).astype('timedelta64[s]')
+    prazo_depois = dia_final.astype('datetime64[s]') + no_dia_final.astype('timedelta64[s]')
+    return np.where(util0 & (segundos <= disponivel_hoje), prazo_hoje, prazo_depois)
+
+def tempo_sla_consumido(codigos, aberturas, agora):
+    """
+    Segundos que já contam para o SLA de cada chamado: tempo de relógio nas categorias 24x7
+    e só horário comercial nas categorias com calendário. `aberturas` é um array datetime64.
+    """
+    aberturas = np.asarray(aberturas, dtype='datetime64[s]')
+    agora = np.datetime64(pd.Timestamp(agora).to_datetime64(), 's')
+    consumido = (agora - aberturas).astype('timedelta64[s]').astype(float)
+    consumido[np.isnat(aberturas)] = np.nan
+
+    validas = ~np.isnat(aberturas)
+    for categoria, calendario in CALENDARIOS_POR_CATEGORIA.items():
+        if categoria not in CATEGORIAS_SLA:
+            continue
+        mascara = validas & (codigos == CATEGORIAS_SLA.index(categoria))
+        if mascara.any():
+            consumido[mascara] = segundos_uteis_entre(aberturas[mascara], agora, calendario)
+    return consumido
+
+def calcular_sla(assuntos, aberturas, agora=None):
+    """
+    Calcula o SLA de todos os chamados de uma vez (sem laço por linha).
+    `assuntos` pode ser None (todos no SLA DEFAULT). Retorna um DataFrame com o índice de `aberturas`:
+    SLA_Codigo (posição em CATEGORIAS_SLA), SLA_Total_Segundos, SLA_Alerta_Segundos,
+    Tempo_Decorrido_Segundos (relógio), Tempo_Restante_Segundos, SLA_Inicio_Alerta, SLA_Prazo,
+    SLA_Estado (SLA_ESTADO_*), SLA_Estourado e SLA_Alerta.
+    """
+    aberturas = pd.to_datetime(pd.Series(aberturas), errors='coerce')
+    agora = pd.Timestamp.now() if agora is None else pd.Timestamp(agora)
+    if assuntos is None:
+        codigos = np.full(len(aberturas), CATEGORIAS_SLA.index('DEFAULT'), dtype=np.int16)
+    else:
+        codigos = codigos_categoria_sla(assuntos)
+
+    sla_total = SLA_TOTAL_POR_CODIGO[codigos]
+    sla_alerta = SLA_ALERTA_POR_CODIGO[codigos]
+    decorrido = (agora - aberturas).dt.total_seconds().to_numpy(dtype=float, na_value=np.nan)
+    restante = sla_total - tempo_sla_consumido(codigos, aberturas.to_numpy(), agora)
+
+    # Instantes de transição: entrada na janela de alerta e estouro do prazo
+    prazo = (aberturas + pd.to_timedelta(sla_total, unit='s')).to_numpy(copy=True)
+    inicio_alerta = (aberturas + pd.to_timedelta(sla_total - sla_alerta, unit='s')).to_numpy(copy=True)
+    validas = aberturas.notna().to_numpy()
+    for categoria, calendario in CALENDARIOS_POR_CATEGORIA.items():
+        if categoria not in CATEGORIAS_SLA:
+            continue
+        mascara = validas & (codigos == CATEGORIAS_SLA.index(categoria))
+        if not mascara.any():
+            continue
+        inicios = aberturas.to_numpy()[mascara].astype('datetime64[s]')
+        prazo[mascara] = prazo_util(inicios, sla_total[mascara], calendario)
+        inicio_alerta[mascara] = prazo_util(inicios, sla_total[mascara] - sla_alerta[mascara], calendario)
+
+    estourado = restante < 0
+    alerta = (restante > 0) & (restante <= sla_alerta)
+    estado = estado_sla(estourado, alerta)
+
+    return pd.DataFrame({
+        'SLA_Codigo': codigos,
+        'SLA_Total_Segundos': sla_total,
+        'SLA_Alerta_Segundos': sla_alerta,
+        'Tempo_Decorrido_Segundos': decorrido,
+        'Tempo_Restante_Segundos': restante,
+        'SLA_Inicio_Alerta': inicio_alerta,
+        'SLA_Prazo': prazo,
+        'SLA_Estado': estado,
+        'SLA_Estourado': estourado,
+        'SLA_Alerta': alerta,
+    }, index=aberturas.index)
+
+def formatar_hms(segundos_totais):
+    if pd.isna(segundos_totais): return "N/A"
+    segundos_totais = int(segundos_totais)
+    sinal = '-' if segundos_totais < 0 else ''
+    segundos_totais = abs(segundos_totais)
+    horas = segundos_totais // 3600
+    minutos = (segundos_totais % 3600) // 60
+    segundos = segundos_totais % 60
+    return f"{sinal}{horas:02}:{minutos:02}:{segundos:02}"
+
+# ---- FUNÇÃO DE COR DO SEMÁFORO ----
+def obter_dados_cor(row):
+    if 'SLA_Estourado' in row and row['SLA_Estourado']:
+        return COR_OVERDUE 
+    elif 'SLA_Alerta' in row and row['SLA_Alerta']:
+        return COR_ALERT 
+    else:
+        return COR_SAFE 
+
+def get_text_color(bg_color):
+    return 'black' if bg_color == COR_ALERT else 'white'
+
+def highlight_sla(row):
+    bg_color = obter_dados_cor(row)
+    text_color = get_text_color(bg_color)
+    return [f'background-color: {bg_color}; color: {text_color}; font-weight: bold'] * len(row)
+
+
+# ---- FORMATAÇÃO VETORIZADA (TABELAS) ----
+# Mesmas regras de 'formatar_hms' / 'highlight_sla', mas para arrays inteiros de uma vez
+CORES_POR_ESTADO = [COR_SAFE, COR_ALERT, COR_OVERDUE] # índice = SLA_ESTADO_*
+ESTILOS_POR_ESTADO = np.array([
+    f'background-color: {cor}; color: {get_text_color(cor)}; font-weight: bold' for cor in CORES_POR_ESTADO
+])
+
+def estado_sla(estourado, alerta):
+    """SLA_ESTADO_* de cada linha (estourado tem precedência sobre alerta, como em 'obter_dados_cor')."""
+    return np.select(
+        [np.asarray(estourado, dtype=bool), np.asarray(alerta, dtype=bool)],
+        [SLA_ESTADO_ESTOURADO, SLA_ESTADO_ALERTA], SLA_ESTADO_OK
+    ).astype(np.int8)
+
+DOIS_DIGITOS = np.array([f"{i:02}" for i in range(100)], dtype=object)
+
+def formatar_hms_array(segundos):
+    """Array de segundos -> array de textos 'HH:MM:SS' (negativos com '-', vazios como 'N/A')."""
+    segundos = np.asarray(segundos, dtype=float)
+    vazio = np.isnan(segundos)
+    inteiros = np.trunc(np.where(vazio, 0, segundos)).astype(np.int64)
+    horas, resto = np.divmod(np.abs(inteiros), 3600)
+    minutos, segs = np.divmod(resto, 60)
+    texto_horas = np.where(horas < 100, DOIS_DIGITOS[np.minimum(horas, 99)], horas.astype(str).astype(object))
+    texto = np.where(inteiros < 0, '-', '').astype(object) + texto_horas + ':' + DOIS_DIGITOS[minutos] + ':' + DOIS_DIGITOS[segs]
+    texto[vazio] = 'N/A'
+    return texto
+
+def estilos_sla(df_exibicao, estados):
+    """CSS do semáforo para todas as células de uma vez (para 'Styler.apply(..., axis=None)')."""
+    estilos = ESTILOS_POR_ESTADO[np.asarray(estados)]
+    return pd.DataFrame(
+        np.repeat(estilos[:, None], len(df_exibicao.columns), axis=1),
+        index=df_exibicao.index, columns=df_exibicao.columns
+    )
+
+
+# ---- CRIAR MAPA FOLIUM COM ROTAS ----
+def adicionar_marcadores_detalhados(m, df_mapa):
+    """Um marcador (ícone + popup montados no Python) por chamado. Bom para poucos chamados."""
+    for idx, row in df_mapa.iterrows():
+        prioridade = row.get('Prioridade', idx + 1)
+        cor_fundo = obter_dados_cor(row)
+        cor_texto = get_text_color(cor_fundo)
+        cor_borda = cor_fundo 
+        
+        tecnico = row.get(COLUNA_TECNICO, "N/A")
+        if pd.isna(tecnico): tecnico = "N/A"
+        
+        t_aberto = formatar_hms(row.get('Tempo_Decorrido_Segundos', pd.NA))
+        t_restante = ""
+        if 'Tempo_Restante_Segundos' in row and pd.notna(row['Tempo_Restante_Segundos']):
+            t_restante = f"<b>Restante:</b> {formatar_hms(row['Tempo_Restante_Segundos'])}<br>"
+
+        icon_html = f"""
+        <div style="
+            background-color: {cor_fundo}; border: 2px solid {cor_borda}; color: {cor_texto};
+            border-radius: 50%; width: 24px; height: 24px;
+            display: flex; align-items: center; justify-content: center;
+            font-weight: bold; font-family: sans-serif; font-size: 10pt;
+            box-shadow: 2px 2px 4px rgba(0,0,0,0.4);
+        ">
+        {prioridade}
+        </div>
+        """
+
+        popup_html = f"""
+        <div style="font-family: sans-serif; font-size: 12px;">
+            <b style="font-size:14px;">Prioridade #{prioridade}</b><br>
+            <hr style='margin: 4px 0;'>
+            <b>ID:</b> {row[COLUNA_ID_CLIENTE]}<br>
+            <b>Técnico:</b> {tecnico}<br>
+            <b>Assunto:</b> {row[COLUNA_ASSUNTO]}<br>
+            <b>Aberto há:</b> {t_aberto}<br>
+            {t_restante}
+        </div>
+        """
+        
+        folium.Marker(
+            location=[row[COLUNA_LATITUDE], row[COLUNA_LONGITUDE]],
+            icon=DivIcon(html=icon_html), 
+            popup=folium.Popup(popup_html, max_width=300)
+        ).add_to(m)
+
+def adicionar_rotas(m, df_mapa, rotas_planejadas=None):
+    """
+    Rotas sugeridas (linhas tracejadas) por técnico, na ordem de visita de 'rotas.planejar_rotas'.
+    `rotas_planejadas`: (paradas, resumo) já calculados pela página (senão são planejadas aqui).
+    """
+    if rotas_planejadas is None:
+        import rotas # Aqui dentro: 'rotas' importa 'config' ao carregar
+        rotas_planejadas = rotas.planejar_rotas(df_mapa)
+    paradas, resumo = rotas_planejadas
+
+    # Cores para as rotas (cíclicas para diferenciar técnicos)
+    cores_rota = ['#3388ff', '#ff3388', '#88ff33', '#33ffff', '#ff9933']
+
+    for i, (tecnico, df_rota) in enumerate(paradas.groupby(COLUNA_TECNICO, sort=False)):
+        # Coordenadas já na ordem de visita
+        pontos_rota = df_rota[[COLUNA_LATITUDE, COLUNA_LONGITUDE]].values.tolist()
+
+        if len(pontos_rota) > 1:
+            cor_linha = cores_rota[i % len(cores_rota)]
+            folium.PolyLine(
+                locations=pontos_rota,
+                color=cor_linha,
+                weight=3,
+                opacity=0.7,
+                dash_array='5, 10', # Linha tracejada para indicar sugestão
+                tooltip=f"Rota Sugerida: {tecnico} ({resumo.loc[tecnico, 'Distancia_Total_Km']:.1f} km, {len(pontos_rota)} paradas)"
+            ).add_to(m)
+
+def adicionar_legenda(m, agrupado=False):
+    linha_grupos = ""
+    if agrupado:
+        linha_grupos = '<hr style="margin: 5px 0;">Grupos: cor do chamado mais crítico<br>'
+    template_legenda = f"""
+    {{% macro html(this, kwargs) %}}
+    <div style="
+        position: fixed; 
+        bottom: 30px; left: 30px; width: auto; height: auto; 
+        z-index:9999; font-size:13px; font-family: sans-serif;
+        background-color: white; border: 2px solid #666; border-radius: 8px;
+        padding: 10px; opacity: 0.95; box-shadow: 3px 3px 5px rgba(0,0,0,0.3);
+        ">
+        <b style="font-size:14px;">Legenda (Semáforo SLA)</b><br><hr style="margin: 5px 0;">
+        <i style="background:{COR_SAFE}; width:12px; height:12px; display:inline-block; border-radius:50%; margin-right:5px;"></i> &nbsp; **Verde:** No Prazo<br>
+        <i style="background:{COR_ALERT}; width:12px; height:12px; display:inline-block; border-radius:50%; margin-right:5px;"></i> &nbsp; **Amarelo:** Alerta (< 4h)<br>
+        <i style="background:{COR_OVERDUE}; width:12px; height:12px; display:inline-block; border-radius:50%; margin-right:5px;"></i> &nbsp; **Vermelho:** Vencido<br>
+        <hr style="margin: 5px 0;">
+        <span style="border-bottom: 2px dashed grey;">---</span> &nbsp; Rota Sugerida
+        {linha_grupos}
+    </div>
+    {{% endmacro %}}
+    """
+    macro = MacroElement()
+    macro._template = Template(template_legenda)
+    m.get_root().add_child(macro)
+
+# ---- MAPA EM MODO AGRUPADO (MUITOS CHAMADOS) ----
+# Acima deste número de chamados o mapa usa o modo agrupado
+MAPA_LIMITE_DETALHADO = 300
+
+# Desenho dos marcadores feito no navegador: cada chamado é só uma linha de dados
+# [lat, lon, estado, prioridade, id, técnico, assunto, decorrido, restante]; textos repetidos
+# (técnico/assunto) vão como índices em listas enviadas uma única vez. O popup é montado ao abrir.
+JS_MARCADOR_AGRUPADO = """(function() {
+    var CORES = %(cores)s;
+    var TECNICOS = %(tecnicos)s;
+    var ASSUNTOS = %(assuntos)s;
+    function hms(segundos) {
+        if (segundos === null) return "N/A";
+        segundos = Math.trunc(segundos);
+        var sinal = segundos < 0 ? "-" : "";
+        segundos = Math.abs(segundos);
+        var dois = function(n) { return String(n).padStart(2, "0"); };
+        return sinal + dois(Math.floor(segundos / 3600)) + ":" + dois(Math.floor(segundos %% 3600 / 60)) + ":" + dois(segundos %% 60);
+    }
+    function esc(texto) {
+        return String(texto).replace(/[&<>"']/g, function(c) {
+            return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+        });
+    }
+    function callback(row) {
+        var cor = CORES[row[2]];
+        var icone = L.divIcon({
+            className: "", iconSize: [24, 24],
+            html: '<div style="background-color:' + cor[0] + ';border:2px solid ' + cor[0] + ';color:' + cor[1] +
+                  ';border-radius:50%%;width:24px;height:24px;display:flex;align-items:center;justify-content:center;' +
+                  'font-weight:bold;font-family:sans-serif;font-size:10pt;box-shadow:2px 2px 4px rgba(0,0,0,0.4);">' +
+                  row[3] + '</div>'
+        });
+        var marcador = L.marker([row[0], row[1]], {icon: icone, estado: row[2]});
+        marcador.bindPopup(function() {
+            var restante = row[8] === null ? "" : "<b>Restante:</b> " + hms(row[8]) + "<br>";
+            return '<div style="font-family: sans-serif; font-size: 12px;">' +
+                '<b style="font-size:14px;">Prioridade #' + row[3] + '</b><br><hr style="margin: 4px 0;">' +
+                '<b>ID:</b> ' + esc(row[4]) + '<br>' +
+                '<b>Técnico:</b> ' + esc(TECNICOS[row[5]]) + '<br>' +
+                '<b>Assunto:</b> ' + esc(ASSUNTOS[row[6]]) + '<br>' +
+                '<b>Aberto há:</b> ' + hms(row[7]) + '<br>' + restante + '</div>';
+        }, {maxWidth: 300});
+        return marcador;
+    }
+    return callback;
+})()"""
+
+# Grupo pintado com a cor do chamado mais crítico que ele contém
+JS_ICONE_GRUPO = """
+    function(grupo) {
+        var cores = %(cores)s;
+        var pior = 0;
+        grupo.getAllChildMarkers().forEach(function(marcador) {
+            pior = Math.max(pior, marcador.options.estado);
+        });
+        var cor = cores[pior];
+        return L.divIcon({
+            className: "", iconSize: [36, 36],
+            html: '<div style="background-color:' + cor[0] + ';color:' + cor[1] + ';border-radius:50%%;width:36px;height:36px;' +
+                  'display:flex;align-items:center;justify-content:center;font-weight:bold;font-family:sans-serif;' +
+                  'box-shadow:2px 2px 4px rgba(0,0,0,0.4);opacity:0.9;">' + grupo.getChildCount() + '</div>'
+        });
+    }
+"""
+
+def codificar_textos(serie):
+    """Códigos por linha + lista de textos distintos (vazio vira 'N/A')."""
+    codigos, valores = pd.factorize(serie)
+    textos = [str(v) for v in valores] + ["N/A"]
+    return np.where(codigos < 0, len(textos) - 1, codigos), textos
+
+def segundos_ou_nulo(df, coluna):
+    if coluna not in df.columns:
+        return [None] * len(df)
+    valores = df[coluna].to_numpy(dtype=float, na_value=np.nan)
+    return [None if np.isnan(v) else round(v) for v in valores]
+
+def adicionar_marcadores_agrupados(m, df_mapa):
+    """Todos os chamados num único bloco de dados JSON, desenhados e agrupados (clusters) no navegador."""
+    n = len(df_mapa)
+    estourado = df_mapa['SLA_Estourado'].to_numpy(dtype=bool) if 'SLA_Estourado' in df_mapa.columns else np.zeros(n, dtype=bool)
+    alerta = df_mapa['SLA_Alerta'].to_numpy(dtype=bool) if 'SLA_Alerta' in df_mapa.columns else np.zeros(n, dtype=bool)
+    estados = estado_sla(estourado, alerta)  # índice em 'cores' (SLA_ESTADO_*)
+
+    if 'Prioridade' in df_mapa.columns:
+        prioridades = df_mapa['Prioridade'].tolist()
+    else:
+        prioridades = (df_mapa.index + 1).tolist()
+    tecnicos = codificar_textos(df_mapa[COLUNA_TECNICO]) if COLUNA_TECNICO in df_mapa.columns else (np.zeros(n, dtype=int), ["N/A"])
+    assuntos = codificar_textos(df_mapa[COLUNA_ASSUNTO])
+
+    dados_pontos = [list(linha) for linha in zip(
+        df_mapa[COLUNA_LATITUDE].round(6).tolist(), df_mapa[COLUNA_LONGITUDE].round(6).tolist(),
+        estados.tolist(), prioridades, df_mapa[COLUNA_ID_CLIENTE].astype(str).tolist(),
+        tecnicos[0].tolist(), assuntos[0].tolist(),
+        segundos_ou_nulo(df_mapa, 'Tempo_Decorrido_Segundos'), segundos_ou_nulo(df_mapa, 'Tempo_Restante_Segundos'),
+    )]
+
+    cores = json.dumps([[cor, get_text_color(cor)] for cor in CORES_POR_ESTADO])
+    callback = JS_MARCADOR_AGRUPADO % {
+        'cores': cores,
+        'tecnicos': json.dumps(tecnicos[1], ensure_ascii=False),
+        'assuntos': json.dumps(assuntos[1], ensure_ascii=False),
+    }
+    FastMarkerCluster(
+        dados_pontos, callback=callback, icon_create_function=JS_ICONE_GRUPO % {'cores': cores},
+        name="Chamados", control=False, disableClusteringAtZoom=16,
+    ).add_to(m)
+
+def criar_mapa_folium(df_mapa, modo=None, rotas_planejadas=None):
+    """
+    Mapa dos chamados com rotas e legenda.
+    modo: 'detalhado' (um marcador montado no Python por chamado), 'agrupado' (dados JSON + clusters
+    desenhados no navegador) ou None para escolher pelo número de chamados (MAPA_LIMITE_DETALHADO).
+    rotas_planejadas: resultado de 'rotas.planejar_rotas' já calculado para estes chamados (opcional).
+    """
+    if df_mapa.empty:
+        return folium.Map(location=[-15.788497, -47.879873], zoom_start=4)
+
+    if modo is None:
+        modo = 'detalhado' if len(df_mapa) <= MAPA_LIMITE_DETALHADO else 'agrupado'
+
+    map_center = [df_mapa[COLUNA_LATITUDE].mean(), df_mapa[COLUNA_LONGITUDE].mean()]
+    m = folium.Map(location=map_center, zoom_start=12)
+
+    # 1. Desenha os Marcadores (Pontos)
+    if modo == 'agrupado':
+        adicionar_marcadores_agrupados(m, df_mapa)
+    else:
+        adicionar_marcadores_detalhados(m, df_mapa)
+
+    # 2. Desenha as Rotas (Linhas) por Técnico
+    adicionar_rotas(m, df_mapa, rotas_planejadas)
+
+    # 3. Legenda Semáforo
+    adicionar_legenda(m, agrupado=(modo == 'agrupado'))
+
+    return m
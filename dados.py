@@ -0,0 +1,349 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import config
+import filtros
+import snapshots
+
+# Muda sempre que 'processar_dataframe' mudar, para não reaproveitar snapshots no formato antigo
+VERSAO_PROCESSAMENTO = 3
+
+# Memória máxima dos datasets mantidos no registro compartilhado (todas as sessões juntas)
+REGISTRO_MEMORIA_MAX_BYTES = 1024 ** 3 # 1 GB
+
+
+def hash_conteudo(conteudo):
+    """Identifica a planilha pelo conteúdo (mesmo arquivo enviado de novo = mesma chave)."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+# --- Compactação do dataset em memória ---
+# Colunas usadas pelas páginas (as demais da exportação são descartadas; extras em 'config.COLUNAS_EXTRAS')
+COLUNAS_USADAS = [
+    config.COLUNA_ID_CLIENTE, config.COLUNA_NOME_CLIENTE, config.COLUNA_CIDADE, config.COLUNA_STATUS,
+    config.COLUNA_ABERTURA, config.COLUNA_ASSUNTO, config.COLUNA_ENCAMINHAMENTO, config.COLUNA_AGENDAMENTO,
+    config.COLUNA_TECNICO, config.COLUNA_LATITUDE, config.COLUNA_LONGITUDE,
+    'Tempo_Encaminhamento_Segundos', 'Tempo_Agendamento_Segundos',
+]
+# Poucos valores distintos e muitas repetições: viram 'category' (códigos inteiros + um dicionário)
+COLUNAS_CATEGORICAS = [config.COLUNA_CIDADE, config.COLUNA_ASSUNTO, config.COLUNA_STATUS, config.COLUNA_TECNICO]
+# float32 guarda ~7 dígitos: coordenadas com precisão de decímetros (~0,2–0,4 m nesta latitude) e durações de até ~190 dias ao segundo
+COLUNAS_FLOAT32 = [
+    config.COLUNA_LATITUDE, config.COLUNA_LONGITUDE,
+    'Tempo_Encaminhamento_Segundos', 'Tempo_Agendamento_Segundos',
+]
+
+
+def colunas_mantidas(df):
+    """Colunas da exportação que ficam no dataset (usadas + 'config.COLUNAS_EXTRAS'), na ordem, sem repetir."""
+    colunas = [col for col in COLUNAS_USADAS + list(config.COLUNAS_EXTRAS) if col in df.columns]
+    return list(dict.fromkeys(colunas))
+
+def processar_dataframe(df):
+    """
+    Converte datas e coordenadas e calcula as durações fixas (Abertura -> Encaminhamento/Agendamento).
+    Descarta antes as colunas que não ficam no dataset: as conversões só passam pelo que é usado.
+    """
+    memoria_original = int(df.memory_usage(index=True, deep=True).sum())
+    df = df[colunas_mantidas(df)].copy()
+
+    colunas_data = [config.COLUNA_ABERTURA, config.COLUNA_ENCAMINHAMENTO, config.COLUNA_AGENDAMENTO]
+    for col in colunas_data:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+
+    df['Tempo_Encaminhamento_Segundos'] = np.nan
+    if config.COLUNA_ABERTURA in df.columns and config.COLUNA_ENCAMINHAMENTO in df.columns:
+        validos = df[[config.COLUNA_ABERTURA, config.COLUNA_ENCAMINHAMENTO]].dropna()
+        if not validos.empty:
+            df['Tempo_Encaminhamento_Segundos'] = (validos[config.COLUNA_ENCAMINHAMENTO] - validos[config.COLUNA_ABERTURA]).dt.total_seconds()
+
+    df['Tempo_Agendamento_Segundos'] = np.nan
+    if config.COLUNA_ABERTURA in df.columns and config.COLUNA_AGENDAMENTO in df.columns:
+        validos = df[[config.COLUNA_ABERTURA, config.COLUNA_AGENDAMENTO]].dropna()
+        if not validos.empty:
+            df['Tempo_Agendamento_Segundos'] = (validos[config.COLUNA_AGENDAMENTO] - validos[config.COLUNA_ABERTURA]).dt.total_seconds()
+
+    if config.COLUNA_LATITUDE in df.columns:
+        df[config.COLUNA_LATITUDE] = pd.to_numeric(df[config.COLUNA_LATITUDE], errors='coerce')
+    if config.COLUNA_LONGITUDE in df.columns:
+        df[config.COLUNA_LONGITUDE] = pd.to_numeric(df[config.COLUNA_LONGITUDE], errors='coerce')
+
+    # Colunas com tipos misturados (ex.: número "10" e texto "S/N") viram texto,
+    # para o snapshot colunar guardar exatamente o mesmo DataFrame
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed'):
+            df[col] = df[col].astype(str).where(df[col].notna())
+
+    return compactar_dataframe(df, memoria_original)
+
+def compactar_dataframe(df, memoria_original=None):
+    """
+    Reduz a memória do dataset: mantém só as colunas usadas (+ 'config.COLUNAS_EXTRAS'), passa as de
+    poucos valores para 'category', durações/coordenadas para float32 e IDs inteiros para int32.
+    O tamanho antes da compactação fica em df.attrs['memoria_original_bytes'] (vai junto no snapshot);
+    'memoria_original' é o tamanho da exportação quando as colunas já foram descartadas antes.
+    """
+    if memoria_original is None:
+        memoria_original = int(df.memory_usage(index=True, deep=True).sum())
+    df = df[colunas_mantidas(df)].copy()
+
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in COLUNAS_FLOAT32:
+        if col in df.columns:
+            df[col] = df[col].astype(np.float32)
+
+    id_cliente = df.get(config.COLUNA_ID_CLIENTE)
+    if id_cliente is not None and pd.api.types.is_integer_dtype(id_cliente):
+        limites = np.iinfo(np.int32)
+        if id_cliente.empty or (id_cliente.min() >= limites.min and id_cliente.max() <= limites.max):
+            df[config.COLUNA_ID_CLIENTE] = id_cliente.astype(np.int32)
+
+    df = df.reset_index(drop=True)
+    df.attrs['memoria_original_bytes'] = memoria_original
+    return df
+
+def relatorio_memoria(df):
+    """Memória do dataset por coluna (bytes, maiores primeiro), com o tipo de cada coluna."""
+    uso = df.memory_usage(index=False, deep=True)
+    relatorio = pd.DataFrame({'Tipo': df.dtypes.astype(str), 'Bytes': uso})
+    return relatorio.sort_values('Bytes', ascending=False)
+
+def calcular_tempos_ao_vivo(df, agora=None):
+    """
+    Tempo decorrido desde a abertura (até agora) e SLA dinâmico de todas as linhas (motor vetorizado
+    'config.calcular_sla'). Retorna um novo DataFrame: o dataset compartilhado não é alterado.
+    As páginas chamam com as linhas já filtradas, para só calcular o SLA do que vai ser usado.
+    """
+    # Cópia rasa: as colunas do dataset são compartilhadas (copy-on-write), só as de SLA são novas
+    df_processado = df.copy(deep=False)
+
+    if config.COLUNA_ABERTURA in df.columns:
+        aberturas = df[config.COLUNA_ABERTURA]
+    else:
+        aberturas = pd.Series(pd.NaT, index=df.index)
+    assuntos = df[config.COLUNA_ASSUNTO] if config.COLUNA_ASSUNTO in df.columns else None
+
+    df_sla = config.calcular_sla(assuntos, aberturas, agora)
+    for col in df_sla.columns:
+        df_processado[col] = df_sla[col].to_numpy()
+
+    return df_processado
+
+def chave_snapshot(chave):
+    return f"{chave}-v{VERSAO_PROCESSAMENTO}"
+
+def carregar_dataset(conteudo, chave=None):
+    """
+    Retorna o DataFrame processado da planilha (bytes do XLSX).
+    Usa o snapshot Arrow quando existe; senão lê o XLSX, processa e grava o snapshot.
+    """
+    chave = chave or hash_conteudo(conteudo)
+
+    df = snapshots.carregar_snapshot(chave_snapshot(chave))
+    if df is not None:
+        return df
+
+    df = processar_dataframe(pd.read_excel(io.BytesIO(conteudo)))
+    snapshots.salvar_snapshot(chave_snapshot(chave), df)
+    return df
+
+
+# ---- INGESTÃO INCREMENTAL (mesclagem por ID Cliente) ----
+MODO_DELTA = 'delta'       # Arquivo só com chamados novos/alterados
+MODO_COMPLETO = 'completo' # Exportação completa: quem não vier nela é retirado do dataset
+
+def ids_texto(serie):
+    """IDs como texto, a mesma chave usada pelo índice de filtros e pelo registro de ações."""
+    return pd.Index(serie.astype(str).to_numpy(dtype=object))
+
+def linhas_diferentes(df_a, df_b, colunas):
+    """Compara linha a linha (mesma posição) nas colunas dadas; vazio == vazio."""
+    diferentes = np.zeros(len(df_a), dtype=bool)
+    for col in colunas:
+        a = df_a[col].to_numpy(dtype=object)
+        b = df_b[col].to_numpy(dtype=object)
+        vazio_a, vazio_b = pd.isna(a), pd.isna(b)
+        diferentes |= np.where(vazio_a | vazio_b, vazio_a != vazio_b, a != b)
+    return diferentes
+
+def unir_categorias(df_a, df_b):
+    """Mesmas categorias nas colunas 'category' dos dois lados, para o concat não virar 'object'."""
+    for col in COLUNAS_CATEGORICAS:
+        if col in df_a.columns and col in df_b.columns:
+            categorias = df_a[col].cat.categories.union(df_b[col].cat.categories)
+            df_a[col] = df_a[col].cat.set_categories(categorias)
+            df_b[col] = df_b[col].cat.set_categories(categorias)
+    return df_a, df_b
+
+def mesclar_datasets(df_atual, df_novo, modo=MODO_DELTA):
+    """
+    Mescla `df_novo` (já processado) em `df_atual` pela chave ID Cliente, com operações vetorizadas.
+
+    - novos: IDs que não existiam; alterados: IDs existentes com algum valor diferente;
+    - resolvidos: chamados que saíram de um status aberto (config.STATUS_ABERTOS), incluindo,
+      no modo completo, os que não vieram na exportação (retirados do dataset).
+    Retorna (df_mesclado, origem, resumo): origem[i] é a posição da linha i em `df_atual`
+    (-1 = linha nova/alterada), para reaproveitar o que já foi calculado do dataset atual.
+    """
+    ids_atual = ids_texto(df_atual[config.COLUNA_ID_CLIENTE])
+    if not ids_atual.is_unique:
+        raise ValueError(f"O dataset atual tem '{config.COLUNA_ID_CLIENTE}' repetido; a mesclagem precisa de IDs únicos.")
+    if config.COLUNA_ID_CLIENTE not in df_novo.columns:
+        raise ValueError(f"O arquivo não tem a coluna '{config.COLUNA_ID_CLIENTE}'.")
+    # No arquivo novo, um ID repetido vale pela última linha
+    df_novo = df_novo[~ids_texto(df_novo[config.COLUNA_ID_CLIENTE]).duplicated(keep='last')].reset_index(drop=True)
+    ids_novo = ids_texto(df_novo[config.COLUNA_ID_CLIENTE])
+
+    posicao_atual = ids_atual.get_indexer(ids_novo) # -1 = ID novo
+    existentes = np.flatnonzero(posicao_atual >= 0)
+    colunas_comuns = [col for col in df_novo.columns if col in df_atual.columns]
+    alterados = linhas_diferentes(
+        df_atual.iloc[posicao_atual[existentes]], df_novo.iloc[existentes], colunas_comuns
+    )
+    linhas_alteradas = existentes[alterados]
+    linhas_novas = np.flatnonzero(posicao_atual < 0)
+
+    # Linhas do dataset atual que ficam como estão
+    manter = np.ones(len(df_atual), dtype=bool)
+    manter[posicao_atual[linhas_alteradas]] = False
+    retirados = np.zeros(len(df_atual), dtype=bool)
+    if modo == MODO_COMPLETO:
+        retirados = ids_novo.get_indexer(ids_atual) < 0
+        manter &= ~retirados
+
+    # Resolvidos: estavam abertos e deixaram de estar (ou foram retirados)
+    resolvidos = 0
+    if config.COLUNA_STATUS in df_atual.columns:
+        aberto_antes = df_atual[config.COLUNA_STATUS].isin(config.STATUS_ABERTOS).to_numpy()
+        resolvidos = int(np.count_nonzero(aberto_antes & retirados))
+        if config.COLUNA_STATUS in df_novo.columns and len(linhas_alteradas):
+            aberto_depois = df_novo[config.COLUNA_STATUS].iloc[linhas_alteradas].isin(config.STATUS_ABERTOS).to_numpy()
+            resolvidos += int(np.count_nonzero(aberto_antes[posicao_atual[linhas_alteradas]] & ~aberto_depois))
+
+    afetadas = np.sort(np.concatenate((linhas_alteradas, linhas_novas)))
+    parte_atual, parte_nova = unir_categorias(df_atual.iloc[np.flatnonzero(manter)].copy(deep=False), df_novo.iloc[afetadas].copy())
+    df_mesclado = pd.concat([parte_atual, parte_nova], ignore_index=True)
+    df_mesclado = df_mesclado[[col for col in df_atual.columns if col in df_mesclado.columns]
+                              + [col for col in df_mesclado.columns if col not in df_atual.columns]]
+    origem = np.concatenate((np.flatnonzero(manter), np.full(len(afetadas), -1)))
+
+    resumo = {
+        'novos': len(linhas_novas),
+        'alterados': len(linhas_alteradas),
+        'resolvidos': resolvidos,
+        'retirados': int(np.count_nonzero(retirados)),
+        'inalterados': len(existentes) - len(linhas_alteradas),
+        'total': len(df_mesclado),
+    }
+    return df_mesclado, origem, resumo
+
+
+# ---- REGISTRO COMPARTILHADO DE DATASETS ----
+class RegistroDatasets:
+    """
+    Um único DataFrame por planilha (hash do conteúdo), compartilhado por todas as sessões.
+    As sessões guardam só a chave. Os DataFrames são SOMENTE LEITURA: quem precisar alterar
+    deve trabalhar sobre uma cópia/visão própria. Passando do limite de memória, sai o
+    dataset usado há mais tempo (que volta do snapshot em disco se for pedido de novo).
+    """
+
+    def __init__(self, memoria_max_bytes=REGISTRO_MEMORIA_MAX_BYTES):
+        self.memoria_max_bytes = memoria_max_bytes
+        self.datasets = OrderedDict() # chave -> (df, bytes), do menos para o mais usado
+        self.indices = {} # chave -> filtros.IndiceFiltros (sai junto com o dataset)
+        self.assinantes = [] # Funções chamadas com a chave de cada planilha carregada ou mesclada
+        self.lock = threading.Lock()
+
+    def obter(self, chave):
+        """Retorna o dataset da chave (memória ou snapshot), ou None se não estiver disponível."""
+        with self.lock:
+            if chave in self.datasets:
+                self.datasets.move_to_end(chave)
+                return self.datasets[chave][0]
+        df = snapshots.carregar_snapshot(chave_snapshot(chave))
+        if df is not None:
+            self.registrar(chave, df)
+        return df
+
+    def carregar(self, conteudo, chave=None):
+        """Registra a planilha (bytes do XLSX) e retorna sua chave. Não relê se a chave já estiver carregada."""
+        chave = chave or hash_conteudo(conteudo)
+        if self.obter(chave) is None:
+            self.registrar(chave, carregar_dataset(conteudo, chave))
+        self.avisar(chave)
+        return chave
+
+    def mesclar(self, chave, conteudo, modo=MODO_DELTA):
+        """
+        Mescla a planilha (bytes do XLSX) no dataset da chave e registra o resultado como um novo dataset.
+        Só a planilha nova é lida; o índice de filtros é derivado do atual, recodificando só as linhas afetadas.
+        Retorna (chave do dataset mesclado, resumo das mudanças).
+        """
+        df_atual = self.obter(chave)
+        if df_atual is None:
+            raise ValueError("O dataset atual não está mais disponível; carregue o arquivo completo.")
+        chave_arquivo = hash_conteudo(conteudo)
+        df_novo = processar_dataframe(pd.read_excel(io.BytesIO(conteudo)))
+        df_mesclado, origem, resumo = mesclar_datasets(df_atual, df_novo, modo)
+
+        chave_mesclada = hashlib.sha256(f"{chave}|{chave_arquivo}|{modo}".encode()).hexdigest()
+        snapshots.salvar_snapshot(chave_snapshot(chave_mesclada), df_mesclado)
+        indice_atual = self.indice_filtros(chave)
+        self.registrar(chave_mesclada, df_mesclado)
+        with self.lock:
+            if chave_mesclada in self.datasets:
+                self.indices[chave_mesclada] = indice_atual.derivar(df_mesclado, origem)
+        self.avisar(chave_mesclada)
+        return chave_mesclada, resumo
+
+    def assinar(self, funcao):
+        """Chama `funcao(chave)` sempre que uma planilha for carregada ou mesclada (não nas releituras do snapshot)."""
+        with self.lock:
+            self.assinantes.append(funcao)
+
+    def avisar(self, chave):
+        with self.lock:
+            assinantes = list(self.assinantes)
+        for funcao in assinantes:
+            funcao(chave)
+
+    def registrar(self, chave, df):
+        tamanho = int(df.memory_usage(index=True, deep=True).sum())
+        with self.lock:
+            self.datasets[chave] = (df, tamanho)
+            self.datasets.move_to_end(chave)
+            total = sum(t for _, t in self.datasets.values())
+            # Nunca remove o dataset recém-registrado, mesmo que sozinho passe do limite
+            while total > self.memoria_max_bytes and len(self.datasets) > 1:
+                chave_removida, (_, tamanho_removido) = self.datasets.popitem(last=False)
+                self.indices.pop(chave_removida, None)
+                total -= tamanho_removido
+
+    def indice_filtros(self, chave):
+        """Índice dos filtros do dataset, montado na primeira vez que alguma sessão pede."""
+        with self.lock:
+            indice = self.indices.get(chave)
+        if indice is None:
+            df = self.obter(chave)
+            if df is None:
+                return None
+            indice = filtros.IndiceFiltros(df)
+            with self.lock:
+                if chave in self.datasets:
+                    indice = self.indices.setdefault(chave, indice)
+        return indice
+
+    def memoria_usada(self):
+        with self.lock:
+            return sum(t for _, t in self.datasets.values())
+
+
+# Instância única por processo do Streamlit: as duas páginas e todas as sessões usam a mesma
+REGISTRO = RegistroDatasets()
@@ -1,256 +1,337 @@
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-import openpyxl
-from datetime import datetime
-import config # Importa o arquivo de configuração
-from streamlit_folium import st_folium # Importa o componente Folium
-
-# Configuração da página
-st.set_page_config(layout="wide")
-
-# ---- Função de Carregamento de Dados ----
-@st.cache_data
-def carregar_e_processar(arquivo_upado):
-    try:
-        df = pd.read_excel(arquivo_upado.getvalue()) 
-    except Exception as e:
-        st.error(f"Erro ao ler o arquivo Excel (XLSX): {e}")
-        return None
-
-    colunas_data = [config.COLUNA_ABERTURA, config.COLUNA_ENCAMINHAMENTO, config.COLUNA_AGENDAMENTO]
-    for col in colunas_data:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-        
-    df['Tempo_Encaminhamento_Segundos'] = pd.NaT 
-    if config.COLUNA_ABERTURA in df.columns and config.COLUNA_ENCAMINHAMENTO in df.columns:
-        validos = df[[config.COLUNA_ABERTURA, config.COLUNA_ENCAMINHAMENTO]].dropna()
-        if not validos.empty:
-            df['Tempo_Encaminhamento_Segundos'] = (validos[config.COLUNA_ENCAMINHAMENTO] - validos[config.COLUNA_ABERTURA]).dt.total_seconds()
-    
-    df['Tempo_Agendamento_Segundos'] = pd.NaT
-    if config.COLUNA_ABERTURA in df.columns and config.COLUNA_AGENDAMENTO in df.columns:
-        validos = df[[config.COLUNA_ABERTURA, config.COLUNA_AGENDAMENTO]].dropna()
-        if not validos.empty:
-            df['Tempo_Agendamento_Segundos'] = (validos[config.COLUNA_AGENDAMENTO] - validos[config.COLUNA_ABERTURA]).dt.total_seconds()
-            
-    if config.COLUNA_LATITUDE in df.columns:
-        df[config.COLUNA_LATITUDE] = pd.to_numeric(df[config.COLUNA_LATITUDE], errors='coerce')
-    if config.COLUNA_LONGITUDE in df.columns:
-        df[config.COLUNA_LONGITUDE] = pd.to_numeric(df[config.COLUNA_LONGITUDE], errors='coerce')
-
-    return df
-
-# ---- Início da Interface do App ----
-st.title("📊 Visão Geral dos Atendimentos")
-
-st.sidebar.header("Controles do Dashboard")
-uploaded_file = st.sidebar.file_uploader("Faça o upload do seu arquivo (XLSX com mapa)", type=["xlsx"])
-
-if st.sidebar.button("Limpar Dados e Recarregar"):
-    st.session_state.clear()
-    st.experimental_rerun()
-
-df = None 
-if uploaded_file is not None:
-    df = carregar_e_processar(uploaded_file)
-    if df is not None:
-        if config.COLUNA_LATITUDE not in df.columns or config.COLUNA_LONGITUDE not in df.columns:
-            st.warning("Atenção: Este arquivo não contém dados de mapa (latitude/longitude). Rode o script 'geocode.py' no seu arquivo original primeiro.")
-        st.session_state['df_original'] = df
-        st.sidebar.success("Arquivo carregado!")
-        
-elif 'df_original' in st.session_state:
-    df = st.session_state['df_original']
-else:
-    st.info("Por favor, faça o upload do seu arquivo 'relatorio_com_mapa.xlsx' na barra lateral.")
-    st.stop() 
-
-if df is None:
-    st.error("Erro ao carregar o dataframe.")
-    st.stop()
-
-# ---- CÁLCULO SLA DINÂMICO E TEMPO DECORRIDO ----
-df_processado = df.copy()
-
-# 1. Calcula Tempo Decorrido (Ao Vivo)
-if config.COLUNA_ABERTURA in df_processado.columns:
-    agora = pd.Timestamp.now()
-    df_processado['Tempo_Decorrido_Segundos'] = (agora - df_processado[config.COLUNA_ABERTURA]).dt.total_seconds()
-else:
-    df_processado['Tempo_Decorrido_Segundos'] = pd.NaT
-
-# 2. Calcula SLA Dinâmico por Linha e Tempo Restante
-if config.COLUNA_ASSUNTO in df_processado.columns:
-    df_sla_info = df_processado[config.COLUNA_ASSUNTO].apply(config.obter_sla_segundos).apply(pd.Series)
-    df_sla_info.columns = ['SLA_Total_Segundos', 'SLA_Alerta_Segundos']
-    df_processado = pd.concat([df_processado, df_sla_info], axis=1)
-
-    df_processado['Tempo_Restante_Segundos'] = df_processado['SLA_Total_Segundos'] - df_processado['Tempo_Decorrido_Segundos']
-else:
-    st.warning("Coluna 'Assunto' não encontrada. Usando SLA padrão de 24h.")
-    pass
-
-
-st.session_state['df_processado'] = df_processado
-
-# Verifica colunas essenciais
-colunas_essenciais = [config.COLUNA_CIDADE, config.COLUNA_STATUS, config.COLUNA_ABERTURA, config.COLUNA_ID_CLIENTE, config.COLUNA_NOME_CLIENTE]
-colunas_faltando = [col for col in colunas_essenciais if col not in df_processado.columns]
-
-if colunas_faltando:
-    st.error(f"Erro: Colunas essenciais não encontradas: {', '.join(colunas_faltando)}")
-    st.error("Você fez o upload do 'relatorio_com_mapa.xlsx' (o arquivo novo) ou do arquivo original?")
-    st.info("O dashboard agora espera o arquivo gerado pelo script 'geocode.py', pois ele tem os cabeçalhos na Linha 1.")
-    st.stop()
-
-# ---- Filtros na Barra Lateral (Para esta página) ----
-st.sidebar.subheader("Filtros da Visão Geral")
-df_filtrado = df_processado.copy() 
-
-cidades_selecionadas = st.sidebar.multiselect(
-    f'Filtrar por {config.COLUNA_CIDADE}',
-    options=sorted(df[config.COLUNA_CIDADE].dropna().unique()),
-    default=[],
-    key='main_cidade' 
-)
-tecnicos_selecionados = []
-if config.COLUNA_TECNICO in df.columns:
-    tecnicos_selecionados = st.sidebar.multiselect(
-        f'Filtrar por {config.COLUNA_TECNICO}',
-        options=sorted(df[config.COLUNA_TECNICO].dropna().unique()),
-        default=[],
-        key='main_tecnico' 
-    )
-assuntos_selecionados = []
-if config.COLUNA_ASSUNTO in df.columns:
-    assuntos_selecionados = st.sidebar.multiselect(
-        f'Filtrar por {config.COLUNA_ASSUNTO}',
-        options=sorted(df[config.COLUNA_ASSUNTO].dropna().unique()),
-        default=[],
-        key='main_assunto' 
-    )
-
-# --- Filtro de Status com Checkbox (Flags) ---
-status_selecionados = []
-if config.COLUNA_STATUS in df.columns:
-    st.sidebar.subheader(f"Filtrar por {config.COLUNA_STATUS}")
-    opcoes_status = sorted(df[config.COLUNA_STATUS].dropna().unique())
-    
-    for status in opcoes_status:
-        if st.sidebar.checkbox(status, value=True, key=f"main_status_{status}"):
-            status_selecionados.append(status)
-
-# --- Lógica de Filtro ---
-if cidades_selecionadas:
-    df_filtrado = df_filtrado[df_filtrado[config.COLUNA_CIDADE].isin(cidades_selecionadas)]
-if tecnicos_selecionados and config.COLUNA_TECNICO in df_filtrado.columns:
-    df_filtrado = df_filtrado[df_filtrado[config.COLUNA_TECNICO].isin(tecnicos_selecionados)]
-if assuntos_selecionados and config.COLUNA_ASSUNTO in df_filtrado.columns:
-    df_filtrado = df_filtrado[df_filtrado[config.COLUNA_ASSUNTO].isin(assuntos_selecionados)]
-if config.COLUNA_STATUS in df_filtrado.columns:
-    df_filtrado = df_filtrado[df_filtrado[config.COLUNA_STATUS].isin(status_selecionados)]
-
-
-# ---- SEÇÃO 1: Métricas Gerais (Agendamento / Encaminhamento) ----
-st.header("Métricas Gerais de Tempo (Baseado nos Filtros)")
-
-mediana_agendamento_seg = df_filtrado['Tempo_Agendamento_Segundos'].dropna().median()
-media_agendamento_seg = df_filtrado['Tempo_Agendamento_Segundos'].dropna().mean()
-mediana_encaminhamento_seg = df_filtrado['Tempo_Encaminhamento_Segundos'].dropna().median()
-media_encaminhamento_seg = df_filtrado['Tempo_Encaminhamento_Segundos'].dropna().mean()
-
-col1, col2 = st.columns(2)
-with col1:
-    st.subheader("Abertura até Agendamento (AD)")
-    st.metric(label="Tempo Médio (H:M:S)", value=config.formatar_hms(media_agendamento_seg))
-    st.metric(label="Tempo Mediano (H:M:S)", value=config.formatar_hms(mediana_agendamento_seg))
-with col2:
-    st.subheader("Abertura até Encaminhamento (X)")
-    st.metric(label="Tempo Médio (H:M:S)", value=config.formatar_hms(media_encaminhamento_seg))
-    st.metric(label="Tempo Mediano (H:M:S)", value=config.formatar_hms(mediana_encaminhamento_seg))
-
-
-st.markdown("---")
-
-# ---- SEÇÃO 2: Análises Gerais e Lista Resumida ----
-st.header("Análises Gerais das Categorias (Baseado nos Filtros)")
-
-col_graf1, col_graf2 = st.columns(2)
-with col_graf1:
-    if config.COLUNA_CIDADE in df_filtrado.columns:
-        st.subheader(f"Chamados por {config.COLUNA_CIDADE} (Top 10)")
-        top_cidades = df_filtrado[config.COLUNA_CIDADE].value_counts().nlargest(10).reset_index()
-        fig_cidade = px.bar(top_cidades, x='count', y=config.COLUNA_CIDADE, orientation='h', 
-                            title=f"Top 10 Cidades", text_auto=True)
-        fig_cidade.update_layout(yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_cidade, use_container_width=True)
-    if config.COLUNA_ASSUNTO in df_filtrado.columns:
-        st.subheader(f"Chamados por {config.COLUNA_ASSUNTO} (Top 10)")
-        top_assuntos = df_filtrado[config.COLUNA_ASSUNTO].value_counts().nlargest(10).reset_index()
-        fig_assunto = px.bar(top_assuntos, x='count', y=config.COLUNA_ASSUNTO, orientation='h', 
-                             title=f"Top 10 Assuntos", text_auto=True)
-        fig_assunto.update_layout(yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_assunto, use_container_width=True)
-with col_graf2:
-    if config.COLUNA_TECNICO in df_filtrado.columns:
-        st.subheader(f"Chamados por {config.COLUNA_TECNICO} (Top 10)")
-        top_tecnicos = df_filtrado[config.COLUNA_TECNICO].value_counts().nlargest(10).reset_index()
-        fig_tecnico = px.bar(top_tecnicos, x='count', y=config.COLUNA_TECNICO, orientation='h', 
-                             title=f"Top 10 Técnicos", text_auto=True)
-        fig_tecnico.update_layout(yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_tecnico, use_container_width=True)
-    if config.COLUNA_STATUS in df_filtrado.columns:
-        st.subheader(f"Chamados por {config.COLUNA_STATUS}")
-        status_counts = df_filtrado[config.COLUNA_STATUS].value_counts().reset_index()
-        fig_status = px.pie(status_counts, names=config.COLUNA_STATUS, values='count', 
-                            title="Distribuição de Status")
-        st.plotly_chart(fig_status, use_container_width=True)
-
-# ---- (SEÇÃO DE MAPA) ----
-st.markdown("---")
-st.header("Mapa de Chamados (Baseado nos Filtros)")
-
-if config.COLUNA_LATITUDE in df_filtrado.columns and config.COLUNA_LONGITUDE in df_filtrado.columns:
-    df_mapa = df_filtrado.dropna(subset=[config.COLUNA_LATITUDE, config.COLUNA_LONGITUDE])
-    
-    if df_mapa.empty:
-        st.info("Nenhum chamado com coordenadas válidas encontrado para os filtros atuais.")
-    else:
-        mapa_folium = config.criar_mapa_folium(df_mapa)
-        st_folium(mapa_folium, use_container_width=True, height=400, returned_objects=[])
-else:
-    st.warning("Colunas 'latitude' ou 'longitude' não encontradas. O mapa não pode ser exibido.")
-
-# ---- Lista Resumida ----
-st.markdown("---")
-st.subheader("Lista Resumida (Todos os Chamados nos Filtros)")
-
-colunas_lista_all = [
-    config.COLUNA_ID_CLIENTE, config.COLUNA_CIDADE, config.COLUNA_ASSUNTO, 
-    config.COLUNA_STATUS, config.COLUNA_ABERTURA, config.COLUNA_AGENDAMENTO,
-    'Tempo_Decorrido_Segundos'
-]
-if config.COLUNA_TECNICO in df_filtrado.columns:
-    colunas_lista_all.insert(4, config.COLUNA_TECNICO) 
-colunas_lista_all = [col for col in colunas_lista_all if col in df_filtrado.columns]
-
-df_display_all = df_filtrado[colunas_lista_all].sort_values(by='Tempo_Decorrido_Segundos', ascending=False).copy()
-
-df_display_all['Data Abertura'] = df_display_all[config.COLUNA_ABERTURA].dt.strftime('%d/%m/%y %H:%M')
-df_display_all['Data Agendamento'] = df_display_all[config.COLUNA_AGENDAMENTO].dt.strftime('%d/%m/%y %H:%M')
-df_display_all['Tempo Aberto (H:M:S)'] = df_display_all['Tempo_Decorrido_Segundos'].apply(config.formatar_hms)
-
-colunas_finais_all = [
-    config.COLUNA_ID_CLIENTE, config.COLUNA_CIDADE, config.COLUNA_ASSUNTO, 
-    config.COLUNA_STATUS, 'Data Abertura', 'Data Agendamento', 'Tempo Aberto (H:M:S)'
-]
-if config.COLUNA_TECNICO in df_display_all.columns:
-    colunas_finais_all.insert(4, config.COLUNA_TECNICO) 
-
-st.dataframe(df_display_all[colunas_finais_all], use_container_width=True)
-
-
-with st.expander("Ver dados filtrados completos"):
-    st.dataframe(df_filtrado)
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import openpyxl
+from datetime import datetime
+import config # Importa o arquivo de configuração
+import dados # Leitura e processamento da planilha (com snapshots)
+import streamlit.components.v1 as components
+import cache_mapas # Mapas renderizados em cache
+import tabelas # Tabelas paginadas (busca/ordenação no servidor)
+import monitor_pasta # Exportações da pasta monitorada, processadas em segundo plano
+import agendador_sla # Avisos de SLA da versão publicada (o agendador começa ao importar)
+import envelhecimento # Curva de backlog (linha de varredura sobre os eventos dos chamados)
+
+# Configuração da página
+st.set_page_config(layout="wide")
+
+# ---- Função de Carregamento de Dados ----
+def carregar_e_processar(arquivo_upado):
+    """
+    Registra a planilha no registro compartilhado e retorna a chave (hash do conteúdo).
+    O hash é calculado uma única vez por upload; o DataFrame fica em 'dados.REGISTRO',
+    o mesmo para todas as sessões.
+    """
+    if st.session_state.get('dataset_upload_id') == arquivo_upado.file_id:
+        return st.session_state['dataset_chave']
+
+    try:
+        chave = dados.REGISTRO.carregar(arquivo_upado.getvalue())
+    except Exception as e:
+        st.error(f"Erro ao ler o arquivo Excel (XLSX): {e}")
+        return None
+
+    st.session_state['dataset_upload_id'] = arquivo_upado.file_id
+    return chave
+
+def contar_valores(serie):
+    """value_counts sem as categorias ausentes nos filtros atuais (colunas 'category' listam todas)."""
+    contagens = serie.value_counts()
+    return contagens[contagens > 0]
+
+def megabytes(n_bytes):
+    return f"{n_bytes / 1024 ** 2:.1f} MB"
+
+# ---- Início da Interface do App ----
+st.title("📊 Visão Geral dos Atendimentos")
+
+st.sidebar.header("Controles do Dashboard")
+uploaded_file = st.sidebar.file_uploader("Faça o upload do seu arquivo (XLSX com mapa)", type=["xlsx"])
+
+if st.sidebar.button("Limpar Dados e Recarregar"):
+    st.session_state.clear()
+    st.experimental_rerun()
+
+# ---- Pasta Monitorada ----
+# Versão publicada pelo monitor (processada fora da rerun): todas as sessões passam para ela
+versao_pasta = monitor_pasta.acompanhar_pasta(st.session_state)
+if monitor_pasta.MONITOR.ativo():
+    if versao_pasta is not None:
+        st.sidebar.caption(
+            f"📂 Pasta '{monitor_pasta.MONITOR.pasta}': versão {versao_pasta.numero} "
+            f"({versao_pasta.arquivo}, {versao_pasta.publicada_em:%d/%m %H:%M})"
+        )
+    if monitor_pasta.MONITOR.processando:
+        st.sidebar.caption(f"⏳ Processando {monitor_pasta.MONITOR.processando}...")
+    if monitor_pasta.MONITOR.ultimo_erro:
+        st.sidebar.warning(f"Monitor da pasta: {monitor_pasta.MONITOR.ultimo_erro}")
+
+# ---- Atualização Incremental ----
+# Mescla uma exportação nova no dataset atual (por ID Cliente) sem reprocessar a planilha inteira
+if 'dataset_chave' in st.session_state:
+    with st.sidebar.expander("🔄 Atualização Incremental"):
+        with st.form("form_mesclagem", clear_on_submit=True):
+            arquivo_mesclagem = st.file_uploader("Exportação com as mudanças (XLSX)", type=["xlsx"], key='upload_mesclagem')
+            modo_mesclagem = st.radio(
+                "Conteúdo do arquivo",
+                [dados.MODO_DELTA, dados.MODO_COMPLETO],
+                format_func=lambda modo: {
+                    dados.MODO_DELTA: "Só chamados novos/alterados",
+                    dados.MODO_COMPLETO: "Exportação completa (retira os ausentes)",
+                }[modo],
+                key='modo_mesclagem'
+            )
+            if st.form_submit_button("Mesclar no dataset atual") and arquivo_mesclagem is not None:
+                try:
+                    chave_mesclada, resumo = dados.REGISTRO.mesclar(
+                        st.session_state['dataset_chave'], arquivo_mesclagem.getvalue(), modo_mesclagem
+                    )
+                    st.session_state['dataset_chave'] = chave_mesclada
+                    st.session_state['resumo_mesclagem'] = resumo
+                except Exception as e:
+                    st.error(f"Erro ao mesclar o arquivo: {e}")
+        resumo = st.session_state.get('resumo_mesclagem')
+        if resumo:
+            st.success(
+                f"Última mesclagem: {resumo['novos']} novos, {resumo['alterados']} alterados, "
+                f"{resumo['resolvidos']} resolvidos ({resumo['retirados']} retirados). Total: {resumo['total']} chamados."
+            )
+
+df = None 
+if uploaded_file is not None:
+    chave = carregar_e_processar(uploaded_file)
+    if chave is not None:
+        st.session_state['dataset_chave'] = chave
+        df = dados.REGISTRO.obter(chave)
+        if df is not None:
+            if config.COLUNA_LATITUDE not in df.columns or config.COLUNA_LONGITUDE not in df.columns:
+                st.warning("Atenção: Este arquivo não contém dados de mapa (latitude/longitude). Rode o script 'geocode.py' no seu arquivo original primeiro.")
+            st.sidebar.success("Arquivo carregado!")
+        
+elif 'dataset_chave' in st.session_state:
+    df = dados.REGISTRO.obter(st.session_state['dataset_chave'])
+else:
+    st.info(
+        "Por favor, faça o upload do seu arquivo 'relatorio_com_mapa.xlsx' na barra lateral "
+        f"(ou salve a exportação na pasta '{monitor_pasta.PASTA_EXPORTACOES}')."
+    )
+    st.stop() 
+
+if df is None:
+    st.error("Erro ao carregar o dataframe.")
+    st.stop()
+
+# ---- Memória do Dataset ----
+with st.sidebar.expander("💾 Memória do Dataset"):
+    memoria_atual = int(df.memory_usage(index=True, deep=True).sum())
+    memoria_original = df.attrs.get('memoria_original_bytes')
+    st.write(f"Em memória: **{megabytes(memoria_atual)}** ({len(df.columns)} colunas, {len(df)} linhas)")
+    if memoria_original:
+        st.write(f"Antes da compactação: {megabytes(memoria_original)} ({memoria_original / max(memoria_atual, 1):.1f}x maior)")
+    st.write(f"Registro compartilhado: {megabytes(dados.REGISTRO.memoria_usada())} de {megabytes(dados.REGISTRO.memoria_max_bytes)}")
+    st.dataframe(dados.relatorio_memoria(df), use_container_width=True)
+
+if config.COLUNA_ASSUNTO not in df.columns:
+    st.warning("Coluna 'Assunto' não encontrada. Usando SLA padrão de 24h.")
+
+# Verifica colunas essenciais
+colunas_essenciais = [config.COLUNA_CIDADE, config.COLUNA_STATUS, config.COLUNA_ABERTURA, config.COLUNA_ID_CLIENTE, config.COLUNA_NOME_CLIENTE]
+colunas_faltando = [col for col in colunas_essenciais if col not in df.columns]
+
+if colunas_faltando:
+    st.error(f"Erro: Colunas essenciais não encontradas: {', '.join(colunas_faltando)}")
+    st.error("Você fez o upload do 'relatorio_com_mapa.xlsx' (o arquivo novo) ou do arquivo original?")
+    st.info("O dashboard agora espera o arquivo gerado pelo script 'geocode.py', pois ele tem os cabeçalhos na Linha 1.")
+    st.stop()
+
+# ---- Filtros na Barra Lateral (Para esta página) ----
+st.sidebar.subheader("Filtros da Visão Geral")
+
+# Índice dos filtros (montado uma vez por dataset): opções e seleções sem varrer o DataFrame
+indice = dados.REGISTRO.indice_filtros(st.session_state['dataset_chave'])
+
+cidades_selecionadas = st.sidebar.multiselect(
+    f'Filtrar por {config.COLUNA_CIDADE}',
+    options=indice.opcoes(config.COLUNA_CIDADE),
+    default=[],
+    key='main_cidade' 
+)
+tecnicos_selecionados = []
+if indice.tem_coluna(config.COLUNA_TECNICO):
+    tecnicos_selecionados = st.sidebar.multiselect(
+        f'Filtrar por {config.COLUNA_TECNICO}',
+        options=indice.opcoes(config.COLUNA_TECNICO),
+        default=[],
+        key='main_tecnico' 
+    )
+assuntos_selecionados = []
+if indice.tem_coluna(config.COLUNA_ASSUNTO):
+    assuntos_selecionados = st.sidebar.multiselect(
+        f'Filtrar por {config.COLUNA_ASSUNTO}',
+        options=indice.opcoes(config.COLUNA_ASSUNTO),
+        default=[],
+        key='main_assunto' 
+    )
+
+# --- Filtro de Status com Checkbox (Flags) ---
+status_selecionados = []
+if indice.tem_coluna(config.COLUNA_STATUS):
+    st.sidebar.subheader(f"Filtrar por {config.COLUNA_STATUS}")
+    opcoes_status = indice.opcoes(config.COLUNA_STATUS)
+    
+    for status in opcoes_status:
+        if st.sidebar.checkbox(status, value=True, key=f"main_status_{status}"):
+            status_selecionados.append(status)
+
+# --- Lógica de Filtro ---
+# Cada filtro vira uma máscara; a seleção das linhas acontece uma única vez no final
+mascara = indice.todas()
+if cidades_selecionadas:
+    mascara &= indice.mascara(config.COLUNA_CIDADE, cidades_selecionadas)
+if tecnicos_selecionados:
+    mascara &= indice.mascara(config.COLUNA_TECNICO, tecnicos_selecionados)
+if assuntos_selecionados:
+    mascara &= indice.mascara(config.COLUNA_ASSUNTO, assuntos_selecionados)
+if indice.tem_coluna(config.COLUNA_STATUS):
+    mascara &= indice.mascara(config.COLUNA_STATUS, status_selecionados)
+
+# ---- CÁLCULO SLA DINÂMICO E TEMPO DECORRIDO ----
+# Só das linhas filtradas: o dataset compartilhado não é copiado
+df_filtrado = dados.calcular_tempos_ao_vivo(df[mascara] if not mascara.all() else df)
+
+
+# ---- SEÇÃO 1: Métricas Gerais (Agendamento / Encaminhamento) ----
+st.header("Métricas Gerais de Tempo (Baseado nos Filtros)")
+
+mediana_agendamento_seg = df_filtrado['Tempo_Agendamento_Segundos'].dropna().median()
+media_agendamento_seg = df_filtrado['Tempo_Agendamento_Segundos'].dropna().mean()
+mediana_encaminhamento_seg = df_filtrado['Tempo_Encaminhamento_Segundos'].dropna().median()
+media_encaminhamento_seg = df_filtrado['Tempo_Encaminhamento_Segundos'].dropna().mean()
+
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("Abertura até Agendamento (AD)")
+    st.metric(label="Tempo Médio (H:M:S)", value=config.formatar_hms(media_agendamento_seg))
+    st.metric(label="Tempo Mediano (H:M:S)", value=config.formatar_hms(mediana_agendamento_seg))
+with col2:
+    st.subheader("Abertura até Encaminhamento (X)")
+    st.metric(label="Tempo Médio (H:M:S)", value=config.formatar_hms(media_encaminhamento_seg))
+    st.metric(label="Tempo Mediano (H:M:S)", value=config.formatar_hms(mediana_encaminhamento_seg))
+
+
+st.markdown("---")
+
+# ---- Backlog ao Longo do Tempo ----
+st.header("Backlog ao Longo do Tempo (Baseado nos Filtros)")
+OPCOES_PASSO_BACKLOG = {"1 hora": '1h', "6 horas": '6h', "1 dia": '1D', "1 semana": '7D'}
+rotulo_passo = st.selectbox("Intervalo entre os pontos", list(OPCOES_PASSO_BACKLOG), index=2, key='main_backlog_passo')
+df_backlog = envelhecimento.curva_backlog(df_filtrado, passo=OPCOES_PASSO_BACKLOG[rotulo_passo])
+if df_backlog.empty:
+    st.info("Sem datas de abertura para montar a curva de backlog.")
+else:
+    fig_backlog = px.line(
+        df_backlog, x='Instante', y=[col for col in envelhecimento.ETAPAS_BACKLOG if col in df_backlog.columns],
+        labels={'value': 'Chamados', 'variable': 'Etapa'}
+    )
+    st.plotly_chart(fig_backlog, use_container_width=True)
+
+st.markdown("---")
+
+# ---- SEÇÃO 2: Análises Gerais e Lista Resumida ----
+st.header("Análises Gerais das Categorias (Baseado nos Filtros)")
+
+col_graf1, col_graf2 = st.columns(2)
+with col_graf1:
+    if config.COLUNA_CIDADE in df_filtrado.columns:
+        st.subheader(f"Chamados por {config.COLUNA_CIDADE} (Top 10)")
+        top_cidades = contar_valores(df_filtrado[config.COLUNA_CIDADE]).nlargest(10).reset_index()
+        fig_cidade = px.bar(top_cidades, x='count', y=config.COLUNA_CIDADE, orientation='h', 
+                            title=f"Top 10 Cidades", text_auto=True)
+        fig_cidade.update_layout(yaxis={'categoryorder':'total ascending'})
+        st.plotly_chart(fig_cidade, use_container_width=True)
+    if config.COLUNA_ASSUNTO in df_filtrado.columns:
+        st.subheader(f"Chamados por {config.COLUNA_ASSUNTO} (Top 10)")
+        top_assuntos = contar_valores(df_filtrado[config.COLUNA_ASSUNTO]).nlargest(10).reset_index()
+        fig_assunto = px.bar(top_assuntos, x='count', y=config.COLUNA_ASSUNTO, orientation='h', 
+                             title=f"Top 10 Assuntos", text_auto=True)
+        fig_assunto.update_layout(yaxis={'categoryorder':'total ascending'})
+        st.plotly_chart(fig_assunto, use_container_width=True)
+with col_graf2:
+    if config.COLUNA_TECNICO in df_filtrado.columns:
+        st.subheader(f"Chamados por {config.COLUNA_TECNICO} (Top 10)")
+        top_tecnicos = contar_valores(df_filtrado[config.COLUNA_TECNICO]).nlargest(10).reset_index()
+        fig_tecnico = px.bar(top_tecnicos, x='count', y=config.COLUNA_TECNICO, orientation='h', 
+                             title=f"Top 10 Técnicos", text_auto=True)
+        fig_tecnico.update_layout(yaxis={'categoryorder':'total ascending'})
+        st.plotly_chart(fig_tecnico, use_container_width=True)
+    if config.COLUNA_STATUS in df_filtrado.columns:
+        st.subheader(f"Chamados por {config.COLUNA_STATUS}")
+        status_counts = contar_valores(df_filtrado[config.COLUNA_STATUS]).reset_index()
+        fig_status = px.pie(status_counts, names=config.COLUNA_STATUS, values='count', 
+                            title="Distribuição de Status")
+        st.plotly_chart(fig_status, use_container_width=True)
+
+# ---- (SEÇÃO DE MAPA) ----
+st.markdown("---")
+st.header("Mapa de Chamados (Baseado nos Filtros)")
+
+if config.COLUNA_LATITUDE in df_filtrado.columns and config.COLUNA_LONGITUDE in df_filtrado.columns:
+    coordenadas_validas = df_filtrado[[config.COLUNA_LATITUDE, config.COLUNA_LONGITUDE]].notna().all(axis=1)
+    
+    if not coordenadas_validas.any():
+        st.info("Nenhum chamado com coordenadas válidas encontrado para os filtros atuais.")
+    else:
+        # Mapa pronto (HTML) em cache por dataset + filtros + minuto: só é montado quando algo disso muda
+        mapa_html = cache_mapas.html_mapa(
+            st.session_state['dataset_chave'], 'visao_geral', mascara,
+            lambda: config.criar_mapa_folium(df_filtrado[coordenadas_validas])
+        )
+        components.html(mapa_html, height=400)
+else:
+    st.warning("Colunas 'latitude' ou 'longitude' não encontradas. O mapa não pode ser exibido.")
+
+# ---- Lista Resumida ----
+st.markdown("---")
+st.subheader("Lista Resumida (Todos os Chamados nos Filtros)")
+
+# Busca, ordenação e paginação no servidor: só a página exibida é formatada e enviada ao navegador
+def formatar_lista_resumida(posicoes):
+    df_pagina = df_filtrado.iloc[posicoes]
+    colunas_lista_all = [config.COLUNA_ID_CLIENTE, config.COLUNA_CIDADE, config.COLUNA_ASSUNTO, config.COLUNA_STATUS]
+    if config.COLUNA_TECNICO in df_pagina.columns:
+        colunas_lista_all.insert(4, config.COLUNA_TECNICO) 
+    df_display_all = df_pagina[[col for col in colunas_lista_all if col in df_pagina.columns]].copy()
+    df_display_all['Data Abertura'] = df_pagina[config.COLUNA_ABERTURA].dt.strftime('%d/%m/%y %H:%M')
+    if config.COLUNA_AGENDAMENTO in df_pagina.columns:
+        df_display_all['Data Agendamento'] = df_pagina[config.COLUNA_AGENDAMENTO].dt.strftime('%d/%m/%y %H:%M')
+    df_display_all['Tempo Aberto (H:M:S)'] = config.formatar_hms_array(df_pagina['Tempo_Decorrido_Segundos'])
+    return df_display_all
+
+colunas_ordenacao_lista = {
+    'Tempo Aberto': 'Tempo_Decorrido_Segundos',
+    config.COLUNA_ID_CLIENTE: config.COLUNA_ID_CLIENTE,
+    config.COLUNA_CIDADE: config.COLUNA_CIDADE,
+    config.COLUNA_ASSUNTO: config.COLUNA_ASSUNTO,
+    config.COLUNA_TECNICO: config.COLUNA_TECNICO,
+    config.COLUNA_STATUS: config.COLUNA_STATUS,
+    'Data Abertura': config.COLUNA_ABERTURA,
+    'Data Agendamento': config.COLUNA_AGENDAMENTO,
+}
+tabelas.tabela_paginada(
+    df_filtrado, 'main_lista', formatar_lista_resumida,
+    colunas_busca=[config.COLUNA_ID_CLIENTE, config.COLUNA_NOME_CLIENTE, config.COLUNA_CIDADE,
+                   config.COLUNA_ASSUNTO, config.COLUNA_TECNICO, config.COLUNA_STATUS],
+    colunas_ordenacao={rotulo: col for rotulo, col in colunas_ordenacao_lista.items() if col in df_filtrado.columns},
+    ordem_padrao=('Tempo_Decorrido_Segundos', False),
+)
+
+
+with st.expander("Ver dados filtrados completos"):
+    # Os dados completos vão para download; na tela, só a página atual
+    tabelas.botao_download(df_filtrado, "chamados_filtrados.csv", 'main_download')
+    tabelas.tabela_paginada(
+        df_filtrado, 'main_completos', lambda posicoes: df_filtrado.iloc[posicoes],
+        colunas_busca=[config.COLUNA_ID_CLIENTE, config.COLUNA_NOME_CLIENTE, config.COLUNA_CIDADE,
+                       config.COLUNA_ASSUNTO, config.COLUNA_TECNICO, config.COLUNA_STATUS],
+        colunas_ordenacao={col: col for col in df_filtrado.columns},
+    )
@@ -0,0 +1,331 @@
+import numpy as np
+import pandas as pd
+
+import config
+import rotas
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError: # Sem scipy só o método guloso fica disponível
+    linear_sum_assignment = None
+
+# --- Configuração do Despacho ---
+METODO_GULOSO = 'guloso'
+METODO_HUNGARO = 'hungaro'
+METODOS = {
+    METODO_GULOSO: "Guloso (mais urgente primeiro)",
+    METODO_HUNGARO: "Ótimo (algoritmo húngaro)",
+}
+TAMANHO_CELULA_GRAUS = 0.05    # Células do índice espacial (~5,5 km)
+PARADAS_CANDIDATAS = 20        # Paradas mais próximas consultadas por chamado: só os técnicos delas são candidatos
+DISTANCIA_SEM_CANDIDATO_KM = 10_000.0 # Custo (húngaro) de um técnico fora dos candidatos do chamado
+LOTE_HUNGARO = 500             # Chamados por atribuição ótima (lotes do mais urgente ao menos urgente)
+FOLGA_VAGAS_HUNGARO = 1.5      # Sem limite de fila, cada técnico tem vagas até 1,5x a divisão igual
+PESO_CARGA_KM = 5.0            # Cada chamado já na fila do técnico "custa" como 5 km a mais de deslocamento
+PESO_ATRASO_KM = 50.0          # Penalidade quando a chegada prevista passa do prazo do SLA
+MAX_CHAMADOS_POR_TECNICO = None # Fila máxima por técnico (contando os que ele já tem); None = sem limite
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Distância em km (linha reta), com broadcasting entre os arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * rotas.RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def metodos_disponiveis():
+    """Métodos de atribuição que rodam neste ambiente (o húngaro precisa do scipy)."""
+    return [m for m in METODOS if m != METODO_HUNGARO or linear_sum_assignment is not None]
+
+
+# ---- ÍNDICE ESPACIAL (GRADE) ----
+class IndiceEspacial:
+    """
+    Grade regular de células lat/lon: cada ponto fica na lista da sua célula. A busca dos K mais
+    próximos percorre anéis de células em volta do ponto e para quando nenhum anel mais distante
+    pode ter um ponto mais perto que o K-ésimo já encontrado.
+    """
+
+    def __init__(self, latitudes, longitudes, tamanho_celula=TAMANHO_CELULA_GRAUS):
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.tamanho_celula = tamanho_celula
+        linhas = np.floor(self.latitudes / tamanho_celula).astype(np.int64)
+        colunas = np.floor(self.longitudes / tamanho_celula).astype(np.int64)
+        self.celulas = {}
+        for posicao, celula in enumerate(zip(linhas.tolist(), colunas.tolist())):
+            self.celulas.setdefault(celula, []).append(posicao)
+        self.celulas = {celula: np.array(posicoes) for celula, posicoes in self.celulas.items()}
+        if self.celulas:
+            self.limites = (linhas.min(), linhas.max(), colunas.min(), colunas.max())
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def mais_proximos(self, latitude, longitude, k):
+        """(posições, distâncias em km) dos K pontos mais próximos, do mais perto para o mais longe."""
+        if not self.celulas or k <= 0:
+            return np.array([], dtype=int), np.array([])
+        k = min(k, len(self))
+        linha = int(np.floor(latitude / self.tamanho_celula))
+        coluna = int(np.floor(longitude / self.tamanho_celula))
+        min_linha, max_linha, min_coluna, max_coluna = self.limites
+        # A partir deste anel todas as células com pontos já foram vistas
+        ultimo_anel = max(abs(linha - min_linha), abs(linha - max_linha), abs(coluna - min_coluna), abs(coluna - max_coluna))
+
+        candidatos, total = [], 0
+        for anel in range(ultimo_anel + 1):
+            for celula in self.celulas_do_anel(linha, coluna, anel):
+                if celula in self.celulas:
+                    candidatos.append(self.celulas[celula])
+                    total += len(self.celulas[celula])
+            if total >= k:
+                posicoes = np.concatenate(candidatos)
+                distancias = haversine(latitude, longitude, self.latitudes[posicoes], self.longitudes[posicoes])
+                # Pontos fora dos anéis já vistos estão a pelo menos 'anel' larguras de célula
+                lat_mais_distante = min(abs(latitude) + (anel + 1) * self.tamanho_celula, 89.0)
+                km_por_celula = self.tamanho_celula * 111.0 * np.cos(np.radians(lat_mais_distante))
+                if np.partition(distancias, k - 1)[k - 1] <= anel * km_por_celula:
+                    break
+
+        posicoes = np.concatenate(candidatos)
+        distancias = haversine(latitude, longitude, self.latitudes[posicoes], self.longitudes[posicoes])
+        ordem = np.argsort(distancias, kind='stable')[:k]
+        return posicoes[ordem], distancias[ordem]
+
+    @staticmethod
+    def celulas_do_anel(linha, coluna, anel):
+        if anel == 0:
+            return [(linha, coluna)]
+        celulas = []
+        for d in range(-anel, anel + 1):
+            celulas += [(linha - anel, coluna + d), (linha + anel, coluna + d)]
+        for d in range(-anel + 1, anel):
+            celulas += [(linha + d, coluna - anel), (linha + d, coluna + anel)]
+        return celulas
+
+
+# ---- DESPACHO ----
+class Despacho:
+    """
+    Chamados abertos sem técnico x rotas atuais dos técnicos.
+
+    A posição de um técnico é a sua rota: a distância de um chamado até o técnico é a distância até a
+    parada mais próxima dessa rota (custo aproximado de encaixar o chamado nela). As paradas de todos
+    os técnicos ficam num índice espacial: cada chamado só é comparado com os técnicos que têm
+    paradas entre as mais próximas dele.
+    """
+
+    def __init__(self, df_abertos):
+        tem_coordenadas = df_abertos[config.COLUNA_LATITUDE].notna() & df_abertos[config.COLUNA_LONGITUDE].notna()
+        if config.COLUNA_TECNICO in df_abertos.columns:
+            sem_tecnico = df_abertos[config.COLUNA_TECNICO].isna()
+        else:
+            sem_tecnico = pd.Series(True, index=df_abertos.index)
+
+        self.pendentes = df_abertos[tem_coordenadas & sem_tecnico]
+        self.lat = self.pendentes[config.COLUNA_LATITUDE].to_numpy(dtype=float)
+        self.lon = self.pendentes[config.COLUNA_LONGITUDE].to_numpy(dtype=float)
+        self.indice_pendentes = IndiceEspacial(self.lat, self.lon)
+        if 'Tempo_Restante_Segundos' in self.pendentes.columns:
+            self.restante = self.pendentes['Tempo_Restante_Segundos'].to_numpy(dtype=float)
+        else:
+            self.restante = np.full(len(self.pendentes), np.nan)
+
+        # Rotas atuais: paradas de cada técnico e o tamanho da fila
+        self.paradas_tecnicos = {}
+        self.carga = {}
+        com_tecnico = df_abertos[tem_coordenadas & ~sem_tecnico]
+        if not com_tecnico.empty:
+            for tecnico, posicoes in com_tecnico.groupby(config.COLUNA_TECNICO, observed=True).indices.items():
+                self.paradas_tecnicos[tecnico] = (
+                    com_tecnico[config.COLUNA_LATITUDE].to_numpy(dtype=float)[posicoes],
+                    com_tecnico[config.COLUNA_LONGITUDE].to_numpy(dtype=float)[posicoes],
+                )
+                self.carga[tecnico] = len(posicoes)
+        self.tecnicos = sorted(self.paradas_tecnicos)
+        self.proximos = {} # (técnico, k) -> resultado de 'chamados_proximos' (o despacho fica em cache entre reruns)
+
+        # Índice das paradas de todas as rotas; 'tecnico_da_parada' diz de qual técnico (posição em 'tecnicos')
+        paradas = [self.paradas_tecnicos[tecnico] for tecnico in self.tecnicos]
+        self.tecnico_da_parada = np.repeat(np.arange(len(paradas)), [len(lat) for lat, _ in paradas])
+        self.indice_paradas = IndiceEspacial(
+            np.concatenate([lat for lat, _ in paradas]) if paradas else [],
+            np.concatenate([lon for _, lon in paradas]) if paradas else [],
+        )
+
+    def memoria_bytes(self):
+        """Memória aproximada do despacho (pendentes e índices; as grades contam como os arrays), para o cache."""
+        arrays = [self.lat, self.lon, self.restante, self.tecnico_da_parada,
+                  self.indice_paradas.latitudes, self.indice_paradas.longitudes]
+        return int(self.pendentes.memory_usage(index=True, deep=True).sum()) + sum(a.nbytes for a in arrays) * 2
+
+    def chamados_proximos(self, tecnico, k=10):
+        """Os K chamados sem técnico mais próximos da rota do técnico (distância em km, com desvio viário)."""
+        if (tecnico, k) not in self.proximos:
+            self.proximos[(tecnico, k)] = self.calcular_proximos(tecnico, k)
+        return self.proximos[(tecnico, k)]
+
+    def calcular_proximos(self, tecnico, k):
+        latitudes, longitudes = self.paradas_tecnicos[tecnico]
+        melhores = {}
+        for lat, lon in zip(latitudes, longitudes):
+            posicoes, distancias = self.indice_pendentes.mais_proximos(lat, lon, k)
+            for posicao, distancia in zip(posicoes.tolist(), distancias.tolist()):
+                melhores[posicao] = min(distancia, melhores.get(posicao, np.inf))
+        selecionados = sorted(melhores, key=melhores.get)[:k]
+        resultado = self.pendentes.iloc[selecionados].copy()
+        resultado['Distancia_Km'] = [melhores[p] * rotas.FATOR_DESVIO_VIARIO for p in selecionados]
+        return resultado
+
+    def matriz_distancias(self, paradas_candidatas=PARADAS_CANDIDATAS):
+        """
+        Distância (km, com desvio viário) de cada chamado pendente até a rota dos técnicos candidatos:
+        os donos das K paradas mais próximas do chamado. Os demais técnicos ficam com distância infinita.
+        (A distância de um candidato é exata: a parada dele mais próxima está entre as K.)
+        Retorna também o raio de cada chamado (distância da K-ésima parada): nenhum técnico fora dos
+        candidatos está mais perto que isso.
+        """
+        distancias = np.full((len(self.lat), len(self.tecnicos)), np.inf)
+        raios = np.full(len(self.lat), np.inf)
+        for i, (lat, lon) in enumerate(zip(self.lat.tolist(), self.lon.tolist())):
+            posicoes, km = self.indice_paradas.mais_proximos(lat, lon, paradas_candidatas)
+            np.minimum.at(distancias[i], self.tecnico_da_parada[posicoes], km)
+            if len(km) == paradas_candidatas:
+                raios[i] = km[-1]
+        return distancias * rotas.FATOR_DESVIO_VIARIO, raios * rotas.FATOR_DESVIO_VIARIO
+
+    def distancias_rotas(self, i):
+        """Distância de um chamado até a rota de todos os técnicos (quando nenhum candidato serve)."""
+        km = haversine(self.lat[i], self.lon[i], self.indice_paradas.latitudes, self.indice_paradas.longitudes)
+        linha = np.full(len(self.tecnicos), np.inf)
+        np.minimum.at(linha, self.tecnico_da_parada, km)
+        return linha * rotas.FATOR_DESVIO_VIARIO
+
+    def custo(self, distancia_km, carga, restante):
+        """Distância + peso da fila do técnico + penalidade se a chegada prevista passar do prazo."""
+        chegada = carga * rotas.TEMPO_POR_PARADA_SEGUNDOS + distancia_km / rotas.VELOCIDADE_MEDIA_KMH * 3600
+        atrasa = np.nan_to_num(restante, nan=np.inf) < chegada
+        return distancia_km + PESO_CARGA_KM * carga + PESO_ATRASO_KM * atrasa
+
+    def sugerir(self, metodo=METODO_GULOSO, max_por_tecnico=MAX_CHAMADOS_POR_TECNICO):
+        """
+        Sugestão de técnico para cada chamado pendente. Retorna os pendentes com as colunas
+        'Tecnico_Sugerido', 'Distancia_Km' e 'Chegada_Apos_Prazo' (sem vaga = técnico vazio).
+        metodo: 'guloso' (sempre disponível) ou 'hungaro' (precisa do scipy).
+        """
+        if metodo not in METODOS:
+            raise ValueError(f"Método de despacho desconhecido: '{metodo}'. Opções: {', '.join(METODOS)}")
+        if metodo == METODO_HUNGARO and linear_sum_assignment is None:
+            raise ValueError("O método 'hungaro' precisa do pacote scipy (pip install scipy).")
+
+        n = len(self.pendentes)
+        escolhidos = np.full(n, -1)
+        distancia_escolhida = np.full(n, np.nan)
+        if n and self.tecnicos:
+            distancias, raios = self.matriz_distancias()
+            if metodo == METODO_HUNGARO:
+                self.atribuir_hungaro(distancias, raios, escolhidos, distancia_escolhida, max_por_tecnico)
+            else:
+                self.atribuir_guloso(distancias, raios, escolhidos, distancia_escolhida, max_por_tecnico)
+
+        resultado = self.pendentes.copy()
+        resultado['Tecnico_Sugerido'] = [self.tecnicos[t] if t >= 0 else None for t in escolhidos]
+        resultado['Distancia_Km'] = distancia_escolhida
+        resultado['Chegada_Apos_Prazo'] = self.chegadas_apos_prazo(escolhidos, distancia_escolhida)
+        return resultado
+
+    def atribuir_guloso(self, distancias, raios, escolhidos, distancia_escolhida, max_por_tecnico):
+        """
+        Do chamado mais urgente (menos tempo restante) para o menos urgente, escolhe o técnico de menor
+        custo. O chamado entra na rota do técnico: os pendentes seguintes ficam mais baratos para ele.
+
+        Só a distância dos candidatos é conhecida de saída. Um técnico fora dos candidatos está a pelo
+        menos 'raio' km, então custa pelo menos raio + peso da fila: só quando isso fica abaixo do melhor
+        candidato (fila bem menor, candidatos sem vaga) o chamado é medido até todas as rotas.
+        """
+        ordem = np.argsort(np.nan_to_num(self.restante, nan=np.inf), kind='stable')
+        # Técnico x chamado, na ordem de atendimento: a atualização de um técnico é uma fatia contígua
+        distancias = np.ascontiguousarray(distancias[ordem].T)
+        exatas = np.isfinite(distancias)
+        raios, restante = raios[ordem], self.restante[ordem]
+        lat, lon = self.lat[ordem], self.lon[ordem]
+        carga = np.array([self.carga[t] for t in self.tecnicos], dtype=float)
+        sem_vaga = carga >= max_por_tecnico if max_por_tecnico is not None else np.zeros(len(carga), dtype=bool)
+
+        for k, i in enumerate(ordem.tolist()):
+            custos = self.custo(np.where(exatas[:, k], distancias[:, k], np.inf), carga, restante[k])
+            custos[sem_vaga] = np.inf
+            t = int(np.argmin(custos))
+            fora = ~exatas[:, k] & ~sem_vaga
+            if (raios[k] + PESO_CARGA_KM * carga[fora] < custos[t]).any():
+                distancias[:, k] = np.minimum(distancias[:, k], self.distancias_rotas(i))
+                exatas[:, k] = True
+                custos = self.custo(distancias[:, k], carga, restante[k])
+                custos[sem_vaga] = np.inf
+                t = int(np.argmin(custos))
+            if not np.isfinite(custos[t]):
+                continue
+            escolhidos[i] = t
+            distancia_escolhida[i] = distancias[t, k]
+            carga[t] += 1
+            if max_por_tecnico is not None and carga[t] >= max_por_tecnico:
+                sem_vaga[t] = True
+            # Nova parada: vale para quem ainda vai ser atendido (é exata quando fica dentro do raio)
+            novas = haversine(lat[k], lon[k], lat[k + 1:], lon[k + 1:]) * rotas.FATOR_DESVIO_VIARIO
+            np.minimum(distancias[t, k + 1:], novas, out=distancias[t, k + 1:])
+            exatas[t, k + 1:] |= novas < raios[k + 1:]
+
+    def atribuir_hungaro(self, distancias, raios, escolhidos, distancia_escolhida, max_por_tecnico):
+        """
+        Atribuição ótima por lotes de urgência: do mais urgente ao menos urgente, cada lote de
+        LOTE_HUNGARO chamados é resolvido de forma ótima sobre as vagas que sobraram (cada técnico vira
+        uma vaga por posição livre na fila; o custo cresce com a posição). Assim a matriz de custos
+        fica em LOTE_HUNGARO x vagas, em vez de todos os chamados x todas as vagas.
+        Como no guloso, só os chamados em que um técnico fora dos candidatos pode sair mais barato são
+        medidos até todas as rotas; os demais não candidatos entram com uma distância alta.
+        """
+        n_tecnicos = len(self.tecnicos)
+        carga = np.array([self.carga[t] for t in self.tecnicos], dtype=np.int64)
+        if max_por_tecnico is None:
+            # Sem limite: folga sobre uma divisão igual de todos os chamados (sempre há vaga para todos)
+            max_por_tecnico = int(np.ceil(FOLGA_VAGAS_HUNGARO * (len(escolhidos) + carga.sum()) / n_tecnicos))
+
+        melhor = self.custo(distancias, carga[None, :], self.restante[:, None]).min(axis=1)
+        minimo_fora = np.where(np.isinf(distancias), raios[:, None] + PESO_CARGA_KM * carga[None, :], np.inf)
+        distancias = distancias.copy()
+        for i in np.flatnonzero(minimo_fora.min(axis=1) < melhor).tolist():
+            distancias[i] = np.minimum(distancias[i], self.distancias_rotas(i))
+        limitadas = np.where(np.isfinite(distancias), distancias, DISTANCIA_SEM_CANDIDATO_KM)
+
+        ordem = np.argsort(np.nan_to_num(self.restante, nan=np.inf), kind='stable')
+        for inicio in range(0, len(ordem), LOTE_HUNGARO):
+            lote = ordem[inicio:inicio + LOTE_HUNGARO]
+            blocos, vagas = [], []
+            for t in range(n_tecnicos):
+                # Próximas posições livres da fila do técnico (o lote não ocupa mais que o seu tamanho)
+                posicoes_fila = np.arange(carga[t], min(max_por_tecnico, carga[t] + len(lote)))
+                if len(posicoes_fila):
+                    blocos.append(self.custo(limitadas[lote, t][:, None], posicoes_fila[None, :], self.restante[lote][:, None]))
+                    vagas.append(np.full(len(posicoes_fila), t))
+            if not blocos:
+                return
+            linhas, colunas = linear_sum_assignment(np.hstack(blocos))
+            tecnicos_lote = np.concatenate(vagas)[colunas]
+            escolhidos[lote[linhas]] = tecnicos_lote
+            carga += np.bincount(tecnicos_lote, minlength=n_tecnicos)
+
+        for i in np.flatnonzero(escolhidos >= 0).tolist():
+            distancia = distancias[i, escolhidos[i]]
+            distancia_escolhida[i] = distancia if np.isfinite(distancia) else self.distancias_rotas(i)[escolhidos[i]]
+
+    def chegadas_apos_prazo(self, escolhidos, distancia_escolhida):
+        carga = {t: self.carga[tecnico] for t, tecnico in enumerate(self.tecnicos)}
+        atrasa = np.zeros(len(escolhidos), dtype=bool)
+        for i in np.argsort(np.nan_to_num(self.restante, nan=np.inf), kind='stable'):
+            t = escolhidos[i]
+            if t < 0:
+                continue
+            chegada = carga[t] * rotas.TEMPO_POR_PARADA_SEGUNDOS + distancia_escolhida[i] / rotas.VELOCIDADE_MEDIA_KMH * 3600
+            atrasa[i] = np.nan_to_num(self.restante[i], nan=np.inf) < chegada
+            carga[t] += 1
+        return atrasa
@@ -0,0 +1,105 @@
+import re
+import pandas as pd
+
+from geocode_cache import normalizar_endereco
+
+# --- Tabelas de Canonização de Endereços ---
+# Tudo já sem acento e em minúsculas (depois de 'normalizar_endereco').
+
+# Tipo de logradouro: só no início do logradouro
+TIPOS_LOGRADOURO = {
+    'r': 'rua', 'rua': 'rua',
+    'av': 'avenida', 'avn': 'avenida', 'aven': 'avenida', 'avenida': 'avenida',
+    'tv': 'travessa', 'trav': 'travessa', 'travessa': 'travessa',
+    'al': 'alameda', 'alam': 'alameda', 'alameda': 'alameda',
+    'pc': 'praca', 'pca': 'praca', 'praca': 'praca',
+    'est': 'estrada', 'estr': 'estrada', 'estrada': 'estrada',
+    'rod': 'rodovia', 'rodovia': 'rodovia',
+    'lgo': 'largo', 'lg': 'largo', 'largo': 'largo',
+    'vl': 'viela', 'viela': 'viela',
+    'q': 'quadra', 'qd': 'quadra', 'quadra': 'quadra',
+}
+
+# Abreviações que também são sigla de rodovia estadual ('PR-445'): só valem sem número logo depois
+TIPOS_LOGRADOURO_AMBIGUOS = {'pr': 'praca'}
+
+# Títulos comuns em nomes de rua: em qualquer posição
+TITULOS = {
+    'dr': 'doutor', 'dra': 'doutora', 'prof': 'professor', 'profa': 'professora',
+    'pres': 'presidente', 'gov': 'governador', 'sen': 'senador', 'dep': 'deputado',
+    'cel': 'coronel', 'cap': 'capitao', 'gal': 'general', 'gen': 'general', 'mal': 'marechal',
+    'eng': 'engenheiro', 'sta': 'santa', 'sto': 'santo', 'pe': 'padre',
+}
+
+# Tipo de bairro: só no início do bairro
+TIPOS_BAIRRO = {
+    'jd': 'jardim', 'jar': 'jardim', 'vl': 'vila', 'pq': 'parque', 'res': 'residencial',
+    'st': 'setor', 'set': 'setor', 'conj': 'conjunto', 'cj': 'conjunto', 'lot': 'loteamento',
+}
+
+# Formas de "sem número" (depois de normalizar e tirar os espaços)
+SEM_NUMERO = {'sn', 'sno', 'semnumero', 'snumero', 'semn', 's'}
+
+
+def valor_vazio(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return True
+    return str(valor).strip().lower() in ('', 'nan', 'none', '<na>')
+
+def canonizar_logradouro(logradouro):
+    """'R. Sete de Setembro,' -> 'rua sete de setembro'."""
+    if valor_vazio(logradouro):
+        return ""
+    tokens = normalizar_endereco(logradouro).replace(",", " ").split()
+    if not tokens:
+        return ""
+    tipo = TIPOS_LOGRADOURO.get(tokens[0], tokens[0])
+    if tokens[0] in TIPOS_LOGRADOURO_AMBIGUOS and len(tokens) > 1 and not tokens[1][0].isdigit():
+        tipo = TIPOS_LOGRADOURO_AMBIGUOS[tokens[0]]
+    tokens = [tipo] + [TITULOS.get(t, t) for t in tokens[1:]]
+    # "S/N" escrito no próprio logradouro
+    if tokens[-1] == 'sn':
+        tokens = tokens[:-1]
+    elif tokens[-2:] == ['s', 'n']:
+        tokens = tokens[:-2]
+    return " ".join(tokens)
+
+def canonizar_numero(numero):
+    """'010', 10.0, 'nº 10' -> '10'; 'S/N', 'SN', 0 -> '' (sem número)."""
+    if valor_vazio(numero):
+        return ""
+    if isinstance(numero, float) and numero.is_integer():
+        numero = int(numero)
+    compacto = normalizar_endereco(numero).replace(" ", "").replace(",", "")
+    if compacto in SEM_NUMERO:
+        return ""
+    m = re.fullmatch(r"(?:n|no|num|numero)?(\d+)([a-z]?)", compacto)
+    if m:
+        digitos = m.group(1).lstrip("0")
+        return digitos + m.group(2) if digitos else ""
+    return " ".join(normalizar_endereco(numero).replace(",", " ").split())
+
+def canonizar_bairro(bairro):
+    """'JD. América' -> 'jardim america'."""
+    if valor_vazio(bairro):
+        return ""
+    tokens = normalizar_endereco(bairro).replace(",", " ").split()
+    if tokens:
+        tokens[0] = TIPOS_BAIRRO.get(tokens[0], tokens[0])
+    return " ".join(tokens)
+
+def canonizar_endereco(logradouro, numero, bairro, cidade, uf, pais="Brasil"):
+    """
+    Endereço canônico: sem acentos, minúsculo, tipos de logradouro por extenso e número padronizado.
+    É ao mesmo tempo o texto enviado ao backend e a chave de deduplicação/cache.
+    """
+    rua = canonizar_logradouro(logradouro)
+    num = canonizar_numero(numero)
+    partes = [
+        f"{rua} {num}".strip(),
+        canonizar_bairro(bairro),
+        "" if valor_vazio(cidade) else normalizar_endereco(cidade),
+        "" if valor_vazio(uf) else normalizar_endereco(uf),
+        normalizar_endereco(pais),
+    ]
+    return ", ".join(p for p in partes if p)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+import config
+from ao_vivo import EPOCA, para_epoch
+
+# --- Faixas de envelhecimento ---
+# Limites inferiores de cada faixa; a última faixa vai até o infinito.
+FAIXAS_HORAS_PADRAO = [0, 4, 8, 12, 16, 19, 20, 21, 22, 23, 24, 48]
+FAIXAS_SLA_PADRAO = [0, 0.25, 0.5, 0.75, 0.9, 1.0, 1.5, 2.0] # Fração do SLA da categoria já consumida
+
+# --- Curva de backlog ---
+PASSO_BACKLOG_PADRAO = '1h'
+PERCENTIL_INICIO_BACKLOG = 1 # Sem início informado, a curva começa neste percentil das aberturas (ignora datas absurdas)
+MAX_PONTOS_BACKLOG = 5000    # Acima disso só os instantes mais recentes entram na curva
+ETAPA_ABERTO = 'Aguardando Encaminhamento'
+ETAPA_ENCAMINHADO = 'Aguardando Agendamento'
+ETAPA_AGENDADO = 'Agendados (acumulado)'
+ETAPA_ESTOURADO = 'Estourados sem Agendamento'
+ETAPAS_BACKLOG = [ETAPA_ABERTO, ETAPA_ENCAMINHADO, ETAPA_AGENDADO, ETAPA_ESTOURADO]
+
+
+def histograma(valores, limites):
+    """
+    Contagem por faixa em uma passada: a faixa de cada valor sai de uma busca binária nos limites.
+    Valores abaixo do primeiro limite e vazios (NaN) ficam de fora.
+    """
+    valores = np.asarray(valores, dtype=float)
+    limites = np.asarray(limites, dtype=float)
+    faixas = np.searchsorted(limites, valores[~np.isnan(valores)], side='right') - 1
+    return np.bincount(faixas[faixas >= 0], minlength=len(limites))
+
+def rotulos_faixas(limites, formatar):
+    """'a–b' para cada faixa e '≥ último' para a última."""
+    rotulos = [f"{formatar(de)}–{formatar(ate)}" for de, ate in zip(limites[:-1], limites[1:])]
+    return rotulos + [f"≥ {formatar(limites[-1])}"]
+
+def envelhecimento_sla(consumido_segundos, sla_total_segundos, limites_fracao=FAIXAS_SLA_PADRAO):
+    """
+    Histograma relativo ao SLA de cada chamado: tempo de SLA consumido / SLA total da categoria
+    (o consumido já respeita os calendários de horário comercial).
+    """
+    sla_total = np.asarray(sla_total_segundos, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fracao = np.where(sla_total > 0, np.asarray(consumido_segundos, dtype=float) / sla_total, np.nan)
+    contagens = histograma(fracao, limites_fracao)
+    return pd.DataFrame({'Faixa': rotulos_faixas(limites_fracao, lambda f: f"{f:.0%}"), 'Chamados': contagens})
+
+def contar_intervalos(inicios, fins, instantes):
+    """
+    Linha de varredura: quantos intervalos [início, fim) contêm cada instante. Os inícios e os fins
+    são ordenados uma vez e cada instante vira duas buscas binárias (fim NaN = intervalo ainda aberto).
+    """
+    validos = ~np.isnan(inicios)
+    inicios = np.sort(inicios[validos])
+    fins = np.sort(np.where(np.isnan(fins[validos]), np.inf, fins[validos]))
+    return np.searchsorted(inicios, instantes, side='right') - np.searchsorted(fins, instantes, side='right')
+
+def curva_backlog(df, inicio=None, fim=None, passo=PASSO_BACKLOG_PADRAO):
+    """
+    Quantos chamados estavam em cada etapa ao longo do tempo, a partir dos eventos de Abertura,
+    Encaminhamento Operacional e Agendamento Visita (e do prazo do SLA, se 'SLA_Prazo' existir):
+
+    - Aguardando Encaminhamento: [abertura, encaminhamento ou agendamento)
+    - Aguardando Agendamento: [encaminhamento, agendamento)
+    - Agendados (acumulado): [agendamento, ...) (a exportação não traz a data de fechamento)
+    - Estourados sem Agendamento: [prazo, agendamento) quando o agendamento não saiu até o prazo
+    Retorna um DataFrame com um instante por linha (de `inicio` a `fim`, a cada `passo`) e uma coluna por etapa.
+    Sem `inicio`, a curva começa no percentil PERCENTIL_INICIO_BACKLOG das aberturas; com mais de
+    MAX_PONTOS_BACKLOG instantes, o início avança até caberem só os mais recentes.
+    """
+    def epoch(coluna):
+        if coluna not in df.columns:
+            return np.full(len(df), np.nan)
+        return para_epoch(df[coluna])
+
+    abertura = epoch(config.COLUNA_ABERTURA)
+    agendamento = epoch(config.COLUNA_AGENDAMENTO)
+    # Agendar implica ter sido encaminhado; eventos anteriores à abertura contam a partir dela
+    encaminhamento = np.fmin(epoch(config.COLUNA_ENCAMINHAMENTO), agendamento)
+    encaminhamento = np.where(np.isnan(encaminhamento), np.nan, np.fmax(encaminhamento, abertura))
+    agendamento = np.where(np.isnan(agendamento), np.nan, np.fmax(agendamento, abertura))
+    validos = ~np.isnan(abertura)
+
+    if inicio is None or fim is None:
+        if not validos.any():
+            return pd.DataFrame(columns=['Instante'] + ETAPAS_BACKLOG)
+        if inicio is None:
+            primeira = np.percentile(abertura[validos], PERCENTIL_INICIO_BACKLOG, method='higher')
+            inicio = EPOCA + pd.Timedelta(seconds=float(primeira))
+        fim = pd.Timestamp.now() if fim is None else fim
+    inicio, fim = pd.Timestamp(inicio).floor(passo), pd.Timestamp(fim)
+    inicio = max(inicio, (fim - (MAX_PONTOS_BACKLOG - 1) * pd.Timedelta(passo)).ceil(passo))
+    instantes = pd.date_range(inicio, fim, freq=passo)
+    t = para_epoch(instantes)
+
+    curvas = {
+        ETAPA_ABERTO: contar_intervalos(abertura, encaminhamento, t),
+        ETAPA_ENCAMINHADO: contar_intervalos(np.where(validos, encaminhamento, np.nan), agendamento, t),
+        ETAPA_AGENDADO: contar_intervalos(np.where(validos, agendamento, np.nan), np.full(len(df), np.nan), t),
+    }
+    if 'SLA_Prazo' in df.columns:
+        prazo = para_epoch(df['SLA_Prazo'])
+        # Só quem não estava agendado no prazo: o intervalo termina no agendamento (ou segue aberto)
+        estourou = validos & (np.isnan(agendamento) | (agendamento > prazo))
+        curvas[ETAPA_ESTOURADO] = contar_intervalos(np.where(estourou, prazo, np.nan), agendamento, t)
+
+    return pd.DataFrame({'Instante': instantes, **curvas})
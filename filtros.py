@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+import config
+
+# --- Colunas com filtro nas páginas ---
+COLUNAS_FILTRO = [config.COLUNA_CIDADE, config.COLUNA_TECNICO, config.COLUNA_ASSUNTO, config.COLUNA_STATUS]
+
+
+class IndiceFiltros:
+    """
+    Índice dos filtros montado uma vez por dataset.
+
+    Cada coluna de filtro vira códigos inteiros (valores em ordem alfabética, vazio = -1) e, para cada
+    valor, a lista das linhas onde ele aparece. Uma seleção vira uma máscara booleana montada só com
+    as linhas dos valores escolhidos; combinar filtros é um AND de máscaras, sem 'isin' nem cópias do DataFrame.
+    As máscaras são por posição (mesma ordem de linhas do dataset indexado).
+    O ID Cliente (como texto) também é indexado, para cruzar o dataset com o registro de ações.
+    """
+
+    def __init__(self, df, colunas=COLUNAS_FILTRO):
+        self.total = len(df)
+        self.ids = None
+        if config.COLUNA_ID_CLIENTE in df.columns:
+            self.ids = pd.Index(df[config.COLUNA_ID_CLIENTE].astype(str).to_numpy(dtype=object))
+        self.colunas = {}
+        self.codigo_por_valor = {}
+        for col in colunas:
+            if col not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[col], sort=True)
+            codigos = codigos.astype(np.int32)
+            # Linhas agrupadas por valor: linhas do valor c = ordem[inicio[c]:inicio[c + 1]]
+            ordem, inicio = IndiceFiltros.agrupar(codigos, len(valores))
+            self.colunas[col] = (codigos, list(valores), ordem, inicio)
+            self.codigo_por_valor[col] = {valor: codigo for codigo, valor in enumerate(valores)}
+
+    @staticmethod
+    def agrupar(codigos, n_valores):
+        """Ordem das linhas agrupadas por código e o início de cada grupo (vazio = -1 vem primeiro)."""
+        ordem = np.argsort(codigos, kind='stable')
+        contagens = np.bincount(codigos[codigos >= 0], minlength=n_valores)
+        inicio = np.concatenate(([np.count_nonzero(codigos < 0)], contagens)).cumsum()
+        return ordem, inicio
+
+    def derivar(self, df, origem):
+        """
+        Índice de `df` (dataset mesclado) reaproveitando este: origem[i] é a posição da linha i neste
+        índice, ou -1 para linhas novas/alteradas. Só essas são codificadas de novo; as demais só têm
+        o código remapeado para a nova lista de valores.
+        """
+        novo = IndiceFiltros.__new__(IndiceFiltros)
+        novo.total = len(df)
+        novo.colunas = {}
+        novo.codigo_por_valor = {}
+        origem = np.asarray(origem)
+        recodificar = origem < 0
+        for col, (codigos, valores, _, _) in self.colunas.items():
+            if col not in df.columns:
+                continue
+            codigos_afetados, valores_afetados = pd.factorize(df[col].iloc[recodificar], sort=True)
+            todos = pd.Index(valores).union(pd.Index(list(valores_afetados))) if len(valores_afetados) else pd.Index(valores)
+            # Códigos antigos e das linhas afetadas na lista unida (-1 continua -1)
+            de_antigo = np.append(todos.get_indexer(valores), -1).astype(np.int32)
+            de_afetado = np.append(todos.get_indexer(list(valores_afetados)), -1).astype(np.int32)
+            novos_codigos = np.empty(novo.total, dtype=np.int32)
+            novos_codigos[~recodificar] = de_antigo[codigos[origem[~recodificar]]]
+            novos_codigos[recodificar] = de_afetado[codigos_afetados]
+            # Valores que sumiram do dataset saem da lista (para não aparecerem nos filtros)
+            presentes = np.bincount(novos_codigos[novos_codigos >= 0], minlength=len(todos)) > 0
+            if not presentes.all():
+                renumerar = np.append(np.cumsum(presentes) - 1, -1).astype(np.int32)
+                novos_codigos = renumerar[novos_codigos]
+                todos = todos[presentes]
+            ordem, inicio = IndiceFiltros.agrupar(novos_codigos, len(todos))
+            novo.colunas[col] = (novos_codigos, list(todos), ordem, inicio)
+            novo.codigo_por_valor[col] = {valor: codigo for codigo, valor in enumerate(todos)}
+
+        novo.ids = None
+        if config.COLUNA_ID_CLIENTE in df.columns:
+            ids = np.empty(novo.total, dtype=object)
+            if self.ids is not None:
+                ids[~recodificar] = self.ids.to_numpy()[origem[~recodificar]]
+            else:
+                recodificar = np.ones(novo.total, dtype=bool)
+            ids[recodificar] = df[config.COLUNA_ID_CLIENTE].iloc[recodificar].astype(str).to_numpy(dtype=object)
+            novo.ids = pd.Index(ids)
+        return novo
+
+    def tem_coluna(self, coluna):
+        return coluna in self.colunas
+
+    def todas(self):
+        """Máscara sem filtro (todas as linhas)."""
+        return np.ones(self.total, dtype=bool)
+
+    def linhas(self, coluna, valor):
+        """Posições das linhas com o valor na coluna."""
+        _, _, ordem, inicio = self.colunas[coluna]
+        codigo = self.codigo_por_valor[coluna].get(valor)
+        if codigo is None:
+            return ordem[:0]
+        return ordem[inicio[codigo]:inicio[codigo + 1]]
+
+    def mascara(self, coluna, selecionados):
+        """Máscara das linhas cujo valor está entre os selecionados (como 'isin')."""
+        mascara = np.zeros(self.total, dtype=bool)
+        for valor in selecionados:
+            mascara[self.linhas(coluna, valor)] = True
+        return mascara
+
+    def mascara_ids(self, ids):
+        """Máscara das linhas cujo ID Cliente (texto) está em `ids`, pela busca no índice de IDs."""
+        mascara = np.zeros(self.total, dtype=bool)
+        if self.ids is None or len(ids) == 0:
+            return mascara
+        posicoes = self.ids.get_indexer_for(ids)
+        mascara[posicoes[posicoes >= 0]] = True
+        return mascara
+
+    def opcoes(self, coluna, mascara=None):
+        """Valores (ordenados, sem vazios) presentes nas linhas da máscara. Sem máscara: todos os valores."""
+        codigos, valores, _, _ = self.colunas[coluna]
+        if mascara is None or mascara.all():
+            return list(valores)
+        presentes = np.bincount(codigos[mascara & (codigos >= 0)], minlength=len(valores)) > 0
+        return [valor for valor, presente in zip(valores, presentes) if presente]
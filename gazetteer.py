@@ -0,0 +1,65 @@
+import csv
+import os
+
+from geocode_cache import normalizar_endereco
+from enderecos import canonizar_bairro
+
+# --- Níveis de precisão gravados na coluna de precisão ---
+PRECISAO_ENDERECO = "endereco"   # Coordenada do endereço completo (backend remoto)
+PRECISAO_BAIRRO = "bairro"       # Centróide do bairro (gazetteer local)
+PRECISAO_MUNICIPIO = "municipio" # Centróide do município (gazetteer local)
+
+
+class Gazetteer:
+    """
+    Geocodificador local (offline) com centróides de municípios e bairros.
+
+    O CSV deve ter as colunas 'cidade', 'uf', 'bairro', 'latitude' e 'longitude'.
+    Linhas com 'bairro' vazio são o centróide do município; quando o município não
+    tem linha própria, usa-se a média dos seus bairros.
+    """
+
+    def __init__(self, caminho):
+        self.bairros = {}
+        self.municipios = {}
+        somas = {}
+
+        with open(caminho, newline="", encoding="utf-8") as f:
+            for linha in csv.DictReader(f):
+                cidade = normalizar_endereco(linha["cidade"])
+                uf = normalizar_endereco(linha["uf"])
+                bairro = canonizar_bairro(linha.get("bairro"))
+                coords = (float(linha["latitude"]), float(linha["longitude"]))
+
+                if bairro:
+                    self.bairros[(cidade, uf, bairro)] = coords
+                    soma = somas.setdefault((cidade, uf), [0.0, 0.0, 0])
+                    soma[0] += coords[0]
+                    soma[1] += coords[1]
+                    soma[2] += 1
+                else:
+                    self.municipios[(cidade, uf)] = coords
+
+        for chave, (soma_lat, soma_lon, total) in somas.items():
+            self.municipios.setdefault(chave, (soma_lat / total, soma_lon / total))
+
+    def localizar(self, cidade, uf, bairro=None):
+        """Retorna (lat, lon, precisao) do nível mais fino disponível, ou (None, None, None)."""
+        cidade = normalizar_endereco(cidade)
+        uf = normalizar_endereco(uf)
+        if bairro is not None:
+            coords = self.bairros.get((cidade, uf, canonizar_bairro(bairro)))
+            if coords:
+                return coords[0], coords[1], PRECISAO_BAIRRO
+
+        coords = self.municipios.get((cidade, uf))
+        if coords:
+            return coords[0], coords[1], PRECISAO_MUNICIPIO
+        return None, None, None
+
+
+def carregar_gazetteer(caminho):
+    """Carrega o gazetteer se o arquivo existir; senão retorna None (sem fallback)."""
+    if not caminho or not os.path.exists(caminho):
+        return None
+    return Gazetteer(caminho)
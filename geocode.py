@@ -1,9 +1,17 @@
 import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
 from tqdm import tqdm # Para a barra de progresso
-import time
 import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from geocode_cache import CacheGeocode
+from geocode_backends import criar_backend, geocodificar_em_lote, consultar_com_retentativas, LimitadorTaxaCompartilhado, ErroBackend
+from geocode_checkpoint import CheckpointGeocode, caminho_checkpoint
+from gazetteer import carregar_gazetteer, PRECISAO_ENDERECO, PRECISAO_BAIRRO, PRECISAO_MUNICIPIO
+from planilha_streaming import ler_linhas_excel, EscritorPlanilha
+from enderecos import canonizar_endereco
 
 # --- Nomes das colunas do seu arquivo (Linha 2) ---
 # ATENÇÃO: Verifique se os nomes abaixo batem EXATAMENTE
@@ -17,48 +25,171 @@ COL_UF = "UF"               # Coluna K2 (Confirme que é "UF" e não "F")
 # --- Colunas novas que vamos criar ---
 COL_LATITUDE = "latitude"
 COL_LONGITUDE = "longitude"
+COL_PRECISAO = "precisao_geocode" # endereco / bairro / municipio
+
+# --- Backend de geocodificação ---
+# "nominatim" (padrão), "http" (servidor local compatível), "arquivo" (CSV endereco,latitude,longitude)
+# ou None para não fazer nenhuma consulta remota (usa só o cache e o gazetteer)
+BACKEND_GEOCODE = "nominatim"
+OPCOES_BACKEND = {} # Ex.: {"url_base": "http://localhost:8080"} ou {"caminho": "coordenadas.csv"}
+WORKERS_GEOCODE = 4 # Consultas simultâneas (o limite de taxa do backend continua valendo)
+
+# --- Fallback offline ---
+# CSV com centróides (cidade, uf, bairro, latitude, longitude). Usado quando o endereço não é encontrado.
+GAZETTEER_CSV = "gazetteer.csv"
+
+# --- Checkpoint ---
+# O progresso é gravado a cada N linhas; se o script parar, rodar de novo retoma de onde parou.
+CHECKPOINT_A_CADA = 50
+
+# --- Modo streaming (arquivos muito grandes) ---
+# Lê e grava a planilha linha a linha, com memória constante. As linhas seguem para a saída
+# na ordem original assim que suas coordenadas ficam prontas.
+MODO_STREAMING = False
+JANELA_STREAMING = 500 # Máximo de linhas aguardando coordenada ao mesmo tempo
+
+def montar_endereco(linha):
+    """Monta o endereço canônico de uma linha da planilha (é também a chave de cache/deduplicação)."""
+    return canonizar_endereco(
+        linha[COL_LOGRADOURO],
+        linha[COL_NUMERO],
+        linha[COL_BAIRRO],
+        linha[COL_CIDADE],
+        linha[COL_UF],
+    )
+
+def montar_endereco_bruto(linha):
+    """Endereço como escrito na planilha (só para o relatório de deduplicação)."""
+    partes = [linha[COL_LOGRADOURO], linha[COL_NUMERO], linha[COL_BAIRRO], linha[COL_CIDADE], linha[COL_UF]]
+    return ", ".join(str(parte) for parte in partes)
+
+def geocodificar_em_streaming(input_file, output_file, backend, gazetteer, mostrar_progresso=True):
+    """
+    Versão de memória constante do 'processar_arquivo': lê, geocodifica e grava sem montar o DataFrame.
+    Retorna os totais da execução, ou None se faltarem colunas.
+    """
+    cabecalho, linhas = ler_linhas_excel(input_file, linha_cabecalho=2)
+
+    colunas_endereco_necessarias = [COL_LOGRADOURO, COL_NUMERO, COL_BAIRRO, COL_CIDADE, COL_UF]
+    colunas_faltando = [col for col in colunas_endereco_necessarias if col not in cabecalho]
+    if colunas_faltando:
+        print("\n--- ERRO ---")
+        print(f"Colunas de endereço não encontradas em '{input_file}': {', '.join(colunas_faltando)}")
+        return None
+
+    colunas_saida = cabecalho + [c for c in (COL_LATITUDE, COL_LONGITUDE, COL_PRECISAO) if c not in cabecalho]
+    posicao = {col: i for i, col in enumerate(colunas_saida)}
+    escritor = EscritorPlanilha(output_file, colunas_saida)
+    cache = CacheGeocode()
+    executor = ThreadPoolExecutor(max_workers=WORKERS_GEOCODE)
+
+    em_andamento = {} # chave -> Future da consulta (uma por endereço distinto)
+    janela = deque()  # (valores, chave, Future ou coordenadas), na ordem original
+    # Sem o relatório exato de deduplicação: contar endereços distintos exigiria guardar todos eles
+    totais = {"linhas": 0, "enderecos_brutos": None, "chaves": None, "consultas": 0, "aproximados": 0}
+
+    def emitir(valores, chave, resultado):
+        coords = resultado
+        if isinstance(resultado, Future):
+            coords = resultado.result()
+            if em_andamento.get(chave) is resultado:
+                del em_andamento[chave]
+                if coords is not None and backend is not None:
+                    cache.gravar(chave, *coords)
+            coords = coords or (None, None)
+
+        if chave is not None:
+            lat, lon = coords
+            precisao = PRECISAO_ENDERECO if lat is not None else None
+            if lat is None and gazetteer is not None:
+                linha = dict(zip(colunas_saida, valores))
+                lat, lon, precisao = gazetteer.localizar(linha[COL_CIDADE], linha[COL_UF], linha[COL_BAIRRO])
+                if precisao is not None:
+                    totais["aproximados"] += 1
+            valores[posicao[COL_LATITUDE]] = lat
+            valores[posicao[COL_LONGITUDE]] = lon
+            valores[posicao[COL_PRECISAO]] = precisao
+        escritor.adicionar(valores)
 
-def geocode_address(geolocator, address, attempts=3):
-    """Tenta encontrar a coordenada de um endereço, com retentativas."""
     try:
-        location = geolocator.geocode(address, timeout=10)
-        if location:
-            return location.latitude, location.longitude
-        else:
-            return None, None
-    except GeocoderTimedOut:
-        time.sleep(1)
-        if attempts > 0:
-            return geocode_address(geolocator, address, attempts - 1)
-        return None, None
-    except GeocoderUnavailable:
-        time.sleep(5) 
-        if attempts > 0:
-            return geocode_address(geolocator, address, attempts - 1)
-        return None, None
-    except Exception:
-        return None, None
+        for valores in tqdm(linhas, desc="Geocodificando linhas (streaming)", unit=" linhas", disable=not mostrar_progresso):
+            valores += [None] * (len(colunas_saida) - len(valores))
+            linha = dict(zip(colunas_saida, valores))
+            totais["linhas"] += 1
 
-def main():
-    print("--- Script de Preparação de Mapa ---")
-    
-    input_file = input("Por favor, arraste seu arquivo Excel original para esta janela e aperte Enter: ")
-    input_file = input_file.strip().strip('"') 
+            ja_tem = linha[COL_LATITUDE] is not None and linha[COL_PRECISAO] not in (PRECISAO_BAIRRO, PRECISAO_MUNICIPIO)
+            if ja_tem:
+                janela.append((valores, None, None))
+            else:
+                chave = montar_endereco(linha)
+                if chave in em_andamento:
+                    resultado = em_andamento[chave]
+                else:
+                    encontrado, resultado = cache.buscar(chave)
+                    if not encontrado:
+                        if backend is None:
+                            resultado = (None, None)
+                        else:
+                            resultado = executor.submit(consultar_com_retentativas, backend, chave)
+                            em_andamento[chave] = resultado
+                            totais["consultas"] += 1
+                janela.append((valores, chave, resultado))
 
-    if not os.path.exists(input_file):
-        print(f"Erro: Arquivo não encontrado em '{input_file}'")
-        return
+            # Libera as linhas do início da fila que já estão prontas (ou espera, se a janela encheu)
+            while janela and (len(janela) >= JANELA_STREAMING or not isinstance(janela[0][2], Future) or janela[0][2].done()):
+                emitir(*janela.popleft())
 
-    output_file = "relatorio_com_mapa.xlsx"
+        while janela:
+            emitir(*janela.popleft())
+        escritor.fechar()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        cache.fechar()
+
+    print(f"{totais['linhas']} linhas processadas, {totais['consultas']} consultas ao backend.")
+    print(f"Cache de coordenadas: {cache.acertos} de {cache.consultas} endereços já conhecidos "
+          f"(taxa de acerto: {cache.taxa_acerto():.1%}).")
+    if gazetteer is not None:
+        print(f"Gazetteer local: {totais['aproximados']} linhas receberam coordenada aproximada (bairro/município).")
+    return totais
+
+def processar_arquivo(input_file, output_file, limitador=None, streaming=None, mostrar_progresso=True):
+    """
+    Geocodifica um arquivo de entrada e grava a planilha de saída.
+    `limitador` substitui o limite de taxa do backend (usado no modo lote para dividir um único limite
+    entre processos). Retorna os totais da execução, ou None em caso de erro.
+    """
+    if streaming is None:
+        streaming = MODO_STREAMING
     print(f"Lendo o arquivo: {input_file}")
-    
+
+    backend = criar_backend(BACKEND_GEOCODE, **OPCOES_BACKEND) if BACKEND_GEOCODE else None
+    if backend is not None and limitador is not None:
+        backend.limitador = limitador
+    gazetteer = carregar_gazetteer(GAZETTEER_CSV)
+
+    if streaming:
+        try:
+            totais = geocodificar_em_streaming(input_file, output_file, backend, gazetteer, mostrar_progresso)
+        except PermissionError as e:
+            print(f"\nErro ao salvar o arquivo: {e}")
+            print(f"Verifique se você fechou o arquivo '{output_file}' antes de rodar o script.")
+            return None
+        except ErroBackend as e:
+            print(f"\nO backend de geocodificação recusou as consultas: {e}")
+            print(f"O arquivo '{output_file}' ficou incompleto; rode de novo quando o backend voltar.")
+            return None
+        if totais is not None:
+            print(f"\nSucesso! Seu novo arquivo está salvo como: '{output_file}'")
+        return totais
+
     # --- CORREÇÃO AQUI ---
     # Adicionado 'header=1' para ler os cabeçalhos da Linha 2
     try:
         df = pd.read_excel(input_file, header=1)
     except Exception as e:
         print(f"Erro ao ler o arquivo Excel: {e}")
-        return
+        return None
     
     # Verifica se as colunas de endereço existem
     colunas_endereco_necessarias = [COL_LOGRADOURO, COL_NUMERO, COL_BAIRRO, COL_CIDADE, COL_UF]
@@ -70,51 +201,224 @@ def main():
         print(f"{', '.join(colunas_faltando)}")
         print("Por favor, abra o 'geocode.py' e corrija os nomes das colunas (ex: COL_CIDADE) no topo do script.")
         print("Lembre-se de verificar espaços e maiúsculas/minúsculas.")
-        return
+        return None
 
     if COL_LATITUDE not in df.columns or COL_LONGITUDE not in df.columns:
         df[COL_LATITUDE] = pd.NA
         df[COL_LONGITUDE] = pd.NA
     else:
         print("Colunas de mapa já existem. Preenchendo apenas as vazias...")
+    if COL_PRECISAO not in df.columns:
+        df[COL_PRECISAO] = pd.NA
+
+    # --- Retomada: aplica o que já foi resolvido numa execução interrompida ---
+    checkpoint = CheckpointGeocode(caminho_checkpoint(input_file, output_file), gravar_a_cada=CHECKPOINT_A_CADA)
+    ja_resolvidas = checkpoint.carregar()
+    if ja_resolvidas:
+        print(f"Retomando execução anterior: {len(ja_resolvidas)} linhas já resolvidas no checkpoint.")
 
-    geolocator = Nominatim(user_agent="meu_dashboard_streamlit_app")
     print("Iniciando a busca por coordenadas (Isso pode demorar vários minutos)...")
     
-    tqdm.pandas(desc="Geocodificando endereços")
-    
-    df_para_processar = df[df[COL_LATITUDE].isna()].copy()
+    # Linhas com coordenada aproximada (gazetteer) também são tentadas de novo no backend
+    precisa_geocodificar = df[COL_LATITUDE].isna() | df[COL_PRECISAO].isin([PRECISAO_BAIRRO, PRECISAO_MUNICIPIO])
+    precisa_geocodificar &= ~df.index.isin(list(ja_resolvidas))
+    df_para_processar = df[precisa_geocodificar]
+    totais = {"linhas": len(df), "enderecos_brutos": 0, "chaves": 0, "consultas": 0, "aproximados": 0}
 
     if df_para_processar.empty:
         print("Nenhuma coordenada faltando. Arquivo já está completo.")
         # Mesmo assim, salva o arquivo para garantir que está no formato correto
     else:
-        def processar_linha(linha):
-            address_parts = [
-                str(linha[COL_LOGRADOURO]),
-                str(linha[COL_NUMERO]),
-                str(linha[COL_BAIRRO]),
-                str(linha[COL_CIDADE]),
-                str(linha[COL_UF]),
-                "Brasil"
-            ]
-            full_address = ", ".join(part for part in address_parts if pd.notna(part) and str(part) != 'nan')
-            
-            lat, lon = geocode_address(geolocator, full_address)
-            return lat, lon
+        cache = CacheGeocode()
+        # O endereço canônico é a chave: grafias diferentes do mesmo endereço viram uma única consulta
+        chaves = df_para_processar.apply(montar_endereco, axis=1)
+        enderecos_unicos = chaves.drop_duplicates()
+        linhas_por_chave = chaves.index.groupby(chaves)
+        totais["enderecos_brutos"] = df_para_processar.apply(montar_endereco_bruto, axis=1).nunique()
+        totais["chaves"] = len(enderecos_unicos)
+        print(f"{len(chaves)} linhas sem coordenada: {totais['enderecos_brutos']} endereços como escritos, "
+              f"{totais['chaves']} endereços canônicos distintos.")
 
-        coords = df_para_processar.progress_apply(processar_linha, axis=1)
-        
-        df.loc[df[COL_LATITUDE].isna(), COL_LATITUDE] = [c[0] for c in coords]
-        df.loc[df[COL_LONGITUDE].isna(), COL_LONGITUDE] = [c[1] for c in coords]
+        def registrar_resultado(chave, lat, lon):
+            """Grava no checkpoint o resultado de um endereço para todas as linhas que o usam."""
+            for indice in linhas_por_chave[chave]:
+                if lat is not None:
+                    checkpoint.registrar(indice, lat, lon, PRECISAO_ENDERECO)
+                    continue
+                # Fallback offline: centróide do bairro/município para quem ficou sem coordenada
+                linha = df.loc[indice]
+                lat_aprox, lon_aprox, precisao = None, None, None
+                if gazetteer is not None:
+                    bairro = linha[COL_BAIRRO] if pd.notna(linha[COL_BAIRRO]) else None
+                    lat_aprox, lon_aprox, precisao = gazetteer.localizar(linha[COL_CIDADE], linha[COL_UF], bairro)
+                    if precisao is not None:
+                        totais["aproximados"] += 1
+                checkpoint.registrar(indice, lat_aprox, lon_aprox, precisao)
+
+        pendentes = []
+        for chave in enderecos_unicos:
+            encontrado, coords = cache.buscar(chave)
+            if encontrado:
+                registrar_resultado(chave, *coords)
+            else:
+                pendentes.append(chave)
+
+        if backend is None:
+            resultados = ((endereco, (None, None)) for endereco in pendentes)
+        else:
+            resultados = geocodificar_em_lote(backend, pendentes, workers=WORKERS_GEOCODE)
+            totais["consultas"] = len(pendentes)
+        try:
+            for endereco, coords in tqdm(resultados, total=len(pendentes), desc="Geocodificando endereços", disable=not mostrar_progresso):
+                if coords is None:
+                    # Backend indisponível: não grava no cache nem no checkpoint para tentar de novo na retomada
+                    continue
+                # O cache é gravado aqui, na thread principal (a conexão SQLite não é compartilhada)
+                if backend is not None:
+                    cache.gravar(endereco, *coords)
+                registrar_resultado(endereco, *coords)
+        except ErroBackend as e:
+            checkpoint.fechar()
+            print(f"\nO backend de geocodificação recusou as consultas: {e}")
+            print("As coordenadas já encontradas ficaram no checkpoint: rode o script de novo quando o backend voltar.")
+            return None
+        finally:
+            checkpoint.gravar()
+            cache.fechar()
+
+        print(f"Cache de coordenadas: {cache.acertos} de {cache.consultas} endereços já conhecidos "
+              f"(taxa de acerto: {cache.taxa_acerto():.1%}).")
+        if gazetteer is not None:
+            print(f"Gazetteer local: {totais['aproximados']} linhas receberam coordenada aproximada (bairro/município).")
+
+    # --- Monta a planilha final a partir do checkpoint ---
+    resolvidas = checkpoint.carregar()
+    if resolvidas:
+        indices = list(resolvidas)
+        df.loc[indices, COL_LATITUDE] = [resolvidas[i][0] for i in indices]
+        df.loc[indices, COL_LONGITUDE] = [resolvidas[i][1] for i in indices]
+        df.loc[indices, COL_PRECISAO] = [resolvidas[i][2] for i in indices]
 
     try:
         df.to_excel(output_file, index=False)
+        checkpoint.concluir()
         print(f"\nSucesso! Seu novo arquivo está salvo como: '{output_file}'")
-        print("Use ESTE NOVO ARQUIVO para subir no seu dashboard.")
+        return totais
     except Exception as e:
+        checkpoint.fechar()
         print(f"\nErro ao salvar o arquivo: {e}")
-        print("Verifique se você fechou o arquivo 'relatorio_com_mapa.xlsx' antes de rodar o script.")
+        print(f"Verifique se você fechou o arquivo '{output_file}' antes de rodar o script.")
+        print("As coordenadas já encontradas ficaram no checkpoint: rode o script de novo para salvar sem refazer as buscas.")
+        return None
+
+# ---- MODO LOTE (linha de comando) ----
+# Limite de taxa compartilhado pelos processos do pool (definido em 'iniciar_worker_lote')
+LIMITADOR_LOTE = None
+
+def iniciar_worker_lote(limitador):
+    global LIMITADOR_LOTE
+    LIMITADOR_LOTE = limitador
+
+def processar_arquivo_no_worker(input_file, output_file, streaming):
+    inicio = time.perf_counter()
+    totais = processar_arquivo(input_file, output_file, limitador=LIMITADOR_LOTE, streaming=streaming, mostrar_progresso=False)
+    return totais, time.perf_counter() - inicio
+
+def listar_arquivos_entrada(caminhos, modelo_saida, pasta_saida=None):
+    """
+    Expande pastas em seus arquivos .xlsx, ignorando temporários do Excel e saídas deste script
+    (arquivos com o nome exato que o modelo de saída gera para outro .xlsx da mesma pasta).
+    """
+    arquivos = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            candidatos = [
+                os.path.join(caminho, nome) for nome in sorted(os.listdir(caminho))
+                if nome.lower().endswith(".xlsx") and not nome.startswith("~$")
+            ]
+            saidas = {os.path.normpath(nome_saida(c, modelo_saida, pasta_saida)): c for c in candidatos}
+            arquivos += [c for c in candidatos if saidas.get(os.path.normpath(c), c) == c]
+        else:
+            arquivos.append(caminho)
+    return arquivos
+
+def nome_saida(input_file, modelo_saida, pasta_saida=None):
+    nome = os.path.splitext(os.path.basename(input_file))[0]
+    pasta = pasta_saida or os.path.dirname(input_file)
+    return os.path.join(pasta, modelo_saida.format(nome=nome))
+
+def main_lote(argumentos):
+    parser = argparse.ArgumentParser(description="Geocodifica vários arquivos de exportação sem interação.")
+    parser.add_argument("entradas", nargs="+", help="Arquivos .xlsx ou pastas com arquivos .xlsx")
+    parser.add_argument("--saida", default="{nome}_com_mapa.xlsx",
+                        help="Modelo do nome de saída; {nome} é o nome do arquivo de entrada (padrão: %(default)s)")
+    parser.add_argument("--pasta-saida", default=None, help="Pasta das saídas (padrão: a mesma da entrada)")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1, help="Arquivos processados ao mesmo tempo")
+    parser.add_argument("--taxa", type=float, default=1.0,
+                        help="Consultas por segundo ao backend, somando todos os processos (padrão: %(default)s)")
+    parser.add_argument("--streaming", action="store_true", help="Usa o modo streaming (memória constante)")
+    args = parser.parse_args(argumentos)
+
+    arquivos = listar_arquivos_entrada(args.entradas, args.saida, args.pasta_saida)
+    faltando = [a for a in arquivos if not os.path.exists(a)]
+    for arquivo in faltando:
+        print(f"Aviso: arquivo não encontrado: '{arquivo}'")
+    arquivos = [a for a in arquivos if a not in faltando]
+    if not arquivos:
+        print("Nenhum arquivo .xlsx encontrado nas entradas informadas.")
+        return 1
+    if args.pasta_saida:
+        os.makedirs(args.pasta_saida, exist_ok=True)
+
+    print(f"--- Modo lote: {len(arquivos)} arquivos, {args.processos} processos, {args.taxa} consultas/s ---")
+    limitador = LimitadorTaxaCompartilhado(args.taxa)
+    resumo = []
+    with ProcessPoolExecutor(max_workers=args.processos, initializer=iniciar_worker_lote, initargs=(limitador,)) as pool:
+        futuros = {
+            pool.submit(processar_arquivo_no_worker, arquivo, nome_saida(arquivo, args.saida, args.pasta_saida), args.streaming): arquivo
+            for arquivo in arquivos
+        }
+        for futuro in as_completed(futuros):
+            arquivo = futuros[futuro]
+            try:
+                totais, segundos = futuro.result()
+            except Exception as e:
+                print(f"Falha em '{arquivo}': {e}")
+                totais, segundos = None, 0.0
+            resumo.append((arquivo, totais, segundos))
+
+    print("\n--- Resumo por arquivo ---")
+    falhas = 0
+    for arquivo, totais, segundos in sorted(resumo):
+        if totais is None:
+            falhas += 1
+            print(f"{os.path.basename(arquivo)}: ERRO")
+            continue
+        linhas_por_segundo = totais["linhas"] / segundos if segundos else 0.0
+        deduplicacao = ""
+        if totais["chaves"] is not None: # O modo streaming não conta endereços distintos
+            deduplicacao = f"{totais['enderecos_brutos']} endereços -> {totais['chaves']} canônicos, "
+        print(f"{os.path.basename(arquivo)}: {totais['linhas']} linhas, {deduplicacao}{totais['consultas']} consultas, "
+              f"{segundos:.1f}s ({linhas_por_segundo:.1f} linhas/s)")
+    if faltando:
+        print(f"{len(faltando)} entradas não encontradas (veja os avisos acima).")
+    return 1 if falhas or faltando else 0
+
+def main():
+    if len(sys.argv) > 1:
+        sys.exit(main_lote(sys.argv[1:]))
+
+    print("--- Script de Preparação de Mapa ---")
+    
+    input_file = input("Por favor, arraste seu arquivo Excel original para esta janela e aperte Enter: ")
+    input_file = input_file.strip().strip('"') 
+
+    if not os.path.exists(input_file):
+        print(f"Erro: Arquivo não encontrado em '{input_file}'")
+        return
+
+    if processar_arquivo(input_file, "relatorio_com_mapa.xlsx") is not None:
+        print("Use ESTE NOVO ARQUIVO para subir no seu dashboard.")
 
 if __name__ == "__main__":
     main()
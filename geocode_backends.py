@@ -0,0 +1,220 @@
+import csv
+import json
+import multiprocessing
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from geocode_cache import normalizar_endereco
+
+# --- Configuração Padrão do Pipeline ---
+WORKERS_PADRAO = 4
+TENTATIVAS_PADRAO = 3
+ESPERA_INICIAL_SEGUNDOS = 1.0 # Primeira espera do backoff exponencial
+ESPERA_MAXIMA_SEGUNDOS = 30.0
+
+
+class ErroTemporario(Exception):
+    """Falha passageira do backend (timeout, serviço fora do ar). A consulta pode ser repetida."""
+
+
+class ErroBackend(Exception):
+    """Falha que não passa repetindo (cota esgotada, acesso negado): interrompe a execução sem gravar nada."""
+
+
+class LimitadorTaxa:
+    """Token bucket compartilhado entre as threads: no máximo `taxa` consultas por segundo."""
+
+    def __init__(self, taxa, capacidade=1):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade)
+        self.tokens = float(capacidade)
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def aguardar(self):
+        while True:
+            with self.lock:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.taxa
+            # Dorme fora do lock para não travar as outras threads
+            time.sleep(espera)
+
+
+class LimitadorTaxaCompartilhado(LimitadorTaxa):
+    """
+    Mesmo token bucket, mas com o estado em memória compartilhada: um único limite
+    para vários processos. Deve ser criado no processo principal e entregue aos
+    workers na inicialização do pool.
+    """
+
+    def __init__(self, taxa, capacidade=1, contexto=None):
+        contexto = contexto or multiprocessing.get_context()
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade)
+        self.lock = contexto.Lock()
+        self._tokens = contexto.RawValue("d", float(capacidade))
+        self._ultimo = contexto.RawValue("d", time.monotonic())
+
+    @property
+    def tokens(self):
+        return self._tokens.value
+
+    @tokens.setter
+    def tokens(self, valor):
+        self._tokens.value = valor
+
+    @property
+    def ultimo(self):
+        return self._ultimo.value
+
+    @ultimo.setter
+    def ultimo(self, valor):
+        self._ultimo.value = valor
+
+
+# ---- BACKENDS ----
+class BackendGeocode:
+    """Interface dos backends: `geocodificar(endereco)` retorna (lat, lon) ou (None, None)."""
+
+    nome = "base"
+
+    def __init__(self, taxa_por_segundo=None):
+        self.limitador = LimitadorTaxa(taxa_por_segundo) if taxa_por_segundo else None
+
+    def geocodificar(self, endereco):
+        raise NotImplementedError
+
+
+class BackendNominatim(BackendGeocode):
+    """Nominatim (OpenStreetMap). A política de uso pública permite 1 consulta por segundo."""
+
+    nome = "nominatim"
+
+    def __init__(self, user_agent="meu_dashboard_streamlit_app", taxa_por_segundo=1.0, timeout=10):
+        super().__init__(taxa_por_segundo)
+        from geopy.geocoders import Nominatim
+        self.geolocator = Nominatim(user_agent=user_agent)
+        self.timeout = timeout
+
+    def geocodificar(self, endereco):
+        from geopy.exc import (GeocoderAuthenticationFailure, GeocoderInsufficientPrivileges,
+                               GeocoderQuotaExceeded, GeocoderRateLimited, GeocoderServiceError)
+        try:
+            location = self.geolocator.geocode(endereco, timeout=self.timeout)
+        except GeocoderRateLimited as e: # Subclasse de GeocoderQuotaExceeded, mas passa esperando
+            raise ErroTemporario(str(e)) from e
+        except (GeocoderQuotaExceeded, GeocoderAuthenticationFailure, GeocoderInsufficientPrivileges) as e:
+            raise ErroBackend(str(e)) from e
+        except GeocoderServiceError as e: # Timeout, serviço fora do ar, resposta inválida
+            raise ErroTemporario(str(e)) from e
+        if location:
+            return location.latitude, location.longitude
+        return None, None
+
+
+class BackendHTTP(BackendGeocode):
+    """Servidor HTTP local compatível com a busca do Nominatim (`GET /search?q=...&format=json`)."""
+
+    nome = "http"
+
+    def __init__(self, url_base="http://localhost:8080", taxa_por_segundo=None, timeout=10):
+        super().__init__(taxa_por_segundo)
+        self.url_base = url_base.rstrip("/")
+        self.timeout = timeout
+
+    def geocodificar(self, endereco):
+        url = f"{self.url_base}/search?" + urllib.parse.urlencode({"q": endereco, "format": "json", "limit": 1})
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as resposta:
+                dados = json.loads(resposta.read().decode("utf-8"))
+        except (OSError, ValueError) as e: # ValueError: resposta que não é JSON (erro do servidor, proxy)
+            raise ErroTemporario(str(e)) from e
+
+        if isinstance(dados, list):
+            dados = dados[0] if dados else {}
+        if not isinstance(dados, dict):
+            raise ErroTemporario(f"Resposta inesperada do servidor: {dados!r}")
+        if dados.get("lat") is None or dados.get("lon") is None:
+            return None, None
+        try:
+            return float(dados["lat"]), float(dados["lon"])
+        except (TypeError, ValueError) as e:
+            raise ErroTemporario(f"Coordenadas inválidas na resposta: {e}") from e
+
+
+class BackendArquivo(BackendGeocode):
+    """Resolve endereços a partir de um CSV com as colunas 'endereco', 'latitude' e 'longitude'."""
+
+    nome = "arquivo"
+
+    def __init__(self, caminho, taxa_por_segundo=None):
+        super().__init__(taxa_por_segundo)
+        self.coordenadas = {}
+        with open(caminho, newline="", encoding="utf-8") as f:
+            for linha in csv.DictReader(f):
+                self.coordenadas[normalizar_endereco(linha["endereco"])] = (
+                    float(linha["latitude"]), float(linha["longitude"])
+                )
+
+    def geocodificar(self, endereco):
+        return self.coordenadas.get(normalizar_endereco(endereco), (None, None))
+
+
+BACKENDS = {
+    BackendNominatim.nome: BackendNominatim,
+    BackendHTTP.nome: BackendHTTP,
+    BackendArquivo.nome: BackendArquivo,
+}
+
+def criar_backend(nome, **opcoes):
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend de geocodificação desconhecido: '{nome}'. Opções: {', '.join(BACKENDS)}")
+    return BACKENDS[nome](**opcoes)
+
+
+# ---- PIPELINE CONCORRENTE ----
+def consultar_com_retentativas(backend, endereco, tentativas=TENTATIVAS_PADRAO):
+    """
+    Consulta um endereço respeitando o limite de taxa, com backoff exponencial nas falhas passageiras.
+    Retorna (None, None) só quando o backend respondeu que não encontrou o endereço, e None se ele
+    continuou indisponível depois de todas as tentativas (não é gravado no cache nem no checkpoint).
+    'ErroBackend' (cota esgotada, acesso negado) não é repetido: sobe para quem chamou.
+    """
+    espera = ESPERA_INICIAL_SEGUNDOS
+    for tentativa in range(tentativas + 1):
+        if backend.limitador:
+            backend.limitador.aguardar()
+        try:
+            return backend.geocodificar(endereco)
+        except ErroTemporario:
+            if tentativa == tentativas:
+                return None
+            # A espera ocupa só esta thread; as demais seguem consultando
+            time.sleep(espera * random.uniform(0.5, 1.5))
+            espera = min(espera * 2, ESPERA_MAXIMA_SEGUNDOS)
+
+def geocodificar_em_lote(backend, enderecos, workers=WORKERS_PADRAO, tentativas=TENTATIVAS_PADRAO):
+    """
+    Geocodifica vários endereços em paralelo.
+    Gera pares (endereco, (lat, lon) ou None) na ordem em que as consultas terminam.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futuros = {
+            executor.submit(consultar_com_retentativas, backend, endereco, tentativas): endereco
+            for endereco in enderecos
+        }
+        for futuro in as_completed(futuros):
+            yield futuros[futuro], futuro.result()
+    finally:
+        # Se o consumidor parar no meio (Ctrl+C, erro), descarta as consultas que ainda não começaram
+        executor.shutdown(wait=False, cancel_futures=True)
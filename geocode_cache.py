@@ -0,0 +1,76 @@
+import sqlite3
+import time
+import unicodedata
+import re
+
+# --- Configuração do Cache de Coordenadas ---
+# O cache fica em disco e é reaproveitado entre execuções do 'geocode.py'.
+CACHE_PADRAO = "geocode_cache.sqlite"
+TTL_FALHA_SEGUNDOS = 7 * 24 * 60 * 60 # Endereços não encontrados são tentados de novo após 7 dias
+
+
+def normalizar_endereco(endereco):
+    """Gera a chave do cache: sem acentos, minúsculo e com espaços/pontuação padronizados."""
+    texto = unicodedata.normalize("NFKD", str(endereco))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.lower()
+    texto = re.sub(r"[^\w,]+", " ", texto)
+    texto = re.sub(r"\s*,\s*", ", ", texto)
+    return re.sub(r"\s+", " ", texto).strip(" ,")
+
+
+class CacheGeocode:
+    """Cache persistente (SQLite) de coordenadas por endereço normalizado."""
+
+    def __init__(self, caminho=CACHE_PADRAO, ttl_falha=TTL_FALHA_SEGUNDOS):
+        self.caminho = caminho
+        self.ttl_falha = ttl_falha
+        self.acertos = 0
+        self.consultas = 0
+        # WAL + timeout: o mesmo cache pode ser usado por vários processos ao mesmo tempo (modo lote)
+        self.conexao = sqlite3.connect(caminho, timeout=30)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS enderecos (
+                chave TEXT PRIMARY KEY,
+                latitude REAL,
+                longitude REAL,
+                atualizado_em REAL NOT NULL
+            )
+            """
+        )
+        self.conexao.commit()
+
+    def buscar(self, endereco):
+        """Retorna (encontrado, (lat, lon)). Falhas vencidas pelo TTL contam como não encontradas."""
+        self.consultas += 1
+        linha = self.conexao.execute(
+            "SELECT latitude, longitude, atualizado_em FROM enderecos WHERE chave = ?",
+            (normalizar_endereco(endereco),)
+        ).fetchone()
+        if linha is None:
+            return False, (None, None)
+
+        lat, lon, atualizado_em = linha
+        if lat is None and time.time() - atualizado_em > self.ttl_falha:
+            return False, (None, None)
+
+        self.acertos += 1
+        return True, (lat, lon)
+
+    def gravar(self, endereco, lat, lon):
+        """Grava o resultado (inclusive falhas, com lat/lon vazios) para o endereço."""
+        self.conexao.execute(
+            "INSERT OR REPLACE INTO enderecos (chave, latitude, longitude, atualizado_em) VALUES (?, ?, ?, ?)",
+            (normalizar_endereco(endereco), lat, lon, time.time())
+        )
+        self.conexao.commit()
+
+    def taxa_acerto(self):
+        if self.consultas == 0:
+            return 0.0
+        return self.acertos / self.consultas
+
+    def fechar(self):
+        self.conexao.close()
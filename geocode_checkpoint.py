@@ -0,0 +1,69 @@
+import hashlib
+import os
+import sqlite3
+
+# --- Configuração do Checkpoint ---
+PASTA_CHECKPOINTS = ".geocode_checkpoints"
+GRAVAR_A_CADA = 50 # Linhas acumuladas em memória antes de gravar no disco
+
+
+def caminho_checkpoint(arquivo_entrada, arquivo_saida="", pasta=PASTA_CHECKPOINTS):
+    """O checkpoint é identificado pelo conteúdo do arquivo de entrada (não pelo nome) e pela saída."""
+    sha = hashlib.sha1(os.path.abspath(arquivo_saida).encode("utf-8") if arquivo_saida else b"")
+    with open(arquivo_entrada, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloco)
+    return os.path.join(pasta, f"{sha.hexdigest()}.sqlite")
+
+
+class CheckpointGeocode:
+    """Diário (SQLite) das linhas já resolvidas de uma execução, para retomar após interrupção."""
+
+    def __init__(self, caminho, gravar_a_cada=GRAVAR_A_CADA):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self.gravar_a_cada = gravar_a_cada
+        self.pendentes = []
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS linhas (
+                indice INTEGER PRIMARY KEY,
+                latitude REAL,
+                longitude REAL,
+                precisao TEXT
+            )
+            """
+        )
+        self.conexao.commit()
+
+    def carregar(self):
+        """Retorna {indice: (lat, lon, precisao)} das linhas já resolvidas."""
+        linhas = self.conexao.execute("SELECT indice, latitude, longitude, precisao FROM linhas")
+        return {indice: (lat, lon, precisao) for indice, lat, lon, precisao in linhas}
+
+    def registrar(self, indice, lat, lon, precisao):
+        self.pendentes.append((int(indice), lat, lon, precisao))
+        if len(self.pendentes) >= self.gravar_a_cada:
+            self.gravar()
+
+    def gravar(self):
+        if not self.pendentes:
+            return
+        self.conexao.executemany(
+            "INSERT OR REPLACE INTO linhas (indice, latitude, longitude, precisao) VALUES (?, ?, ?, ?)",
+            self.pendentes
+        )
+        self.conexao.commit()
+        self.pendentes = []
+
+    def fechar(self):
+        self.gravar()
+        self.conexao.close()
+
+    def concluir(self):
+        """Remove o checkpoint depois que a planilha final foi salva com sucesso."""
+        self.conexao.close()
+        os.remove(self.caminho)
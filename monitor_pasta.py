@@ -0,0 +1,208 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime
+
+import dados
+import snapshots
+
+# --- Configuração do Monitor de Pasta ---
+# Exportações salvas nesta pasta são processadas em segundo plano e publicadas para todas as sessões.
+PASTA_EXPORTACOES = "exportacoes"
+INTERVALO_MONITOR_SEGUNDOS = 15
+EXTENSAO_EXPORTACAO = ".xlsx"
+PREFIXO_DELTA = "delta" # 'delta*.xlsx' só traz chamados novos/alterados: é mesclado na versão publicada
+
+
+@dataclass(frozen=True)
+class VersaoPublicada:
+    numero: int
+    chave: str
+    arquivo: str
+    publicada_em: datetime
+    resumo: dict = None # Resumo da mesclagem (só para arquivos delta)
+
+
+def processar_para_snapshot(caminho):
+    """
+    Roda num processo separado: lê e processa a planilha e grava o snapshot Arrow.
+    Retorna só a chave; o processo do Streamlit carrega o snapshot (memory-map), sem reprocessar.
+    """
+    with open(caminho, "rb") as arquivo:
+        conteudo = arquivo.read()
+    chave = dados.hash_conteudo(conteudo)
+    if snapshots.carregar_snapshot(dados.chave_snapshot(chave)) is None:
+        dados.carregar_dataset(conteudo, chave)
+    return chave
+
+def eh_exportacao(nome):
+    # '~$' são os arquivos de trava do Excel com a planilha aberta
+    return nome.lower().endswith(EXTENSAO_EXPORTACAO) and not nome.startswith(("~$", "."))
+
+def eh_delta(nome):
+    return nome.lower().startswith(PREFIXO_DELTA)
+
+
+class MonitorPasta:
+    """
+    Thread em segundo plano que vigia a pasta de exportações (por varredura periódica).
+
+    Um arquivo só é processado depois de duas varreduras seguidas com o mesmo tamanho/data (cópia terminada).
+    Exportações completas são processadas num processo à parte (o parse do XLSX não disputa a CPU
+    das páginas) e viram a nova versão publicada; arquivos 'delta*' são mesclados na versão atual.
+    Quando há mais de uma exportação completa pendente, só a mais recente é processada.
+    As páginas só leem a versão publicada ('publicada'): nenhuma rerun espera o processamento.
+    """
+
+    def __init__(self, pasta=PASTA_EXPORTACOES, registro=dados.REGISTRO, intervalo=INTERVALO_MONITOR_SEGUNDOS):
+        self.pasta = pasta
+        self.registro = registro
+        self.intervalo = intervalo
+        self.lock = threading.Lock()
+        self.thread = None
+        self.parar = threading.Event()
+        self.versao = None
+        self.vistos = {}       # nome -> (tamanho, data) da varredura anterior
+        self.processados = {}  # nome -> (tamanho, data) já publicados
+        self.processando = None
+        self.ultimo_erro = None
+        self.executor = None
+        self.assinantes = []   # Funções chamadas com cada versão publicada
+
+    # ---- Controle da thread ----
+    def iniciar(self):
+        """Inicia o monitor (uma vez por processo). Sem a pasta configurada, não faz nada."""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return True
+            if not os.path.isdir(self.pasta):
+                return False
+            self.parar.clear()
+            self.thread = threading.Thread(target=self.executar, name="monitor-pasta", daemon=True)
+            self.thread.start()
+            return True
+
+    def encerrar(self):
+        self.parar.set()
+        if self.thread is not None:
+            self.thread.join()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def ativo(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def executar(self):
+        while not self.parar.is_set():
+            try:
+                self.varrer()
+            except Exception as e: # A thread nunca morre por causa de um arquivo ruim
+                self.ultimo_erro = f"{datetime.now():%H:%M:%S} {e}"
+            self.parar.wait(self.intervalo)
+
+    # ---- Varredura e processamento ----
+    def arquivos_prontos(self):
+        """Arquivos novos/alterados com tamanho e data iguais aos da varredura anterior, do mais antigo ao mais novo."""
+        atuais = {}
+        with os.scandir(self.pasta) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and eh_exportacao(entrada.name):
+                    info = entrada.stat()
+                    atuais[entrada.name] = (info.st_size, info.st_mtime_ns)
+        prontos = [
+            nome for nome, assinatura in atuais.items()
+            if self.vistos.get(nome) == assinatura and self.processados.get(nome) != assinatura
+        ]
+        self.vistos = atuais
+        prontos.sort(key=lambda nome: atuais[nome][1])
+        # Uma exportação completa substitui tudo o que veio antes dela
+        completos = [i for i, nome in enumerate(prontos) if not eh_delta(nome)]
+        if completos:
+            for nome in prontos[:completos[-1]]:
+                self.processados[nome] = atuais[nome]
+            prontos = prontos[completos[-1]:]
+        return [(nome, atuais[nome]) for nome in prontos]
+
+    def varrer(self):
+        for nome, assinatura in self.arquivos_prontos():
+            caminho = os.path.join(self.pasta, nome)
+            self.processando = nome
+            try:
+                if eh_delta(nome):
+                    atual = self.publicada()
+                    if atual is None:
+                        continue # Delta sem versão base: espera a próxima exportação completa
+                    with open(caminho, "rb") as arquivo:
+                        chave, resumo = self.registro.mesclar(atual.chave, arquivo.read(), dados.MODO_DELTA)
+                else:
+                    chave, resumo = self.processar_completo(caminho), None
+                # Deixa o índice de filtros pronto antes de publicar (a primeira rerun não monta nada)
+                self.registro.indice_filtros(chave)
+                self.publicar(chave, nome, resumo)
+                self.processados[nome] = assinatura
+                self.ultimo_erro = None
+            except Exception as e:
+                self.processados[nome] = assinatura # Não tenta o mesmo arquivo quebrado a cada varredura
+                self.ultimo_erro = f"{datetime.now():%H:%M:%S} {nome}: {e}"
+            finally:
+                self.processando = None
+
+    def processar_completo(self, caminho):
+        """Processa a exportação fora do processo do Streamlit; sem pyarrow (sem snapshot), processa aqui mesmo."""
+        if snapshots.snapshots_disponiveis():
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            try:
+                chave = self.executor.submit(processar_para_snapshot, caminho).result()
+                if self.registro.obter(chave) is not None:
+                    return chave
+            except BrokenProcessPool: # Processo auxiliar caiu: recria na próxima vez e processa aqui
+                self.executor = None
+        with open(caminho, "rb") as arquivo:
+            return self.registro.carregar(arquivo.read())
+
+    # ---- Publicação ----
+    def publicar(self, chave, arquivo, resumo=None):
+        with self.lock:
+            numero = self.versao.numero + 1 if self.versao is not None else 1
+            self.versao = versao = VersaoPublicada(numero, chave, arquivo, datetime.now(), resumo)
+            assinantes = list(self.assinantes)
+        for funcao in assinantes:
+            try:
+                funcao(versao)
+            except Exception as e: # Um assinante com problema não impede a publicação
+                self.ultimo_erro = f"{datetime.now():%H:%M:%S} {e}"
+
+    def assinar(self, funcao):
+        """Chama `funcao(versao)` a cada publicação (na thread do monitor) e já com a versão atual, se houver."""
+        with self.lock:
+            self.assinantes.append(funcao)
+            atual = self.versao
+        if atual is not None:
+            funcao(atual)
+
+    def publicada(self):
+        """Versão publicada mais recente (ou None se nada foi processado ainda)."""
+        with self.lock:
+            return self.versao
+
+
+# Instância única por processo do Streamlit (como 'dados.REGISTRO')
+MONITOR = MonitorPasta()
+
+
+def acompanhar_pasta(estado):
+    """
+    Chamado no início das páginas: inicia o monitor e, quando ele publica uma versão nova, troca o
+    dataset da sessão por ela. Entre uma publicação e outra a sessão mantém o que escolheu
+    (upload manual ou mesclagem). Retorna a versão publicada (ou None).
+    """
+    MONITOR.iniciar()
+    publicada = MONITOR.publicada()
+    if publicada is not None and estado.get('versao_pasta') != publicada.numero:
+        estado['dataset_chave'] = publicada.chave
+        estado['versao_pasta'] = publicada.numero
+    return publicada
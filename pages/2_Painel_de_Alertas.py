@@ -1,366 +1,545 @@
-import streamlit as st
-import pandas as pd
-import config # <-- Importa o arquivo de configuração
-from streamlit_folium import st_folium # <-- Importa o componente Folium
-from datetime import datetime
-
-st.set_page_config(layout="wide")
-st.title("🚨 Painel de Alertas e Pendências (SLA Dinâmico)")
-
-# --- Inicialização de Variáveis ---
-editor_key = 'action_editor' 
-
-# Verifica se o DF PROCESSADO existe
-if 'df_processado' not in st.session_state or st.session_state['df_processado'].empty:
-    st.error("Por favor, carregue um arquivo na página 'Visão Geral' primeiro.")
-    st.stop()
-
-# Busca o DF PROCESSADO COMPLETO
-df_processado = st.session_state['df_processado']
-
-# --- Inicialização do Estado de Ação ---
-if 'status_map' not in st.session_state:
-    st.session_state['status_map'] = {}
-if 'log_contato' not in st.session_state:
-    st.session_state['log_contato'] = {}
-if 'show_contact_form' not in st.session_state:
-    st.session_state['show_contact_form'] = False
-
-# Filtra removendo 'Concluído'
-status_map = st.session_state['status_map']
-concluidos_ids = [id for id, status in status_map.items() if status == 'Concluído']
-
-if concluidos_ids:
-    df_processado = df_processado[~df_processado[config.COLUNA_ID_CLIENTE].isin(concluidos_ids)]
-    st.success(f"✅ {len(concluidos_ids)} atendimentos concluídos removidos da lista.")
-
-
-# =============================================================================
-# ---- LÓGICA DE FILTROS EM CASCATA (DINÂMICOS) ----
-# =============================================================================
-st.sidebar.subheader("Filtros do Painel de Alertas")
-
-# Vamos usar uma variável temporária que vai sendo filtrada passo a passo
-df_cascade = df_processado.copy()
-
-# 1. FILTRO DE CIDADE (Nível 1)
-# As opções vêm de todo o dataframe
-opcoes_cidades = sorted(df_processado[config.COLUNA_CIDADE].dropna().unique())
-cidades_selecionadas = st.sidebar.multiselect(
-    f'Filtrar por {config.COLUNA_CIDADE}',
-    options=opcoes_cidades,
-    default=[],
-    key='alertas_cidade' 
-)
-
-# Aplica o filtro de cidade imediatamente na variável temporária
-if cidades_selecionadas:
-    df_cascade = df_cascade[df_cascade[config.COLUNA_CIDADE].isin(cidades_selecionadas)]
-
-# 2. FILTRO DE TÉCNICO (Nível 2 - Depende da Cidade)
-tecnicos_selecionados = []
-if config.COLUNA_TECNICO in df_processado.columns:
-    # MUDANÇA: As opções vêm de 'df_cascade' (já filtrado por cidade)
-    opcoes_tecnicos = sorted(df_cascade[config.COLUNA_TECNICO].dropna().unique())
-    
-    tecnicos_selecionados = st.sidebar.multiselect(
-        f'Filtrar por {config.COLUNA_TECNICO}',
-        options=opcoes_tecnicos,
-        default=[],
-        key='alertas_tecnico' 
-    )
-    
-    # Aplica o filtro de técnico na variável temporária
-    if tecnicos_selecionados:
-        df_cascade = df_cascade[df_cascade[config.COLUNA_TECNICO].isin(tecnicos_selecionados)]
-
-# 3. FILTRO DE ASSUNTO (Nível 3 - Depende de Cidade + Técnico)
-assuntos_selecionados = []
-if config.COLUNA_ASSUNTO in df_processado.columns:
-    # MUDANÇA: As opções vêm de 'df_cascade' (já filtrado por cidade e técnico)
-    opcoes_assuntos = sorted(df_cascade[config.COLUNA_ASSUNTO].dropna().unique())
-    
-    assuntos_selecionados = st.sidebar.multiselect(
-        f'Filtrar por {config.COLUNA_ASSUNTO}',
-        options=opcoes_assuntos,
-        default=[],
-        key='alertas_assunto' 
-    )
-    
-    # Aplica o filtro
-    if assuntos_selecionados:
-        df_cascade = df_cascade[df_cascade[config.COLUNA_ASSUNTO].isin(assuntos_selecionados)]
-
-# 4. FILTRO DE STATUS (Flags)
-status_selecionados = []
-if config.COLUNA_STATUS in df_processado.columns:
-    st.sidebar.subheader(f"Filtrar por {config.COLUNA_STATUS}")
-    opcoes_status = sorted(df_processado[config.COLUNA_STATUS].dropna().unique())
-    for status in opcoes_status:
-        is_default = (status == config.STATUS_ABERTOS[0])
-        if st.sidebar.checkbox(status, value=is_default, key=f"alertas_status_{status}"):
-            status_selecionados.append(status)
-    
-    # Aplica o filtro
-    df_cascade = df_cascade[df_cascade[config.COLUNA_STATUS].isin(status_selecionados)]
-
-# =============================================================================
-# FIM DOS FILTROS
-# =============================================================================
-
-# O df_filtrado_alertas final é o resultado da cascata
-df_filtrado_alertas = df_cascade
-
-
-# ---- Lógica da Página ----
-df_abertos = df_filtrado_alertas.copy()
-
-if not df_abertos.empty:
-    # 1. ORDENAÇÃO E NUMERAÇÃO
-    df_abertos = df_abertos.sort_values(
-        by='Tempo_Decorrido_Segundos', 
-        ascending=False, 
-        na_position='last'
-    ).reset_index(drop=True)
-    df_abertos.insert(0, 'Prioridade', df_abertos.index + 1)
-    
-    # Cálculos de SLA
-    df_abertos['Tempo_Restante_Segundos'] = df_abertos['SLA_Total_Segundos'] - df_abertos['Tempo_Decorrido_Segundos']
-    df_abertos['SLA_Estourado'] = df_abertos['Tempo_Restante_Segundos'] < 0
-    df_abertos['SLA_Alerta'] = df_abertos.apply(
-        lambda row: row['Tempo_Restante_Segundos'] > 0 and 
-                    row['Tempo_Restante_Segundos'] <= row['SLA_Alerta_Segundos'], axis=1
-    )
-    
-    # 2. CARREGA O STATUS PERSISTENTE NA COLUNA 'Ação'
-    df_abertos['Ação'] = df_abertos[config.COLUNA_ID_CLIENTE].apply(lambda id: status_map.get(id, 'Aberto'))
-
-
-if df_abertos.empty:
-    st.success("🎉 Nenhum chamado encontrado para os filtros atuais!")
-else:
-    # --- BOTÃO GATILHO ---
-    st.markdown("---")
-    if not st.session_state.get('show_contact_form', False):
-        if st.button("📝 Abrir Formulário de Contato Detalhado", key="open_form_btn"):
-            st.session_state['show_contact_form'] = True
-            st.rerun() 
-
-    # --- FORMULÁRIO DE REGISTRO DE TRATATIVA ---
-    if st.session_state.get('show_contact_form', False):
-        st.markdown("---")
-        
-        col_header, col_close = st.columns([4, 1])
-        col_header.header("📋 Registro de Contato")
-        
-        if col_close.button("❌ Fechar Formulário"):
-            st.session_state['show_contact_form'] = False
-            st.rerun()
-
-        # 1. Filtra a lista para APENAS 'Em Tratativa' para o selectbox
-        df_em_tratativa = df_abertos[df_abertos['Ação'] == 'Em Tratativa'].copy()
-
-        if df_em_tratativa.empty:
-            st.warning("⚠️ Nenhuma atendimento marcado como 'Em Tratativa'. Marque um atendimento na lista abaixo para registrar o contato.")
-        else:
-            
-            # Mapeia IDs para Prioridades para exibir no Selectbox
-            id_to_priority = {
-                row[config.COLUNA_ID_CLIENTE]: f"#{row['Prioridade']} (ID: {row[config.COLUNA_ID_CLIENTE]}) - {row[config.COLUNA_ASSUNTO]}"
-                for index, row in df_em_tratativa.iterrows() 
-            }
-            
-            priority_options = list(id_to_priority.values())
-            
-            # Lógica de Retenção do Selectbox
-            selected_option_str = st.session_state.get("selected_ticket_for_log")
-            
-            try:
-                initial_index = priority_options.index(selected_option_str)
-            except (ValueError, TypeError):
-                initial_index = 0
-            
-            selected_option = st.selectbox(
-                "Selecione o Atendimento para Registrar Log:",
-                options=priority_options,
-                index=initial_index,
-                key="selected_ticket_for_log"
-            )
-            
-            # Extrai o ID do cliente selecionado
-            selected_id = selected_option.split('ID: ')[-1].split(')')[0]
-            
-            # --- BUSCA SEGURA ---
-            # Verifica se o ID ainda existe na lista filtrada
-            if selected_id in df_em_tratativa[config.COLUNA_ID_CLIENTE].values:
-                active_item = df_em_tratativa[df_em_tratativa[config.COLUNA_ID_CLIENTE] == selected_id].iloc[0]
-            else:
-                active_item = df_em_tratativa.iloc[0]
-                selected_id = active_item[config.COLUNA_ID_CLIENTE]
-
-
-            if active_item is not None:
-                primeira_prioridade = active_item['Prioridade']
-                current_status = status_map.get(selected_id, 'Aberto')
-                
-                # Encontra o índice atual para o selectbox
-                status_options = ['Aberto', 'Em Tratativa', 'Concluído']
-                try:
-                    idx_status = status_options.index(current_status)
-                except ValueError:
-                    idx_status = 0
-                
-                st.markdown(f"**Tratando Prioridade #{primeira_prioridade}** (ID: `{selected_id}` | Assunto: `{active_item[config.COLUNA_ASSUNTO]}`)")
-                st.info(f"Status Atual: **{current_status}**")
-                
-                with st.form("contact_form_details", clear_on_submit=True):
-                    
-                    # SELETOR DE STATUS (Fonte de verdade)
-                    st.subheader("1. Atualizar Status")
-                    novo_status_form = st.selectbox("Novo Status:", status_options, index=idx_status)
-
-                    st.markdown("---")
-                    st.subheader("2. Registrar Contato")
-
-                    col_c1, col_c2 = st.columns(2)
-                    input_contato1 = col_c1.text_input("Opção de Contato 1", key="input_contato1")
-                    input_contato2 = col_c2.text_input("Opção de Contato 2", key="input_contato2")
-                    
-                    st.write("**Meio de Contato Realizado:**")
-                    col_check1, col_check2, col_check3, col_check4 = st.columns(4)
-                    check_call = col_check1.checkbox("📞 Ligação")
-                    check_msg = col_check2.checkbox("📱 Mensagem SMS")
-                    check_wapp = col_check3.checkbox("📞 WhatsApp (Ligação)")
-                    check_wapp_msg = col_check4.checkbox("💬 WhatsApp (Mensagem)")
-                    
-                    notes = st.text_area("Observações da Tentativa/Próximos Passos", max_chars=500)
-                    
-                    submitted = st.form_submit_button("✅ Salvar Status e Log")
-
-                    if submitted:
-                        if novo_status_form != 'Aberto' and not (check_call or check_msg or check_wapp or check_wapp_msg or notes):
-                             st.warning("Atenção: Você mudou o status mas não registrou nenhum detalhe de contato/observação.")
-                        
-                        # 1. Salva LOG
-                        log_entry = {
-                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "cliente_id": selected_id,
-                            "novo_status": novo_status_form, 
-                            "contato_op1": input_contato1,
-                            "contato_op2": input_contato2,
-                            "meio": [
-                                m for m, checked in [
-                                    ("Ligação", check_call), ("SMS", check_msg), 
-                                    ("WhatsApp Ligação", check_wapp), ("WhatsApp Mensagem", check_wapp_msg)
-                                ] if checked
-                            ],
-                            "observacoes": notes
-                        }
-                        st.session_state.setdefault('log_contato', {}).setdefault(selected_id, []).append(log_entry)
-                        
-                        # 2. ATUALIZA O STATUS NA MEMÓRIA (PERSISTÊNCIA)
-                        st.session_state['status_map'][selected_id] = novo_status_form
-                        
-                        st.success(f"Sucesso! Status alterado para '{novo_status_form}'.")
-                        
-                        if novo_status_form == 'Concluído':
-                            st.session_state['show_contact_form'] = False
-                        
-                        st.rerun()
-
-            st.button("❌ Fechar Formulário", on_click=lambda: st.session_state.update(show_contact_form=False), key="close_form_out")
-    
-    st.markdown("---")
-    
-    # ---- KPIs Principais ----
-    st.subheader("KPIs dos Chamados Selecionados")
-    col_kpi1, col_kpi2, col_kpi3 = st.columns(3)
-    
-    total_abertos = len(df_abertos)
-    total_fora_sla = df_abertos['SLA_Estourado'].sum()
-    total_em_alerta = df_abertos['SLA_Alerta'].sum()
-    
-    col_kpi1.metric("Total de Chamados na Lista", total_abertos)
-    col_kpi2.metric("Total Fora do SLA (Estourado)", f"{total_fora_sla} 🚨")
-    col_kpi3.metric("Total em Alerta (Regra de 4h)", f"{total_em_alerta} ⚠️")
-
-    # ---- KPIs de Alerta por Hora de Abertura ----
-    st.subheader("Monitoramento de Tempo Aberto (Próximo do SLA)")
-    col_alerta1, col_alerta2, col_alerta3, col_alerta4 = st.columns(4)
-    
-    h19, h20, h21, h22, h23 = 19*3600, 20*3600, 21*3600, 22*3600, 23*3600
-
-    abertos_19h = df_abertos[df_abertos['Tempo_Decorrido_Segundos'].between(h19, h20, inclusive='left')].shape[0]
-    abertos_20h = df_abertos[df_abertos['Tempo_Decorrido_Segundos'].between(h20, h21, inclusive='left')].shape[0]
-    abertos_21h = df_abertos[df_abertos['Tempo_Decorrido_Segundos'].between(h21, h22, inclusive='left')].shape[0]
-    abertos_22h = df_abertos[df_abertos['Tempo_Decorrido_Segundos'].between(h22, h23, inclusive='left')].shape[0]
-
-    col_alerta1.metric("Abertos há 19h", f"{abertos_19h} 🟡")
-    col_alerta2.metric("Abertos há 20h", f"{abertos_20h} 🟠")
-    col_alerta3.metric("Abertos há 21h", f"{abertos_21h} 🔴")
-    col_alerta4.metric("Abertos há 22h", f"{abertos_22h} 🚨")
-    
-    # ---- Mapa de Alertas ----
-    st.subheader("Mapa de Chamados Pendentes")
-    if config.COLUNA_LATITUDE in df_abertos.columns and config.COLUNA_LONGITUDE in df_abertos.columns:
-        df_mapa_alertas = df_abertos.dropna(subset=[config.COLUNA_LATITUDE, config.COLUNA_LONGITUDE])
-        if df_mapa_alertas.empty:
-            st.info("Nenhum chamado pendente com coordenadas válidas encontrado.")
-        else:
-            mapa_folium = config.criar_mapa_folium(df_mapa_alertas)
-            st_folium(mapa_folium, use_container_width=True, height=400, returned_objects=[])
-    else:
-        st.warning("Colunas 'latitude' ou 'longitude' não encontradas. O mapa não pode ser exibido.")
-
-    # ---- Tabela de Chamados com Ação ----
-    st.subheader("Lista de Chamados (Ordenado por Prioridade)")
-    
-    # Cria os valores formatados para exibição
-    df_display = df_abertos.copy()
-    df_display['Data Abertura'] = df_display[config.COLUNA_ABERTURA].dt.strftime('%d/%m/%y %H:%M') 
-    df_display['Tempo Aberto'] = df_display['Tempo_Decorrido_Segundos'].apply(config.formatar_hms)
-    df_display['Restante SLA'] = df_display['Tempo_Restante_Segundos'].apply(config.formatar_hms)
-    
-    # Colunas que serão exibidas (Read-Only)
-    colunas_finais = [
-        'Ação', 
-        'Prioridade', config.COLUNA_ID_CLIENTE, config.COLUNA_NOME_CLIENTE, config.COLUNA_ASSUNTO, 
-        config.COLUNA_STATUS, 'Data Abertura', 'Tempo Aberto', 'Restante SLA', 
-    ]
-    if config.COLUNA_TECNICO in df_display.columns:
-        colunas_finais.insert(5, config.COLUNA_TECNICO) 
-    
-    # Colunas visíveis
-    cols_visual = [col for col in colunas_finais if col in df_display.columns or col in ['Prioridade', 'Data Abertura', 'Tempo Aberto', 'Restante SLA', 'Ação']]
-    
-    # Colunas auxiliares para estilo (que serão escondidas)
-    cols_aux = [
-        'Tempo_Decorrido_Segundos', 'Tempo_Restante_Segundos', 
-        'SLA_Estourado', 'SLA_Alerta'
-    ]
-    cols_aux = [c for c in cols_aux if c in df_display.columns]
-    
-    # Combina visual + auxiliar para passar ao Styler
-    cols_total = cols_visual + [c for c in cols_aux if c not in cols_visual]
-
-    # MUDANÇA FINAL: Tabela de leitura com estilos
-    st.dataframe(
-        df_display[cols_total].style.apply(config.highlight_sla, axis=1)
-                         .hide(axis="columns", subset=cols_aux),
-        use_container_width=True,
-        hide_index=True
-    )
-    
-    # Lógica para registrar o status na memória
-    if st.session_state.get(editor_key, False):
-        edited_data = st.session_state[editor_key]
-        if edited_data.get('edited_rows'):
-            for index, row in edited_data['edited_rows'].items():
-                if row.get('Ação'):
-                    cliente_id = df_display.iloc[index][config.COLUNA_ID_CLIENTE]
-                    novo_status = row.get('Ação')
-                    
-                    st.session_state['status_map'][cliente_id] = novo_status
-                    
-                    if novo_status == 'Concluído':
-                        st.rerun()
+import streamlit as st
+import pandas as pd
+import numpy as np
+import config # <-- Importa o arquivo de configuração
+import dados # <-- Registro compartilhado de datasets
+from ao_vivo import TemposAoVivo, agora_epoch, INTERVALO_AO_VIVO_PADRAO
+import streamlit.components.v1 as components
+import cache_mapas # <-- Mapas renderizados em cache
+import rotas # <-- Rotas sugeridas por técnico
+import despacho # <-- Sugestão de técnico para chamados sem técnico
+import tabelas # <-- Tabelas paginadas (busca/ordenação no servidor)
+import acoes # <-- Registro persistente de status e contatos (compartilhado entre operadores)
+import monitor_pasta # <-- Versão publicada pela pasta monitorada
+import agendador_sla # <-- Transições de SLA agendadas (avisos sem precisar abrir a página)
+import envelhecimento # <-- Histogramas de envelhecimento dos chamados
+import plotly.express as px
+
+st.set_page_config(layout="wide")
+st.title("🚨 Painel de Alertas e Pendências (SLA Dinâmico)")
+
+# --- Inicialização de Variáveis ---
+editor_key = 'action_editor' 
+AVISOS_SLA_MAX = 5 # Avisos de SLA mostrados por vez (os demais ficam no arquivo de eventos)
+
+# Passa para a versão publicada pela pasta monitorada, se houver uma nova
+monitor_pasta.acompanhar_pasta(st.session_state)
+
+# Busca o dataset da sessão no registro compartilhado (a sessão guarda só a chave)
+df_base = dados.REGISTRO.obter(st.session_state['dataset_chave']) if 'dataset_chave' in st.session_state else None
+if df_base is None or df_base.empty:
+    st.error("Por favor, carregue um arquivo na página 'Visão Geral' primeiro.")
+    st.stop()
+
+# --- Inicialização do Estado de Ação ---
+# Status e log de contatos ficam no registro de ações (SQLite), não na sessão
+if 'show_contact_form' not in st.session_state:
+    st.session_state['show_contact_form'] = False
+
+# Índice dos filtros (montado uma vez por dataset): os filtros viram máscaras por posição de linha
+indice = dados.REGISTRO.indice_filtros(st.session_state['dataset_chave'])
+
+# Filtra removendo 'Concluído': IDs concluídos (em cache até o registro mudar) cruzados com o índice de IDs
+mascara_concluidos = indice.mascara_ids(acoes.REGISTRO.clientes_com_status(acoes.STATUS_CONCLUIDO))
+mascara_base = ~mascara_concluidos
+total_concluidos = int(np.count_nonzero(mascara_concluidos))
+if total_concluidos:
+    st.success(f"✅ {total_concluidos} atendimentos concluídos removidos da lista.")
+
+
+# =============================================================================
+# ---- LÓGICA DE FILTROS EM CASCATA (DINÂMICOS) ----
+# =============================================================================
+st.sidebar.subheader("Filtros do Painel de Alertas")
+
+# Máscara que vai sendo combinada (AND) passo a passo; as opções de cada nível saem do índice
+mascara_cascata = mascara_base.copy()
+
+# 1. FILTRO DE CIDADE (Nível 1)
+# As opções vêm de todo o dataframe
+opcoes_cidades = indice.opcoes(config.COLUNA_CIDADE, mascara_base)
+cidades_selecionadas = st.sidebar.multiselect(
+    f'Filtrar por {config.COLUNA_CIDADE}',
+    options=opcoes_cidades,
+    default=[],
+    key='alertas_cidade' 
+)
+
+# Aplica o filtro de cidade imediatamente na máscara
+if cidades_selecionadas:
+    mascara_cascata &= indice.mascara(config.COLUNA_CIDADE, cidades_selecionadas)
+
+# 2. FILTRO DE TÉCNICO (Nível 2 - Depende da Cidade)
+tecnicos_selecionados = []
+if indice.tem_coluna(config.COLUNA_TECNICO):
+    # As opções vêm da máscara já filtrada por cidade
+    opcoes_tecnicos = indice.opcoes(config.COLUNA_TECNICO, mascara_cascata)
+    
+    tecnicos_selecionados = st.sidebar.multiselect(
+        f'Filtrar por {config.COLUNA_TECNICO}',
+        options=opcoes_tecnicos,
+        default=[],
+        key='alertas_tecnico' 
+    )
+    
+    # Aplica o filtro de técnico na máscara
+    if tecnicos_selecionados:
+        mascara_cascata &= indice.mascara(config.COLUNA_TECNICO, tecnicos_selecionados)
+
+# 3. FILTRO DE ASSUNTO (Nível 3 - Depende de Cidade + Técnico)
+assuntos_selecionados = []
+if indice.tem_coluna(config.COLUNA_ASSUNTO):
+    # As opções vêm da máscara já filtrada por cidade e técnico
+    opcoes_assuntos = indice.opcoes(config.COLUNA_ASSUNTO, mascara_cascata)
+    
+    assuntos_selecionados = st.sidebar.multiselect(
+        f'Filtrar por {config.COLUNA_ASSUNTO}',
+        options=opcoes_assuntos,
+        default=[],
+        key='alertas_assunto' 
+    )
+    
+    # Aplica o filtro
+    if assuntos_selecionados:
+        mascara_cascata &= indice.mascara(config.COLUNA_ASSUNTO, assuntos_selecionados)
+
+# 4. FILTRO DE STATUS (Flags)
+status_selecionados = []
+if indice.tem_coluna(config.COLUNA_STATUS):
+    st.sidebar.subheader(f"Filtrar por {config.COLUNA_STATUS}")
+    opcoes_status = indice.opcoes(config.COLUNA_STATUS, mascara_base)
+    for status in opcoes_status:
+        is_default = (status == config.STATUS_ABERTOS[0])
+        if st.sidebar.checkbox(status, value=is_default, key=f"alertas_status_{status}"):
+            status_selecionados.append(status)
+    
+    # Aplica o filtro
+    mascara_cascata &= indice.mascara(config.COLUNA_STATUS, status_selecionados)
+
+# =============================================================================
+# FIM DOS FILTROS
+# =============================================================================
+
+# ---- ATUALIZAÇÃO AO VIVO ----
+# Ligada, só os blocos que dependem do relógio (KPIs e tabela) se atualizam no intervalo escolhido;
+# filtros, mapa e demais cálculos ficam como estão até a próxima interação.
+st.sidebar.subheader("Atualização ao Vivo")
+ao_vivo = st.sidebar.checkbox("⏱️ Atualizar tempos automaticamente", value=False, key='alertas_ao_vivo')
+intervalo_ao_vivo = st.sidebar.number_input(
+    "Intervalo (segundos)", min_value=5, max_value=600, value=INTERVALO_AO_VIVO_PADRAO, step=5,
+    key='alertas_intervalo_ao_vivo', disabled=not ao_vivo
+)
+
+def fragmento_ao_vivo(funcao):
+    """No modo ao vivo a função vira um fragmento que se reexecuta sozinho a cada intervalo."""
+    if ao_vivo and hasattr(st, 'fragment'):
+        return st.fragment(run_every=intervalo_ao_vivo)(funcao)
+    return funcao
+
+# ---- Lógica da Página ----
+# 1. ORDENAÇÃO E NUMERAÇÃO
+# A cascata fica como posições de linha sobre o dataset compartilhado. Maior tempo decorrido primeiro
+# é o mesmo que abertura mais antiga primeiro: ordena as posições só pela coluna de abertura, sem copiar o dataset.
+posicoes_abertos = np.flatnonzero(mascara_cascata)
+if config.COLUNA_ABERTURA in df_base.columns:
+    aberturas = df_base[config.COLUNA_ABERTURA].iloc[posicoes_abertos].reset_index(drop=True)
+    posicoes_abertos = posicoes_abertos[aberturas.sort_values(na_position='last', kind='stable').index.to_numpy()]
+
+# Só as linhas selecionadas são materializadas, já com o SLA dinâmico (Tempo_Restante_Segundos,
+# SLA_Estourado, SLA_Alerta... do motor vetorizado 'config.calcular_sla')
+df_abertos = dados.calcular_tempos_ao_vivo(df_base.iloc[posicoes_abertos].reset_index(drop=True))
+
+if not df_abertos.empty:
+    df_abertos.insert(0, 'Prioridade', df_abertos.index + 1)
+    
+    # 2. CARREGA O STATUS PERSISTENTE NA COLUNA 'Ação'
+    df_abertos['Ação'] = (
+        df_abertos[config.COLUNA_ID_CLIENTE].astype(str)
+        .map(acoes.REGISTRO.status_por_cliente())
+        .fillna(acoes.STATUS_ABERTO)
+        .astype(object)
+    )
+
+
+if df_abertos.empty:
+    st.success("🎉 Nenhum chamado encontrado para os filtros atuais!")
+else:
+    # --- BOTÃO GATILHO ---
+    st.markdown("---")
+    if not st.session_state.get('show_contact_form', False):
+        if st.button("📝 Abrir Formulário de Contato Detalhado", key="open_form_btn"):
+            st.session_state['show_contact_form'] = True
+            st.rerun() 
+
+    # --- FORMULÁRIO DE REGISTRO DE TRATATIVA ---
+    if st.session_state.get('show_contact_form', False):
+        st.markdown("---")
+        
+        col_header, col_close = st.columns([4, 1])
+        col_header.header("📋 Registro de Contato")
+        
+        if col_close.button("❌ Fechar Formulário"):
+            st.session_state['show_contact_form'] = False
+            st.rerun()
+
+        # 1. Filtra a lista para APENAS 'Em Tratativa' para o selectbox
+        df_em_tratativa = df_abertos[df_abertos['Ação'] == acoes.STATUS_EM_TRATATIVA]
+
+        if df_em_tratativa.empty:
+            st.warning("⚠️ Nenhuma atendimento marcado como 'Em Tratativa'. Marque um atendimento na lista abaixo para registrar o contato.")
+        else:
+            
+            # Mapeia IDs para Prioridades para exibir no Selectbox
+            id_to_priority = {
+                row[config.COLUNA_ID_CLIENTE]: f"#{row['Prioridade']} (ID: {row[config.COLUNA_ID_CLIENTE]}) - {row[config.COLUNA_ASSUNTO]}"
+                for index, row in df_em_tratativa.iterrows() 
+            }
+            
+            priority_options = list(id_to_priority.values())
+            
+            # Lógica de Retenção do Selectbox
+            selected_option_str = st.session_state.get("selected_ticket_for_log")
+            
+            try:
+                initial_index = priority_options.index(selected_option_str)
+            except (ValueError, TypeError):
+                initial_index = 0
+            
+            selected_option = st.selectbox(
+                "Selecione o Atendimento para Registrar Log:",
+                options=priority_options,
+                index=initial_index,
+                key="selected_ticket_for_log"
+            )
+            
+            # Extrai o ID do cliente selecionado
+            selected_id = selected_option.split('ID: ')[-1].split(')')[0]
+            
+            # --- BUSCA SEGURA ---
+            # Verifica se o ID ainda existe na lista filtrada
+            ids_em_tratativa = df_em_tratativa[config.COLUNA_ID_CLIENTE].astype(str)
+            if selected_id in ids_em_tratativa.values:
+                active_item = df_em_tratativa[(ids_em_tratativa == selected_id).to_numpy()].iloc[0]
+            else:
+                active_item = df_em_tratativa.iloc[0]
+                selected_id = active_item[config.COLUNA_ID_CLIENTE]
+
+
+            if active_item is not None:
+                primeira_prioridade = active_item['Prioridade']
+                current_status = acoes.REGISTRO.status(selected_id)
+                
+                # Encontra o índice atual para o selectbox
+                status_options = acoes.STATUS_ACOES
+                try:
+                    idx_status = status_options.index(current_status)
+                except ValueError:
+                    idx_status = 0
+                
+                st.markdown(f"**Tratando Prioridade #{primeira_prioridade}** (ID: `{selected_id}` | Assunto: `{active_item[config.COLUNA_ASSUNTO]}`)")
+                st.info(f"Status Atual: **{current_status}**")
+                
+                with st.form("contact_form_details", clear_on_submit=True):
+                    
+                    # SELETOR DE STATUS (Fonte de verdade)
+                    st.subheader("1. Atualizar Status")
+                    novo_status_form = st.selectbox("Novo Status:", status_options, index=idx_status)
+
+                    st.markdown("---")
+                    st.subheader("2. Registrar Contato")
+
+                    col_c1, col_c2 = st.columns(2)
+                    input_contato1 = col_c1.text_input("Opção de Contato 1", key="input_contato1")
+                    input_contato2 = col_c2.text_input("Opção de Contato 2", key="input_contato2")
+                    
+                    st.write("**Meio de Contato Realizado:**")
+                    col_check1, col_check2, col_check3, col_check4 = st.columns(4)
+                    check_call = col_check1.checkbox("📞 Ligação")
+                    check_msg = col_check2.checkbox("📱 Mensagem SMS")
+                    check_wapp = col_check3.checkbox("📞 WhatsApp (Ligação)")
+                    check_wapp_msg = col_check4.checkbox("💬 WhatsApp (Mensagem)")
+                    
+                    notes = st.text_area("Observações da Tentativa/Próximos Passos", max_chars=500)
+                    
+                    submitted = st.form_submit_button("✅ Salvar Status e Log")
+
+                    if submitted:
+                        if novo_status_form != 'Aberto' and not (check_call or check_msg or check_wapp or check_wapp_msg or notes):
+                             st.warning("Atenção: Você mudou o status mas não registrou nenhum detalhe de contato/observação.")
+                        
+                        # 1. Salva LOG e 2. ATUALIZA O STATUS (registro de ações, gravado na hora)
+                        acoes.REGISTRO.registrar_contato(
+                            selected_id,
+                            novo_status_form,
+                            contato_op1=input_contato1,
+                            contato_op2=input_contato2,
+                            meio=[
+                                m for m, checked in [
+                                    ("Ligação", check_call), ("SMS", check_msg), 
+                                    ("WhatsApp Ligação", check_wapp), ("WhatsApp Mensagem", check_wapp_msg)
+                                ] if checked
+                            ],
+                            observacoes=notes
+                        )
+                        acoes.REGISTRO.gravar()
+                        
+                        st.success(f"Sucesso! Status alterado para '{novo_status_form}'.")
+                        
+                        if novo_status_form == 'Concluído':
+                            st.session_state['show_contact_form'] = False
+                        
+                        st.rerun()
+
+            st.button("❌ Fechar Formulário", on_click=lambda: st.session_state.update(show_contact_form=False), key="close_form_out")
+    
+    st.markdown("---")
+    
+    # Tempos como arrays epoch: os blocos ao vivo recalculam sem refazer a página
+    tempos_ao_vivo = TemposAoVivo(df_abertos)
+
+    @fragmento_ao_vivo
+    def exibir_kpis():
+        agora = agora_epoch()
+
+        # ---- KPIs Principais ----
+        st.subheader("KPIs dos Chamados Selecionados")
+        col_kpi1, col_kpi2, col_kpi3 = st.columns(3)
+        
+        total_abertos = len(df_abertos)
+        total_fora_sla, total_em_alerta = tempos_ao_vivo.contagens_sla(agora)
+        
+        col_kpi1.metric("Total de Chamados na Lista", total_abertos)
+        col_kpi2.metric("Total Fora do SLA (Estourado)", f"{total_fora_sla} 🚨")
+        col_kpi3.metric("Total em Alerta (Regra de 4h)", f"{total_em_alerta} ⚠️")
+
+        # ---- KPIs de Alerta por Hora de Abertura ----
+        st.subheader("Monitoramento de Tempo Aberto (Próximo do SLA)")
+        col_alerta1, col_alerta2, col_alerta3, col_alerta4 = st.columns(4)
+        
+        h19, h20, h21, h22, h23 = 19*3600, 20*3600, 21*3600, 22*3600, 23*3600
+
+        # As quatro faixas saem de um único histograma (a última posição, >= 23h, não é exibida)
+        abertos_19h, abertos_20h, abertos_21h, abertos_22h, _ = tempos_ao_vivo.contar_por_idade(agora, [h19, h20, h21, h22, h23])
+
+        col_alerta1.metric("Abertos há 19h", f"{abertos_19h} 🟡")
+        col_alerta2.metric("Abertos há 20h", f"{abertos_20h} 🟠")
+        col_alerta3.metric("Abertos há 21h", f"{abertos_21h} 🔴")
+        col_alerta4.metric("Abertos há 22h", f"{abertos_22h} 🚨")
+
+        # ---- Avisos do Agendador de SLA ----
+        # No modo ao vivo este bloco reexecuta sozinho, então os avisos chegam sem interação
+        for evento in agendador_sla.avisos_novos(st.session_state)[-AVISOS_SLA_MAX:]:
+            icone = "🚨" if evento['tipo'] == agendador_sla.EVENTO_ESTOURO else "⚠️"
+            acao = "estourou o SLA" if evento['tipo'] == agendador_sla.EVENTO_ESTOURO else "entrou em alerta"
+            st.toast(f"{icone} ID {evento.get(config.COLUNA_ID_CLIENTE)} ({evento.get(config.COLUNA_ASSUNTO)}) {acao}")
+        origem = agendador_sla.origem_agendada()
+        proxima = agendador_sla.AGENDADOR.proxima_transicao()
+        if origem is None:
+            st.caption(f"🔕 Avisos de SLA desligados: carregue uma planilha ou salve uma exportação em '{monitor_pasta.PASTA_EXPORTACOES}/'.")
+        elif proxima is not None:
+            instante, tipo = proxima
+            st.caption(
+                f"⏰ Próxima transição de SLA (chamados abertos da {origem}): {agendador_sla.como_data(instante).replace('T', ' ')} "
+                f"({'estouro' if tipo == agendador_sla.EVENTO_ESTOURO else 'entrada em alerta'}) · "
+                f"{agendador_sla.AGENDADOR.pendentes()} transições agendadas"
+            )
+        if origem is not None and agendador_sla.AGENDADOR.chave != st.session_state.get('dataset_chave'):
+            st.caption(f"Os avisos de SLA seguem a {origem}, não o arquivo desta sessão.")
+
+    exibir_kpis()
+
+    # ---- Envelhecimento dos Chamados ----
+    with st.expander("📊 Envelhecimento dos Chamados"):
+        tipo_faixas = st.radio(
+            "Faixas", ["Horas desde a abertura", "% do SLA da categoria"], horizontal=True, key='alertas_faixas_tipo'
+        )
+        por_sla = tipo_faixas == "% do SLA da categoria"
+        padrao = envelhecimento.FAIXAS_SLA_PADRAO if por_sla else envelhecimento.FAIXAS_HORAS_PADRAO
+        texto_limites = st.text_input(
+            "Limites das faixas (" + ("frações do SLA" if por_sla else "horas") + ", separados por vírgula)",
+            value=", ".join(f"{limite:g}" for limite in padrao), key=f"alertas_faixas_{'sla' if por_sla else 'horas'}"
+        )
+        try:
+            limites = sorted({float(valor) for valor in texto_limites.replace(';', ',').split(',') if valor.strip()})
+        except ValueError:
+            st.warning("Limites inválidos: usando as faixas padrão.")
+            limites = list(padrao)
+        limites = limites or list(padrao)
+
+        agora = agora_epoch()
+        if por_sla:
+            # Consumido respeita os calendários de cada categoria; relativo ao SLA de cada chamado
+            _, restante, _, _ = tempos_ao_vivo.tempos(np.arange(len(df_abertos)), agora)
+            df_faixas = envelhecimento.envelhecimento_sla(tempos_ao_vivo.sla_total - restante, tempos_ao_vivo.sla_total, limites)
+        else:
+            df_faixas = pd.DataFrame({
+                'Faixa': envelhecimento.rotulos_faixas(limites, lambda h: f"{h:g}h"),
+                'Chamados': tempos_ao_vivo.contar_por_idade(agora, np.asarray(limites) * 3600),
+            })
+        fig_faixas = px.bar(df_faixas, x='Faixa', y='Chamados', text_auto=True)
+        st.plotly_chart(fig_faixas, use_container_width=True)
+    
+    # ---- Mapa de Alertas ----
+    st.subheader("Mapa de Chamados Pendentes")
+    if config.COLUNA_LATITUDE in df_abertos.columns and config.COLUNA_LONGITUDE in df_abertos.columns:
+        coordenadas_validas = df_abertos[[config.COLUNA_LATITUDE, config.COLUNA_LONGITUDE]].notna().all(axis=1)
+        if not coordenadas_validas.any():
+            st.info("Nenhum chamado pendente com coordenadas válidas encontrado.")
+        else:
+            # Rotas planejadas uma vez por dataset + filtros + minuto (mesma chave do mapa): o mapa e o
+            # relatório usam o mesmo resultado, e reexecuções sem mudança não replanejam nada
+            def planejar_relatorio_rotas():
+                paradas, resumo = rotas.planejar_rotas(df_abertos)
+                resumo_exibicao = pd.DataFrame({
+                    'Paradas': resumo['Paradas'],
+                    'Distância (km)': resumo['Distancia_Total_Km'].astype(float).round(1),
+                    'Duração Prevista': config.formatar_hms_array(resumo['Duracao_Segundos']),
+                    'Chegadas Após o Prazo': resumo['Paradas_Apos_Prazo'],
+                }, index=resumo.index)
+                paradas_exibicao = pd.DataFrame({
+                    config.COLUNA_TECNICO: paradas[config.COLUNA_TECNICO],
+                    'Ordem': paradas['Ordem_Rota'],
+                    'Prioridade': df_abertos.loc[paradas.index, 'Prioridade'],
+                    config.COLUNA_ID_CLIENTE: df_abertos.loc[paradas.index, config.COLUNA_ID_CLIENTE],
+                    'Distância Acumulada (km)': paradas['Distancia_Acumulada_Km'].astype(float).round(1),
+                    'Chegada Prevista': pd.to_datetime(paradas['Chegada_Prevista']).dt.strftime('%d/%m/%y %H:%M'),
+                    'Folga até o Prazo': config.formatar_hms_array(paradas['Folga_SLA_Segundos']),
+                })
+                return (paradas, resumo), resumo_exibicao, paradas_exibicao
+
+            rotas_planejadas, resumo_exibicao, paradas_exibicao = cache_mapas.calculo(
+                'rotas', st.session_state['dataset_chave'], 'alertas', mascara_cascata, planejar_relatorio_rotas
+            )
+
+            # Mapa pronto (HTML) em cache por dataset + filtros + minuto: abrir/fechar o formulário
+            # ou digitar anotações não remonta o mapa
+            mapa_html = cache_mapas.html_mapa(
+                st.session_state['dataset_chave'], 'alertas', mascara_cascata,
+                lambda: config.criar_mapa_folium(df_abertos[coordenadas_validas], rotas_planejadas=rotas_planejadas)
+            )
+            components.html(mapa_html, height=400)
+
+            # ---- Rotas Sugeridas (ordem de visita, distância e chegada prevista x prazo do SLA) ----
+            with st.expander("🛣️ Rotas Sugeridas por Técnico"):
+                if resumo_exibicao.empty:
+                    st.info("Nenhum chamado com técnico e coordenadas para montar rotas.")
+                else:
+                    st.dataframe(resumo_exibicao, use_container_width=True)
+                    st.dataframe(paradas_exibicao, use_container_width=True, hide_index=True)
+    else:
+        st.warning("Colunas 'latitude' ou 'longitude' não encontradas. O mapa não pode ser exibido.")
+
+    # ---- Despacho de Chamados sem Técnico ----
+    if config.COLUNA_LATITUDE in df_abertos.columns and config.COLUNA_LONGITUDE in df_abertos.columns:
+        with st.expander("🧭 Despacho de Chamados sem Técnico"):
+            # Índices e rotas montados uma vez por dataset + filtros + minuto (mesma chave do mapa)
+            despacho_atual = cache_mapas.calculo(
+                'despacho', st.session_state['dataset_chave'], 'alertas', mascara_cascata,
+                lambda: despacho.Despacho(df_abertos)
+            )
+            if despacho_atual.pendentes.empty:
+                st.info("Nenhum chamado sem técnico (com coordenadas) nos filtros atuais.")
+            elif not despacho_atual.tecnicos:
+                st.info("Nenhum técnico com rota nos filtros atuais para receber os chamados.")
+            else:
+                colunas_despacho = ['Prioridade', config.COLUNA_ID_CLIENTE, config.COLUNA_ASSUNTO, config.COLUNA_CIDADE]
+                colunas_despacho = [c for c in colunas_despacho if c in despacho_atual.pendentes.columns]
+
+                col_tecnico, col_k = st.columns([3, 1])
+                tecnico_consulta = col_tecnico.selectbox("Chamados mais próximos da rota de", despacho_atual.tecnicos, key='despacho_tecnico')
+                k_consulta = col_k.number_input("Quantidade", min_value=1, max_value=100, value=10, key='despacho_k')
+                proximos = despacho_atual.chamados_proximos(tecnico_consulta, int(k_consulta)).copy()
+                proximos['Distância (km)'] = proximos['Distancia_Km'].round(1)
+                st.dataframe(proximos[colunas_despacho + ['Distância (km)']], use_container_width=True, hide_index=True)
+
+                metodos = despacho.metodos_disponiveis()
+                metodo = st.radio("Método de atribuição", metodos, format_func=despacho.METODOS.get,
+                                  horizontal=True, key='despacho_metodo')
+                if despacho.METODO_HUNGARO not in metodos:
+                    st.caption("A atribuição ótima (algoritmo húngaro) precisa do pacote scipy: `pip install scipy`.")
+                elif metodo == despacho.METODO_HUNGARO and len(despacho_atual.pendentes) > despacho.LOTE_HUNGARO:
+                    st.caption(f"Com mais de {despacho.LOTE_HUNGARO} chamados, a atribuição ótima é feita em lotes "
+                               f"de {despacho.LOTE_HUNGARO}, do mais urgente ao menos urgente.")
+
+                if st.button(f"Sugerir técnicos para os {len(despacho_atual.pendentes)} chamados sem técnico", key='despacho_sugerir'):
+                    sugestao = despacho_atual.sugerir(metodo)
+                    sugestao_exibicao = sugestao[colunas_despacho].copy()
+                    sugestao_exibicao['Técnico Sugerido'] = sugestao['Tecnico_Sugerido']
+                    sugestao_exibicao['Distância (km)'] = sugestao['Distancia_Km'].round(1)
+                    sugestao_exibicao['Restante SLA'] = sugestao['Tempo_Restante_Segundos'].apply(config.formatar_hms)
+                    sugestao_exibicao['Chega Após o Prazo'] = sugestao['Chegada_Apos_Prazo']
+                    st.dataframe(sugestao_exibicao, use_container_width=True, hide_index=True)
+
+    # ---- Tabela de Chamados com Ação ----
+    @fragmento_ao_vivo
+    def exibir_tabela():
+        st.subheader("Lista de Chamados (Ordenado por Prioridade)")
+
+        # Colunas que serão exibidas (Read-Only)
+        colunas_finais = [
+            'Ação', 
+            'Prioridade', config.COLUNA_ID_CLIENTE, config.COLUNA_NOME_CLIENTE, config.COLUNA_ASSUNTO, 
+            config.COLUNA_STATUS, 'Data Abertura', 'Tempo Aberto', 'Restante SLA', 
+        ]
+        if config.COLUNA_TECNICO in df_abertos.columns:
+            colunas_finais.insert(5, config.COLUNA_TECNICO) 
+        colunas_origem = [col for col in colunas_finais if col in df_abertos.columns]
+
+        def formatar_pagina(posicoes_visiveis):
+            """Só as linhas da página são formatadas (textos e cores calculados como arrays, sem laço por linha)."""
+            if ao_vivo:
+                # Só os tempos das linhas exibidas são recalculados a cada atualização
+                decorrido, restante, estourado, alerta = tempos_ao_vivo.tempos(posicoes_visiveis, agora_epoch())
+                estados = config.estado_sla(estourado, alerta)
+            else:
+                decorrido = df_abertos['Tempo_Decorrido_Segundos'].to_numpy()[posicoes_visiveis]
+                restante = df_abertos['Tempo_Restante_Segundos'].to_numpy()[posicoes_visiveis]
+                estados = df_abertos['SLA_Estado'].to_numpy()[posicoes_visiveis]
+
+            # Cria os valores formatados para exibição
+            df_display = df_abertos.iloc[posicoes_visiveis][colunas_origem]
+            df_display['Data Abertura'] = df_abertos[config.COLUNA_ABERTURA].iloc[posicoes_visiveis].dt.strftime('%d/%m/%y %H:%M')
+            df_display['Tempo Aberto'] = config.formatar_hms_array(decorrido)
+            df_display['Restante SLA'] = config.formatar_hms_array(restante)
+            df_display = df_display[[col for col in colunas_finais if col in df_display.columns]]
+
+            # Tabela de leitura com as cores do semáforo (um único cálculo para a página inteira)
+            return df_display.style.apply(config.estilos_sla, axis=None, estados=estados)
+
+        # Busca, ordenação e paginação no servidor; a lista completa vai para download
+        tabelas.botao_download(df_abertos, "chamados_pendentes.csv", 'alertas_download', rotulo="⬇️ Baixar lista completa (CSV)")
+        posicoes_pagina = tabelas.tabela_paginada(
+            df_abertos, 'alertas_lista', formatar_pagina,
+            colunas_busca=[config.COLUNA_ID_CLIENTE, config.COLUNA_NOME_CLIENTE, config.COLUNA_ASSUNTO,
+                           config.COLUNA_TECNICO, config.COLUNA_STATUS, config.COLUNA_CIDADE, 'Ação'],
+            colunas_ordenacao={rotulo: col for rotulo, col in {
+                'Prioridade': 'Prioridade',
+                'Restante SLA': 'Tempo_Restante_Segundos',
+                config.COLUNA_ID_CLIENTE: config.COLUNA_ID_CLIENTE,
+                config.COLUNA_NOME_CLIENTE: config.COLUNA_NOME_CLIENTE,
+                config.COLUNA_ASSUNTO: config.COLUNA_ASSUNTO,
+                config.COLUNA_TECNICO: config.COLUNA_TECNICO,
+                config.COLUNA_STATUS: config.COLUNA_STATUS,
+                'Ação': 'Ação',
+            }.items() if col in df_abertos.columns},
+        )
+    
+        # Lógica para registrar o status no registro de ações (todas as edições numa só gravação)
+        if st.session_state.get(editor_key, False):
+            edited_data = st.session_state[editor_key]
+            if edited_data.get('edited_rows'):
+                concluiu = False
+                for index, row in edited_data['edited_rows'].items():
+                    if row.get('Ação'):
+                        cliente_id = df_abertos[config.COLUNA_ID_CLIENTE].iloc[posicoes_pagina[index]]
+                        novo_status = row.get('Ação')
+                    
+                        # O estado do editor se repete a cada rerun: só grava o que mudou
+                        if acoes.REGISTRO.status(cliente_id) != novo_status:
+                            acoes.REGISTRO.registrar_status(cliente_id, novo_status)
+                            concluiu = concluiu or novo_status == acoes.STATUS_CONCLUIDO
+                acoes.REGISTRO.gravar()
+                if concluiu:
+                    st.rerun()
+
+    exibir_tabela()
@@ -0,0 +1,53 @@
+from openpyxl import Workbook, load_workbook
+
+
+def ler_linhas_excel(caminho, linha_cabecalho=2):
+    """
+    Lê a planilha linha a linha (modo read-only do openpyxl), sem carregar o arquivo inteiro.
+    Retorna (cabecalho, gerador de listas de valores). `linha_cabecalho` é 1-based,
+    como no Excel: 2 equivale ao `header=1` do pandas.
+    """
+    wb = load_workbook(caminho, read_only=True, data_only=True)
+    ws = wb.active
+    linhas = ws.iter_rows(min_row=linha_cabecalho, values_only=True)
+
+    try:
+        cabecalho_bruto = next(linhas)
+    except StopIteration:
+        wb.close()
+        return [], iter(())
+
+    # Mesmo nome que o pandas dá para cabeçalhos vazios
+    cabecalho = [
+        str(nome).strip() if nome is not None else f"Unnamed: {i}"
+        for i, nome in enumerate(cabecalho_bruto)
+    ]
+
+    def gerar():
+        try:
+            for valores in linhas:
+                if all(v is None for v in valores):
+                    continue
+                valores = list(valores)
+                valores += [None] * (len(cabecalho) - len(valores))
+                yield valores[:len(cabecalho)]
+        finally:
+            wb.close()
+
+    return cabecalho, gerar()
+
+
+class EscritorPlanilha:
+    """Grava a planilha de saída linha a linha (modo write-only do openpyxl), com o cabeçalho na Linha 1."""
+
+    def __init__(self, caminho, cabecalho):
+        self.caminho = caminho
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet()
+        self.ws.append(cabecalho)
+
+    def adicionar(self, valores):
+        self.ws.append(valores)
+
+    def fechar(self):
+        self.wb.save(self.caminho)
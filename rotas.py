@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+import config
+
+# --- Configuração das Rotas ---
+RAIO_TERRA_KM = 6371.0
+FATOR_DESVIO_VIARIO = 1.3     # Distância pelas ruas ~30% maior que em linha reta
+VELOCIDADE_MEDIA_KMH = 30.0
+TEMPO_POR_PARADA_SEGUNDOS = 30 * 60 # Tempo de atendimento em cada chamado
+MAX_PASSADAS_2OPT = 50
+
+# Urgência de SLA: a rota atende primeiro os estourados, depois os em alerta, depois os no prazo.
+# Dentro de cada faixa a ordem é a de menor distância (vizinho mais próximo + 2-opt).
+URGENCIA_ESTOURADO, URGENCIA_ALERTA, URGENCIA_NO_PRAZO = 0, 1, 2
+
+
+def matriz_haversine(latitudes, longitudes):
+    """Distâncias (km, em linha reta) entre todos os pares de pontos."""
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def vizinho_mais_proximo(distancias, paradas, inicio):
+    """Ordem gulosa: a partir de `inicio`, sempre a parada mais próxima ainda não visitada."""
+    restantes = list(paradas)
+    ordem = []
+    atual = inicio
+    while restantes:
+        proxima = int(np.argmin(distancias[atual, restantes]))
+        atual = restantes.pop(proxima)
+        ordem.append(atual)
+    return ordem
+
+def melhorar_2opt(ordem, distancias, max_passadas=MAX_PASSADAS_2OPT):
+    """
+    2-opt para caminho aberto com o primeiro ponto fixo: inverte trechos enquanto isso encurtar o caminho.
+    Para cada aresta testa todas as inversões de uma vez (vetorizado).
+    """
+    ordem = np.array(ordem)
+    n = len(ordem)
+    for _ in range(max_passadas):
+        melhorou = False
+        for i in range(n - 2):
+            a, b = ordem[i], ordem[i + 1]
+            j = np.arange(i + 2, n)
+            c = ordem[j]
+            tem_proximo = j < n - 1
+            proximo = ordem[np.minimum(j + 1, n - 1)]
+            # Trocar (a,b) e (c,próximo) por (a,c) e (b,próximo); no fim do caminho não há 'próximo'
+            ganho = (
+                distancias[a, b] - distancias[a, c]
+                + np.where(tem_proximo, distancias[c, proximo] - distancias[b, proximo], 0.0)
+            )
+            melhor = int(np.argmax(ganho))
+            if ganho[melhor] > 1e-9:
+                fim = j[melhor]
+                ordem[i + 1:fim + 1] = ordem[i + 1:fim + 1][::-1]
+                melhorou = True
+        if not melhorou:
+            break
+    return ordem.tolist()
+
+def urgencia_sla(df):
+    """Faixa de urgência de cada chamado (URGENCIA_*) a partir das colunas do motor de SLA."""
+    urgencia = np.full(len(df), URGENCIA_NO_PRAZO)
+    if 'SLA_Alerta' in df.columns:
+        urgencia[df['SLA_Alerta'].to_numpy(dtype=bool)] = URGENCIA_ALERTA
+    if 'SLA_Estourado' in df.columns:
+        urgencia[df['SLA_Estourado'].to_numpy(dtype=bool)] = URGENCIA_ESTOURADO
+    return urgencia
+
+def ordenar_paradas(distancias, urgencia, restante):
+    """
+    Ordem de visita de uma rota: faixa por faixa de urgência, começando pelo chamado com menos tempo
+    restante. Cada faixa começa na parada mais próxima do fim da anterior e é refinada com 2-opt.
+    """
+    ordem = []
+    for faixa in np.unique(urgencia):
+        paradas = np.flatnonzero(urgencia == faixa)
+        if not ordem:
+            inicio = int(paradas[np.argmin(np.nan_to_num(restante[paradas], nan=np.inf))])
+            trecho = [inicio] + vizinho_mais_proximo(distancias, paradas[paradas != inicio], inicio)
+            ordem = melhorar_2opt(trecho, distancias)
+        else:
+            ancora = ordem[-1]
+            trecho = melhorar_2opt([ancora] + vizinho_mais_proximo(distancias, paradas, ancora), distancias)
+            ordem += trecho[1:]
+    return ordem
+
+def planejar_rotas(df, agora=None):
+    """
+    Rota sugerida de cada técnico (chamados com técnico e coordenadas).
+
+    Retorna (paradas, resumo):
+      - paradas: uma linha por chamado, na ordem de visita, com distância acumulada, chegada prevista
+        e folga até o prazo do SLA (negativa = chega depois do prazo). O índice é o do `df`.
+      - resumo: uma linha por técnico com paradas, distância total, duração e paradas após o prazo.
+    """
+    colunas_paradas = [config.COLUNA_TECNICO, 'Ordem_Rota', config.COLUNA_LATITUDE, config.COLUNA_LONGITUDE,
+                       'Distancia_Acumulada_Km', 'Chegada_Prevista', 'Folga_SLA_Segundos', 'Chega_Apos_Prazo']
+    colunas_resumo = ['Paradas', 'Distancia_Total_Km', 'Duracao_Segundos', 'Paradas_Apos_Prazo']
+    if config.COLUNA_TECNICO not in df.columns:
+        return pd.DataFrame(columns=colunas_paradas), pd.DataFrame(columns=colunas_resumo)
+
+    agora = pd.Timestamp.now() if agora is None else pd.Timestamp(agora)
+    validos = df[config.COLUNA_TECNICO].notna() & df[config.COLUNA_LATITUDE].notna() & df[config.COLUNA_LONGITUDE].notna()
+    df = df[validos]
+
+    latitudes = df[config.COLUNA_LATITUDE].to_numpy(dtype=float)
+    longitudes = df[config.COLUNA_LONGITUDE].to_numpy(dtype=float)
+    urgencia = urgencia_sla(df)
+    restante = df['Tempo_Restante_Segundos'].to_numpy(dtype=float) if 'Tempo_Restante_Segundos' in df.columns else np.full(len(df), np.nan)
+    prazos = pd.to_datetime(df['SLA_Prazo']).to_numpy() if 'SLA_Prazo' in df.columns else np.full(len(df), np.datetime64('NaT'))
+
+    paradas, resumo = [], {}
+    # Um único agrupamento: posições das linhas de cada técnico
+    for tecnico, posicoes in df.groupby(config.COLUNA_TECNICO, observed=True, sort=True).indices.items():
+        distancias = matriz_haversine(latitudes[posicoes], longitudes[posicoes]) * FATOR_DESVIO_VIARIO
+        ordem = ordenar_paradas(distancias, urgencia[posicoes], restante[posicoes])
+
+        trechos = np.concatenate(([0.0], distancias[ordem[:-1], ordem[1:]]))
+        acumulado = trechos.cumsum()
+        # Chegada = deslocamento até a parada + atendimento das paradas anteriores
+        segundos = acumulado / VELOCIDADE_MEDIA_KMH * 3600 + np.arange(len(ordem)) * TEMPO_POR_PARADA_SEGUNDOS
+        chegadas = agora + pd.to_timedelta(segundos, unit='s')
+        folga = (pd.DatetimeIndex(prazos[posicoes][ordem]) - chegadas).total_seconds().to_numpy()
+
+        paradas.append(pd.DataFrame({
+            config.COLUNA_TECNICO: tecnico,
+            'Ordem_Rota': np.arange(1, len(ordem) + 1),
+            config.COLUNA_LATITUDE: latitudes[posicoes][ordem],
+            config.COLUNA_LONGITUDE: longitudes[posicoes][ordem],
+            'Distancia_Acumulada_Km': acumulado,
+            'Chegada_Prevista': chegadas,
+            'Folga_SLA_Segundos': folga,
+            'Chega_Apos_Prazo': folga < 0,
+        }, index=df.index[posicoes][ordem]))
+        resumo[tecnico] = {
+            'Paradas': len(ordem),
+            'Distancia_Total_Km': acumulado[-1],
+            'Duracao_Segundos': segundos[-1] + TEMPO_POR_PARADA_SEGUNDOS,
+            'Paradas_Apos_Prazo': int((folga < 0).sum()),
+        }
+
+    if not paradas:
+        return pd.DataFrame(columns=colunas_paradas), pd.DataFrame(columns=colunas_resumo)
+    df_resumo = pd.DataFrame.from_dict(resumo, orient='index', columns=colunas_resumo)
+    df_resumo.index.name = config.COLUNA_TECNICO
+    return pd.concat(paradas), df_resumo
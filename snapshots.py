@@ -0,0 +1,101 @@
+import os
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError: # Sem pyarrow os snapshots ficam desativados e tudo é lido do XLSX
+    pa = None
+
+# --- Configuração dos Snapshots ---
+# Cada planilha processada é guardada em formato Arrow (colunar), identificada pelo hash do conteúdo.
+PASTA_SNAPSHOTS = ".snapshots"
+SNAPSHOTS_MAX_BYTES = 2 * 1024 ** 3          # Tamanho máximo da pasta (2 GB)
+SNAPSHOTS_MAX_IDADE_SEGUNDOS = 30 * 24 * 3600 # Snapshots sem uso há mais de 30 dias são apagados
+TEMPORARIOS_MAX_IDADE_SEGUNDOS = 3600         # '.tmp' parados há mais de 1 hora: gravação que não terminou
+
+
+def snapshots_disponiveis():
+    return pa is not None
+
+def caminho_snapshot(chave, pasta=PASTA_SNAPSHOTS):
+    return os.path.join(pasta, f"{chave}.arrow")
+
+def carregar_snapshot(chave, pasta=PASTA_SNAPSHOTS):
+    """Lê o snapshot via memory-map. Retorna None se não existir (ou se estiver corrompido)."""
+    if pa is None:
+        return None
+    caminho = caminho_snapshot(chave, pasta)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with pa.memory_map(caminho, "r") as fonte:
+            tabela = pa.ipc.open_file(fonte).read_all()
+        df = tabela.to_pandas()
+    except (OSError, pa.ArrowException):
+        return None
+    try:
+        os.utime(caminho) # Marca como usado (a limpeza apaga primeiro os usados há mais tempo)
+    except FileNotFoundError: # Apagado pela limpeza de outro processo depois da leitura
+        pass
+    return df
+
+def salvar_snapshot(chave, df, pasta=PASTA_SNAPSHOTS):
+    """Grava o DataFrame processado. Retorna False se o pyarrow não estiver instalado ou não suportar as colunas."""
+    if pa is None:
+        return False
+    os.makedirs(pasta, exist_ok=True)
+    caminho = caminho_snapshot(chave, pasta)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(temporario, "wb") as destino:
+            with pa.ipc.new_file(destino, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+        os.replace(temporario, caminho) # Troca atômica: leitores nunca veem um arquivo pela metade
+    except (OSError, pa.ArrowException):
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return False
+    limpar_snapshots(pasta)
+    return True
+
+def remover(caminho):
+    """Apaga o arquivo; outro processo pode ter apagado antes (limpeza simultânea)."""
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+def limpar_snapshots(pasta=PASTA_SNAPSHOTS, max_bytes=SNAPSHOTS_MAX_BYTES, max_idade=SNAPSHOTS_MAX_IDADE_SEGUNDOS,
+                     max_idade_temporarios=TEMPORARIOS_MAX_IDADE_SEGUNDOS):
+    """
+    Apaga snapshots antigos e, se a pasta passar do limite, os usados há mais tempo.
+    Também apaga os '.tmp' deixados por gravações interrompidas (processo que caiu no meio).
+    """
+    if not os.path.isdir(pasta):
+        return
+    agora = time.time()
+    arquivos = []
+    for nome in os.listdir(pasta):
+        if not nome.endswith((".arrow", ".tmp")):
+            continue
+        caminho = os.path.join(pasta, nome)
+        try:
+            info = os.stat(caminho)
+        except FileNotFoundError: # Renomeado ou apagado por outro processo desde o 'listdir'
+            continue
+        if nome.endswith(".tmp"):
+            if agora - info.st_mtime > max_idade_temporarios:
+                remover(caminho)
+        elif agora - info.st_mtime > max_idade:
+            remover(caminho)
+        else:
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    for _, tamanho, caminho in sorted(arquivos):
+        if total <= max_bytes:
+            break
+        remover(caminho)
+        total -= tamanho
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# --- Tabelas Paginadas ---
+# Busca, ordenação e paginação são feitas aqui no servidor: o navegador recebe só a página exibida.
+OPCOES_TAMANHO_PAGINA = [25, 50, 100, 200]
+TAMANHO_PAGINA_PADRAO = 50
+ORDEM_PADRAO = "(padrão)"
+
+
+def buscar(df, termo, colunas):
+    """Máscara das linhas em que alguma das colunas contém o termo (sem diferenciar maiúsculas)."""
+    termo = (termo or "").strip().lower()
+    if not termo:
+        return np.ones(len(df), dtype=bool)
+    encontrados = np.zeros(len(df), dtype=bool)
+    for col in colunas:
+        if col not in df.columns:
+            continue
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Procura só nas categorias (poucas) e marca as linhas pelos códigos; -1 (vazio) cai no False final
+            casa = serie.cat.categories.astype(str).str.lower().str.contains(termo, regex=False)
+            encontrados |= np.append(np.asarray(casa, dtype=bool), False)[serie.cat.codes.to_numpy()]
+        else:
+            encontrados |= serie.astype('string').str.lower().str.contains(termo, regex=False, na=False).to_numpy(dtype=bool)
+    return encontrados
+
+def ordenar(df, posicoes, coluna, crescente=True):
+    """Reordena as posições pelos valores da coluna (vazios no fim, empates mantêm a ordem atual)."""
+    valores = df[coluna].iloc[posicoes].reset_index(drop=True)
+    ordem = valores.sort_values(ascending=crescente, na_position='last', kind='stable').index.to_numpy()
+    return posicoes[ordem]
+
+def tabela_paginada(df, chave, formatar, colunas_busca=(), colunas_ordenacao=None, ordem_padrao=None):
+    """
+    Mostra `df` em páginas, com busca e ordenação.
+
+    - formatar(posicoes) -> DataFrame ou Styler da página (posições das linhas de `df`): só a página é formatada.
+    - colunas_ordenacao: {rótulo exibido: coluna de `df`} para o seletor de ordenação.
+    - ordem_padrao: (coluna, crescente) da ordem inicial; None mantém a ordem de `df`.
+    Retorna as posições (em `df`) das linhas exibidas.
+    """
+    colunas_ordenacao = colunas_ordenacao or {}
+    col_busca, col_ordem, col_sentido, col_tamanho, col_pagina = st.columns([3, 2, 1, 1, 1])
+    termo = col_busca.text_input("🔎 Buscar", key=f"{chave}_busca")
+    rotulo_ordem = col_ordem.selectbox("Ordenar por", [ORDEM_PADRAO] + list(colunas_ordenacao), key=f"{chave}_ordem")
+    decrescente = col_sentido.checkbox("Decrescente", key=f"{chave}_decrescente")
+    tamanho = col_tamanho.selectbox(
+        "Por página", OPCOES_TAMANHO_PAGINA, index=OPCOES_TAMANHO_PAGINA.index(TAMANHO_PAGINA_PADRAO),
+        key=f"{chave}_tamanho"
+    )
+
+    posicoes = np.flatnonzero(buscar(df, termo, colunas_busca))
+    if rotulo_ordem != ORDEM_PADRAO:
+        posicoes = ordenar(df, posicoes, colunas_ordenacao[rotulo_ordem], crescente=not decrescente)
+    elif ordem_padrao is not None:
+        coluna, crescente = ordem_padrao
+        posicoes = ordenar(df, posicoes, coluna, crescente=crescente)
+
+    total = len(posicoes)
+    paginas = max(1, -(-total // tamanho))
+    # Busca/filtros podem reduzir o número de páginas: volta para a última existente
+    if st.session_state.get(f"{chave}_pagina", 1) > paginas:
+        st.session_state[f"{chave}_pagina"] = paginas
+    pagina = col_pagina.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, step=1, key=f"{chave}_pagina")
+
+    inicio = (pagina - 1) * tamanho
+    posicoes_pagina = posicoes[inicio:inicio + tamanho]
+    st.dataframe(formatar(posicoes_pagina), use_container_width=True, hide_index=True)
+    if total:
+        st.caption(f"Mostrando {inicio + 1}–{inicio + len(posicoes_pagina)} de {total} chamados")
+    else:
+        st.caption("Nenhum chamado encontrado.")
+    return posicoes_pagina
+
+def exportar_csv(df):
+    """CSV no padrão do Excel em português (';' e vírgula decimal, UTF-8 com BOM)."""
+    return df.to_csv(sep=';', decimal=',', index=False).encode('utf-8-sig')
+
+def botao_download(df, nome_arquivo, chave, rotulo="⬇️ Baixar dados completos (CSV)"):
+    """Download da tabela inteira: o arquivo só é gerado quando o botão é clicado."""
+    st.download_button(
+        rotulo, data=lambda: exportar_csv(df), file_name=nome_arquivo, mime='text/csv',
+        key=chave, on_click='ignore'
+    )
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import dados
+
+AGORA = pd.Timestamp("2025-06-10 12:00:00")
+
+
+def exportacao(n=80, semente=0):
+    """Exportação sintética no formato da planilha (antes do processamento)."""
+    rng = np.random.default_rng(semente)
+    aberturas = AGORA - pd.to_timedelta(rng.uniform(0, 72 * 3600, n), unit="s")
+    encaminhamentos = aberturas + pd.to_timedelta(rng.uniform(0, 6 * 3600, n), unit="s")
+    agendamentos = encaminhamentos + pd.to_timedelta(rng.uniform(0, 12 * 3600, n), unit="s")
+    encaminhamentos = encaminhamentos.where(rng.random(n) < 0.7)
+    agendamentos = agendamentos.where(rng.random(n) < 0.4)
+    tecnicos = np.array(["Ana", "Bruno", "Carla", "Davi", None], dtype=object)
+    return pd.DataFrame({
+        config.COLUNA_ID_CLIENTE: np.arange(1000, 1000 + n),
+        config.COLUNA_NOME_CLIENTE: [f"Cliente {i}" for i in range(n)],
+        config.COLUNA_CIDADE: rng.choice(["São Paulo", "Osasco", "Guarulhos"], n),
+        config.COLUNA_STATUS: rng.choice(["VISITA_AGENDADA", "CONCLUIDO"], n, p=[0.8, 0.2]),
+        config.COLUNA_ABERTURA: aberturas,
+        config.COLUNA_ASSUNTO: rng.choice(
+            ["ATIVAÇÃO INICIAL (ADAPTER)", "MANUTENÇÃO ZONA RURAL (ADAPTER)", "SERVIÇOS EXTRAS (ADAPTER)", "OUTRO"], n
+        ),
+        config.COLUNA_ENCAMINHAMENTO: encaminhamentos,
+        config.COLUNA_AGENDAMENTO: agendamentos,
+        config.COLUNA_TECNICO: tecnicos[rng.integers(0, len(tecnicos), n)],
+        config.COLUNA_LATITUDE: -23.55 + rng.normal(0, 0.08, n),
+        config.COLUNA_LONGITUDE: -46.63 + rng.normal(0, 0.08, n),
+        "Coluna Descartada": "x",
+    })
+
+
+@pytest.fixture
+def df_processado():
+    return dados.processar_dataframe(exportacao())
+
+
+@pytest.fixture
+def df_sla(df_processado):
+    return dados.calcular_tempos_ao_vivo(df_processado, AGORA)
@@ -0,0 +1,53 @@
+import pytest
+
+
+@pytest.fixture
+def acoes(tmp_path, monkeypatch):
+    # O módulo abre o registro padrão ao ser importado: fica na pasta temporária
+    monkeypatch.chdir(tmp_path)
+    import acoes
+    return acoes
+
+
+@pytest.fixture
+def registro(acoes, tmp_path):
+    registro = acoes.RegistroAcoes(str(tmp_path / "acoes.sqlite"), gravar_a_cada=3)
+    yield registro
+    registro.fechar()
+
+
+def test_status_padrao_e_gravacao_em_lote(acoes, registro, tmp_path):
+    assert registro.status(10) == acoes.STATUS_ABERTO
+    registro.registrar_status(10, acoes.STATUS_EM_TRATATIVA)
+    assert registro.versao() == 0 # Ainda no buffer
+
+    outro = acoes.RegistroAcoes(str(tmp_path / "acoes.sqlite"))
+    registro.gravar()
+    assert registro.versao() == 1
+    assert outro.status("10") == acoes.STATUS_EM_TRATATIVA # Visto por outro operador
+    outro.fechar()
+
+
+def test_contato_vai_para_o_historico_e_atualiza_o_status(acoes, registro):
+    registro.registrar_contato(7, acoes.STATUS_EM_TRATATIVA, "Op 1", meio=["Telefone"], observacoes="Sem resposta")
+    registro.registrar_contato(7, acoes.STATUS_CONCLUIDO, "Op 2", meio=["WhatsApp", "E-mail"])
+    # Dois contatos + um status pendentes: o buffer se grava sozinho
+    assert registro.versao() == 1
+
+    historico = registro.historico(7)
+    assert [h["novo_status"] for h in historico] == [acoes.STATUS_CONCLUIDO, acoes.STATUS_EM_TRATATIVA]
+    assert historico[0]["meio"] == ["WhatsApp", "E-mail"]
+    assert historico[1]["observacoes"] == "Sem resposta"
+    assert registro.status(7) == acoes.STATUS_CONCLUIDO
+    assert registro.clientes_com_status(acoes.STATUS_CONCLUIDO).tolist() == ["7"]
+
+
+def test_leituras_em_cache_ate_a_versao_mudar(acoes, registro):
+    registro.registrar_status(1, acoes.STATUS_CONCLUIDO)
+    registro.gravar()
+    primeira = registro.status_por_cliente()
+    assert registro.status_por_cliente() is primeira
+    registro.registrar_status(2, acoes.STATUS_CONCLUIDO)
+    registro.gravar()
+    assert registro.status_por_cliente() is not primeira
+    assert sorted(registro.clientes_com_status(acoes.STATUS_CONCLUIDO)) == ["1", "2"]
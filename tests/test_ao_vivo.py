@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+import config
+import dados
+from ao_vivo import TemposAoVivo, para_epoch
+
+from conftest import AGORA
+
+
+def test_para_epoch():
+    valores = para_epoch([pd.Timestamp("1970-01-02"), None])
+    assert valores[0] == 86400 and np.isnan(valores[1])
+
+
+def test_contagens_iguais_ao_recalculo_completo(df_processado):
+    tempos = TemposAoVivo(dados.calcular_tempos_ao_vivo(df_processado, AGORA))
+    for horas in (0, 1.5, 7, 30):
+        instante = AGORA + pd.Timedelta(hours=horas)
+        df = dados.calcular_tempos_ao_vivo(df_processado, instante)
+        agora = para_epoch([instante])[0]
+        assert tempos.contagens_sla(agora) == (int(df['SLA_Estourado'].sum()), int(df['SLA_Alerta'].sum()))
+
+        posicoes = np.arange(0, len(df), 3)
+        decorrido, restante, estourado, alerta = tempos.tempos(posicoes, agora)
+        np.testing.assert_allclose(decorrido, df['Tempo_Decorrido_Segundos'].to_numpy()[posicoes])
+        np.testing.assert_allclose(restante, df['Tempo_Restante_Segundos'].to_numpy()[posicoes])
+        np.testing.assert_array_equal(estourado, df['SLA_Estourado'].to_numpy()[posicoes])
+        np.testing.assert_array_equal(alerta, df['SLA_Alerta'].to_numpy()[posicoes])
+
+
+def test_contar_por_idade_igual_a_contagem_direta(df_sla):
+    tempos = TemposAoVivo(df_sla)
+    agora = para_epoch([AGORA])[0]
+    limites = np.array([0, 4, 19, 24, 48]) * 3600
+    idade = agora - tempos.abertura
+    esperado = [np.count_nonzero((idade >= de) & (idade < ate)) for de, ate in zip(limites[:-1], limites[1:])]
+    esperado.append(np.count_nonzero(idade >= limites[-1]))
+    assert tempos.contar_por_idade(agora, limites).tolist() == esperado
+    assert len(df_sla[config.COLUNA_ABERTURA]) == sum(esperado)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+import config
+
+from conftest import AGORA
+
+
+def test_formatar_hms_array_igual_ao_formatar_hms():
+    segundos = np.array([0, 59, 60, 3599, 3600, 86399, 360000, 3600 * 100 + 61, -1, -3661, -360000,
+                         12.9, -12.9, np.nan, 5e6])
+    esperado = [config.formatar_hms(s) for s in segundos]
+    assert config.formatar_hms_array(segundos).tolist() == esperado
+
+
+def test_calcular_sla_igual_a_regra_por_linha():
+    assuntos = ["ATIVAÇÃO INICIAL (ADAPTER)", " manutenção zona rural (adapter) ", "OUTRO", None]
+    aberturas = pd.Series([AGORA - pd.Timedelta(hours=h) for h in (2, 150, 21, 30)])
+    sla = config.calcular_sla(assuntos, aberturas, AGORA)
+
+    for i, (assunto, abertura) in enumerate(zip(assuntos, aberturas)):
+        total, alerta = config.obter_sla_segundos(assunto if assunto is not None else "")
+        restante = total - (AGORA - abertura).total_seconds()
+        assert sla['SLA_Total_Segundos'].iloc[i] == total
+        assert sla['Tempo_Restante_Segundos'].iloc[i] == restante
+        assert sla['SLA_Estourado'].iloc[i] == (restante < 0)
+        assert sla['SLA_Alerta'].iloc[i] == (0 < restante <= alerta)
+        assert sla['SLA_Prazo'].iloc[i] == abertura + pd.Timedelta(seconds=total)
+    assert sla['SLA_Estado'].tolist() == [config.SLA_ESTADO_OK, config.SLA_ESTADO_ALERTA,
+                                          config.SLA_ESTADO_ALERTA, config.SLA_ESTADO_ESTOURADO]
+
+
+def test_calcular_sla_com_abertura_vazia():
+    sla = config.calcular_sla(None, pd.Series([pd.NaT]), AGORA)
+    assert np.isnan(sla['Tempo_Restante_Segundos'].iloc[0])
+    assert sla['SLA_Estado'].iloc[0] == config.SLA_ESTADO_OK
+
+
+def test_calendario_comercial(monkeypatch):
+    calendario = {'inicio_hora': 8, 'fim_hora': 18, 'dias_semana': '1111100', 'feriados': ['2025-06-12']}
+    monkeypatch.setitem(config.CALENDARIOS_POR_CATEGORIA, 'ATIVACAO', calendario)
+    # Segunda 17h + 24h úteis: 1h na segunda, 10h na terça, 10h na quarta, quinta é feriado, 3h na sexta
+    abertura = pd.Timestamp("2025-06-09 17:00")
+    sla = config.calcular_sla(["ATIVACAO INICIAL (ADAPTER)"], pd.Series([abertura]), pd.Timestamp("2025-06-11 12:00"))
+    assert sla['SLA_Prazo'].iloc[0] == pd.Timestamp("2025-06-13 11:00")
+    assert sla['Tempo_Restante_Segundos'].iloc[0] == 24 * 3600 - (1 + 10 + 4) * 3600
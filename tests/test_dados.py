@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import dados
+
+from conftest import exportacao
+
+
+def test_processar_descarta_colunas_e_compacta(df_processado):
+    assert "Coluna Descartada" not in df_processado.columns
+    assert isinstance(df_processado[config.COLUNA_CIDADE].dtype, pd.CategoricalDtype)
+    assert df_processado[config.COLUNA_LATITUDE].dtype == np.float32
+    assert df_processado[config.COLUNA_ID_CLIENTE].dtype == np.int32
+    assert df_processado.attrs['memoria_original_bytes'] > df_processado.memory_usage(deep=True).sum()
+
+
+def test_mesclar_delta(df_processado):
+    novo = exportacao(n=3, semente=2)
+    novo[config.COLUNA_ID_CLIENTE] = [1000, 1001, 5000]
+    novo.loc[0, config.COLUNA_STATUS] = "CONCLUIDO"
+    # A linha 1001 volta igual à atual
+    atual_1001 = df_processado[df_processado[config.COLUNA_ID_CLIENTE] == 1001]
+    processado = dados.processar_dataframe(novo)
+    for col in df_processado.columns:
+        processado.loc[1, col] = atual_1001[col].iloc[0]
+    estava_aberto = df_processado[config.COLUNA_STATUS].iloc[0] in config.STATUS_ABERTOS
+
+    df_mesclado, origem, resumo = dados.mesclar_datasets(df_processado, processado)
+    assert resumo == {'novos': 1, 'alterados': 1, 'resolvidos': int(estava_aberto), 'retirados': 0,
+                      'inalterados': 1, 'total': len(df_processado) + 1}
+    assert list(df_mesclado.columns) == list(df_processado.columns)
+    assert isinstance(df_mesclado[config.COLUNA_CIDADE].dtype, pd.CategoricalDtype)
+
+    # Linhas reaproveitadas apontam para a mesma linha do dataset atual; as novas/alteradas são -1
+    mantidas = np.flatnonzero(origem >= 0)
+    pd.testing.assert_frame_equal(
+        df_mesclado.iloc[mantidas].reset_index(drop=True),
+        df_processado.iloc[origem[mantidas]].reset_index(drop=True),
+        check_categorical=False,
+    )
+    ids_novos = df_mesclado[config.COLUNA_ID_CLIENTE].iloc[np.flatnonzero(origem < 0)]
+    assert sorted(ids_novos) == [1000, 5000]
+    linha = df_mesclado[df_mesclado[config.COLUNA_ID_CLIENTE] == 1000]
+    assert linha[config.COLUNA_STATUS].iloc[0] == "CONCLUIDO"
+
+
+def test_mesclar_completo_retira_quem_nao_veio(df_processado):
+    novo = df_processado.iloc[:10].copy()
+    df_mesclado, origem, resumo = dados.mesclar_datasets(df_processado, novo, dados.MODO_COMPLETO)
+    abertos_retirados = df_processado[config.COLUNA_STATUS].iloc[10:].isin(config.STATUS_ABERTOS).sum()
+    assert resumo['retirados'] == len(df_processado) - 10
+    assert resumo['resolvidos'] == abertos_retirados
+    assert resumo['inalterados'] == 10 and resumo['total'] == 10
+    assert origem.tolist() == list(range(10))
+
+
+def test_mesclar_id_repetido_vale_a_ultima_linha(df_processado):
+    novo = df_processado.iloc[[0, 0]].copy()
+    novo[config.COLUNA_NOME_CLIENTE] = ["Primeira", "Última"]
+    df_mesclado, _, resumo = dados.mesclar_datasets(df_processado, novo)
+    assert resumo['alterados'] == 1
+    assert (df_mesclado[config.COLUNA_NOME_CLIENTE] == "Última").sum() == 1
+
+
+def test_mesclar_exige_ids_unicos(df_processado):
+    repetido = pd.concat([df_processado, df_processado.iloc[:1]], ignore_index=True)
+    with pytest.raises(ValueError):
+        dados.mesclar_datasets(repetido, df_processado)
+    with pytest.raises(ValueError):
+        dados.mesclar_datasets(df_processado, df_processado.drop(columns=config.COLUNA_ID_CLIENTE))
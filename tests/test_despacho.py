@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import despacho
+import rotas
+
+
+def chamados_abertos(n_pendentes=300, n_tecnicos=12, semente=5):
+    """Pendentes sem técnico espalhados pela região e rotas de 2 a 8 paradas por técnico."""
+    rng = np.random.default_rng(semente)
+    tecnicos = [f"Técnico {t:02}" for t in range(n_tecnicos)]
+    paradas = rng.integers(2, 9, n_tecnicos)
+    centros = rng.uniform([-23.8, -46.9], [-23.3, -46.4], (n_tecnicos, 2))
+    com_tecnico = pd.DataFrame({
+        config.COLUNA_TECNICO: np.repeat(tecnicos, paradas),
+        config.COLUNA_LATITUDE: np.repeat(centros[:, 0], paradas) + rng.normal(0, 0.02, paradas.sum()),
+        config.COLUNA_LONGITUDE: np.repeat(centros[:, 1], paradas) + rng.normal(0, 0.02, paradas.sum()),
+    })
+    restante = rng.uniform(-4 * 3600, 12 * 3600, n_pendentes)
+    restante[rng.random(n_pendentes) < 0.1] = np.nan
+    pendentes = pd.DataFrame({
+        config.COLUNA_TECNICO: None,
+        config.COLUNA_LATITUDE: rng.uniform(-23.85, -23.25, n_pendentes),
+        config.COLUNA_LONGITUDE: rng.uniform(-46.95, -46.35, n_pendentes),
+        'Tempo_Restante_Segundos': restante,
+    })
+    df = pd.concat([com_tecnico, pendentes], ignore_index=True)
+    df[config.COLUNA_TECNICO] = df[config.COLUNA_TECNICO].astype('category')
+    df.loc[len(df) - 1, config.COLUNA_LATITUDE] = np.nan # Sem coordenada: fica de fora
+    return df
+
+
+def guloso_referencia(d, max_por_tecnico=None):
+    """Guloso sem índice nem poda: cada chamado é medido até todas as paradas de todas as rotas."""
+    paradas = {t: [list(lat), list(lon)] for t, (lat, lon) in d.paradas_tecnicos.items()}
+    carga = dict(d.carga)
+    tecnicos = [None] * len(d.pendentes)
+    distancias = np.full(len(d.pendentes), np.nan)
+    for i in np.argsort(np.nan_to_num(d.restante, nan=np.inf), kind='stable'):
+        melhor, menor_custo = None, np.inf
+        for t in d.tecnicos:
+            if max_por_tecnico is not None and carga[t] >= max_por_tecnico:
+                continue
+            km = despacho.haversine(d.lat[i], d.lon[i], np.array(paradas[t][0]), np.array(paradas[t][1])).min()
+            km *= rotas.FATOR_DESVIO_VIARIO
+            custo = d.custo(km, carga[t], d.restante[i])
+            if custo < menor_custo:
+                melhor, menor_custo, distancias[i] = t, custo, km
+        if melhor is None:
+            distancias[i] = np.nan
+            continue
+        tecnicos[i] = melhor
+        carga[melhor] += 1
+        paradas[melhor][0].append(d.lat[i])
+        paradas[melhor][1].append(d.lon[i])
+    return tecnicos, distancias
+
+
+def test_indice_espacial_igual_a_busca_completa():
+    rng = np.random.default_rng(6)
+    lat, lon = rng.uniform(-23.8, -23.3, 500), rng.uniform(-46.9, -46.4, 500)
+    indice = despacho.IndiceEspacial(lat, lon)
+    for lat_consulta, lon_consulta in [(-23.55, -46.63), (-23.31, -46.41), (-22.0, -45.0)]:
+        for k in (1, 7, 40, 600):
+            posicoes, km = indice.mais_proximos(lat_consulta, lon_consulta, k)
+            todas = despacho.haversine(lat_consulta, lon_consulta, lat, lon)
+            np.testing.assert_allclose(km, np.sort(todas)[:min(k, 500)])
+            np.testing.assert_allclose(todas[posicoes], km)
+
+
+@pytest.mark.parametrize("max_por_tecnico", [None, 25])
+def test_guloso_igual_a_referencia_sem_poda(max_por_tecnico):
+    d = despacho.Despacho(chamados_abertos())
+    sugestao = d.sugerir(despacho.METODO_GULOSO, max_por_tecnico)
+    tecnicos, distancias = guloso_referencia(d, max_por_tecnico)
+    assert sugestao['Tecnico_Sugerido'].fillna('').tolist() == [t or '' for t in tecnicos]
+    np.testing.assert_allclose(sugestao['Distancia_Km'].to_numpy(), distancias)
+    if max_por_tecnico is not None:
+        cargas = sugestao['Tecnico_Sugerido'].value_counts()
+        assert all(cargas[t] + d.carga[t] <= max_por_tecnico for t in cargas.index)
+        assert sugestao['Tecnico_Sugerido'].isna().any() # Vagas acabaram antes dos chamados
+
+
+def test_chamados_proximos_igual_a_busca_completa():
+    d = despacho.Despacho(chamados_abertos())
+    tecnico = d.tecnicos[3]
+    lat, lon = d.paradas_tecnicos[tecnico]
+    km = despacho.haversine(d.lat[:, None], d.lon[:, None], lat[None, :], lon[None, :]).min(axis=1)
+    proximos = d.chamados_proximos(tecnico, k=10)
+    np.testing.assert_allclose(proximos['Distancia_Km'].to_numpy(), np.sort(km)[:10] * rotas.FATOR_DESVIO_VIARIO)
+    assert d.chamados_proximos(tecnico, k=10) is proximos
+
+
+def test_metodo_desconhecido():
+    with pytest.raises(ValueError):
+        despacho.Despacho(chamados_abertos(n_pendentes=5)).sugerir('aleatorio')
+
+
+def test_sem_tecnicos_ninguem_e_sugerido():
+    df = chamados_abertos(n_pendentes=5)
+    df = df[df[config.COLUNA_TECNICO].isna()]
+    sugestao = despacho.Despacho(df).sugerir()
+    assert sugestao['Tecnico_Sugerido'].isna().all()
+
+
+@pytest.mark.parametrize("lote", [despacho.LOTE_HUNGARO, 70])
+def test_hungaro_atribui_todos_respeitando_as_vagas(monkeypatch, lote):
+    pytest.importorskip("scipy")
+    monkeypatch.setattr(despacho, 'LOTE_HUNGARO', lote)
+    d = despacho.Despacho(chamados_abertos())
+    sugestao = d.sugerir(despacho.METODO_HUNGARO)
+    assert sugestao['Tecnico_Sugerido'].notna().all()
+    cargas = sugestao['Tecnico_Sugerido'].value_counts()
+    vagas = np.ceil(despacho.FOLGA_VAGAS_HUNGARO * (len(d.pendentes) + sum(d.carga.values())) / len(d.tecnicos))
+    assert all(cargas[t] + d.carga[t] <= vagas for t in cargas.index)
+
+    # A distância informada é a do chamado até a rota atual do técnico escolhido
+    for i in range(0, len(sugestao), 37):
+        t = d.tecnicos.index(sugestao['Tecnico_Sugerido'].iloc[i])
+        assert sugestao['Distancia_Km'].iloc[i] == pytest.approx(d.distancias_rotas(i)[t])
+
+    limitado = d.sugerir(despacho.METODO_HUNGARO, max_por_tecnico=25)
+    cargas = limitado['Tecnico_Sugerido'].value_counts()
+    assert all(cargas[t] + d.carga[t] <= 25 for t in cargas.index)
+    # Menos vagas que chamados: todas as vagas são ocupadas
+    assert limitado['Tecnico_Sugerido'].notna().sum() == sum(25 - c for c in d.carga.values()) < len(d.pendentes)
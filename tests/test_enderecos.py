@@ -0,0 +1,43 @@
+import numpy as np
+
+from enderecos import canonizar_bairro, canonizar_endereco, canonizar_logradouro, canonizar_numero
+from geocode_cache import normalizar_endereco
+
+
+def test_normalizar_endereco_remove_acentos_e_pontuacao():
+    assert normalizar_endereco("  Praça da Sé ,  São Paulo - SP ") == "praca da se, sao paulo sp"
+
+
+def test_canonizar_logradouro_expande_tipo_e_titulos():
+    assert canonizar_logradouro("R. Sete de Setembro,") == "rua sete de setembro"
+    assert canonizar_logradouro("Av. Prof. Dr. Arnaldo") == "avenida professor doutor arnaldo"
+    assert canonizar_logradouro("Rua das Flores S/N") == "rua das flores"
+
+
+def test_pr_so_vira_praca_sem_numero_depois():
+    assert canonizar_logradouro("Pr. da Sé") == "praca da se"
+    assert canonizar_logradouro("PR-445") == "pr 445"
+    assert canonizar_logradouro("PR 445 km 10") == "pr 445 km 10"
+
+
+def test_canonizar_numero():
+    for numero in ("010", 10.0, "nº 10", "N. 10", 10):
+        assert canonizar_numero(numero) == "10"
+    for numero in ("S/N", "SN", "s/nº", 0, "", None, np.nan):
+        assert canonizar_numero(numero) == ""
+    assert canonizar_numero("12A") == "12a"
+
+
+def test_canonizar_bairro():
+    assert canonizar_bairro("JD. América") == "jardim america"
+    assert canonizar_bairro("Vl Madalena") == "vila madalena"
+
+
+def test_variantes_do_mesmo_endereco_tem_a_mesma_chave():
+    a = canonizar_endereco("R. Sete de Setembro", "010", "Jd América", "São Paulo", "SP")
+    b = canonizar_endereco("rua sete de setembro,", 10.0, "JARDIM AMÉRICA", "sao paulo", "sp")
+    assert a == b == "rua sete de setembro 10, jardim america, sao paulo, sp, brasil"
+
+
+def test_partes_vazias_ficam_de_fora():
+    assert canonizar_endereco(None, "S/N", "", "Osasco", "SP") == "osasco, sp, brasil"
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+import config
+import envelhecimento
+from ao_vivo import para_epoch
+
+from conftest import AGORA
+
+
+def test_histograma_igual_a_contagem_direta():
+    rng = np.random.default_rng(7)
+    valores = rng.uniform(-5, 60, 1000)
+    valores[::17] = np.nan
+    limites = envelhecimento.FAIXAS_HORAS_PADRAO
+    esperado = [np.count_nonzero((valores >= de) & (valores < ate)) for de, ate in zip(limites[:-1], limites[1:])]
+    esperado.append(np.count_nonzero(valores >= limites[-1]))
+    assert envelhecimento.histograma(valores, limites).tolist() == esperado
+
+
+def test_envelhecimento_sla():
+    tabela = envelhecimento.envelhecimento_sla([0, 10, 90, 200, 50], [100, 100, 100, 100, 0])
+    assert tabela['Faixa'].iloc[0] == "0%–25%" and tabela['Faixa'].iloc[-1] == "≥ 200%"
+    assert tabela['Chamados'].sum() == 4 # SLA zerado fica de fora
+    assert tabela.set_index('Faixa')['Chamados'][["0%–25%", "90%–100%", "≥ 200%"]].tolist() == [2, 1, 1]
+
+
+def test_contar_intervalos_igual_a_contagem_direta():
+    rng = np.random.default_rng(8)
+    inicios = rng.uniform(0, 1000, 500)
+    fins = inicios + rng.uniform(0, 300, 500)
+    inicios[::23] = np.nan
+    fins[::7] = np.nan # Ainda aberto
+    instantes = np.concatenate((rng.uniform(-50, 1400, 200), inicios[1:20], fins[1:20]))
+    fins_abertos = np.where(np.isnan(fins), np.inf, fins)
+    esperado = [np.count_nonzero((inicios <= t) & (t < fins_abertos)) for t in instantes]
+    assert envelhecimento.contar_intervalos(inicios, fins, instantes).tolist() == esperado
+
+
+def test_curva_backlog_igual_a_contagem_direta(df_sla):
+    curva = envelhecimento.curva_backlog(df_sla, AGORA - pd.Timedelta(hours=80), AGORA, '30min')
+    assert list(curva.columns) == ['Instante'] + envelhecimento.ETAPAS_BACKLOG
+
+    abertura = para_epoch(df_sla[config.COLUNA_ABERTURA])
+    encaminhamento = para_epoch(df_sla[config.COLUNA_ENCAMINHAMENTO])
+    agendamento = para_epoch(df_sla[config.COLUNA_AGENDAMENTO])
+    prazo = para_epoch(df_sla['SLA_Prazo'])
+    sem_agendamento_ate = lambda t: np.isnan(agendamento) | (agendamento > t)
+    for _, linha in curva.iloc[::7].iterrows():
+        t = para_epoch([linha['Instante']])[0]
+        encaminhado = ~np.isnan(encaminhamento) & (encaminhamento <= t) | ~sem_agendamento_ate(t)
+        assert linha[envelhecimento.ETAPA_ABERTO] == np.count_nonzero((abertura <= t) & ~encaminhado)
+        assert linha[envelhecimento.ETAPA_ENCAMINHADO] == np.count_nonzero(encaminhado & sem_agendamento_ate(t))
+        assert linha[envelhecimento.ETAPA_AGENDADO] == np.count_nonzero(~sem_agendamento_ate(t))
+        assert linha[envelhecimento.ETAPA_ESTOURADO] == np.count_nonzero((prazo <= t) & sem_agendamento_ate(t))
+
+
+def test_curva_backlog_limita_os_pontos(df_sla):
+    curva = envelhecimento.curva_backlog(df_sla, pd.Timestamp("1990-01-01"), AGORA, '1h')
+    assert len(curva) == envelhecimento.MAX_PONTOS_BACKLOG
+    assert curva['Instante'].iloc[-1] == AGORA.floor('1h')
+
+
+def test_curva_backlog_sem_inicio_ignora_data_absurda(df_sla):
+    df = df_sla.copy()
+    df.loc[0, config.COLUNA_ABERTURA] = pd.Timestamp("1900-01-01")
+    curva = envelhecimento.curva_backlog(df, fim=AGORA)
+    assert curva['Instante'].iloc[0] >= df[config.COLUNA_ABERTURA].iloc[1:].min().floor('1h')
@@ -0,0 +1,46 @@
+import numpy as np
+
+import config
+import dados
+from filtros import IndiceFiltros
+
+from conftest import exportacao
+
+
+def test_mascara_igual_ao_isin(df_processado):
+    indice = IndiceFiltros(df_processado)
+    selecionados = ["Osasco", "Guarulhos", "Inexistente"]
+    esperado = df_processado[config.COLUNA_CIDADE].isin(selecionados).to_numpy()
+    np.testing.assert_array_equal(indice.mascara(config.COLUNA_CIDADE, selecionados), esperado)
+
+
+def test_opcoes_sem_vazios_e_dentro_da_mascara(df_processado):
+    indice = IndiceFiltros(df_processado)
+    tecnicos = df_processado[config.COLUNA_TECNICO]
+    assert indice.opcoes(config.COLUNA_TECNICO) == sorted(tecnicos.dropna().unique())
+
+    mascara = indice.mascara(config.COLUNA_CIDADE, ["Osasco"])
+    assert indice.opcoes(config.COLUNA_TECNICO, mascara) == sorted(tecnicos[mascara].dropna().unique())
+
+
+def test_mascara_ids(df_processado):
+    indice = IndiceFiltros(df_processado)
+    ids = df_processado[config.COLUNA_ID_CLIENTE].astype(str)
+    mascara = indice.mascara_ids(np.array([ids.iloc[2], ids.iloc[7], "nao existe"], dtype=object))
+    assert np.flatnonzero(mascara).tolist() == [2, 7]
+
+
+def test_indice_derivado_igual_ao_montado_do_zero(df_processado):
+    novo = exportacao(n=30, semente=1)
+    novo[config.COLUNA_ID_CLIENTE] = np.arange(1060, 1090) # 20 já existem, 10 são novos
+    novo[config.COLUNA_CIDADE] = "Barueri"                  # Cidade nova
+    df_mesclado, origem, _ = dados.mesclar_datasets(df_processado, dados.processar_dataframe(novo), dados.MODO_COMPLETO)
+
+    derivado = IndiceFiltros(df_processado).derivar(df_mesclado, origem)
+    do_zero = IndiceFiltros(df_mesclado)
+    for col in do_zero.colunas:
+        np.testing.assert_array_equal(derivado.colunas[col][0], do_zero.colunas[col][0])
+        assert derivado.opcoes(col) == do_zero.opcoes(col)
+        for valor in do_zero.opcoes(col):
+            np.testing.assert_array_equal(derivado.mascara(col, [valor]), do_zero.mascara(col, [valor]))
+    assert derivado.ids.equals(do_zero.ids)
@@ -0,0 +1,40 @@
+import pytest
+
+from gazetteer import PRECISAO_BAIRRO, PRECISAO_MUNICIPIO, carregar_gazetteer
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    caminho = tmp_path / "gazetteer.csv"
+    caminho.write_text(
+        "cidade,uf,bairro,latitude,longitude\n"
+        "São Paulo,SP,,-23.55,-46.63\n"
+        "São Paulo,SP,Jardim América,-23.57,-46.67\n"
+        "Osasco,SP,Centro,-23.53,-46.79\n"
+        "Osasco,SP,Vila Yara,-23.55,-46.77\n",
+        encoding="utf-8",
+    )
+    return carregar_gazetteer(str(caminho))
+
+
+def test_bairro_canonizado(gazetteer):
+    assert gazetteer.localizar("SAO PAULO", "sp", "Jd. América") == (-23.57, -46.67, PRECISAO_BAIRRO)
+
+
+def test_municipio_quando_bairro_nao_existe(gazetteer):
+    assert gazetteer.localizar("São Paulo", "SP", "Bairro Novo") == (-23.55, -46.63, PRECISAO_MUNICIPIO)
+
+
+def test_municipio_sem_linha_propria_usa_media_dos_bairros(gazetteer):
+    lat, lon, precisao = gazetteer.localizar("Osasco", "SP")
+    assert precisao == PRECISAO_MUNICIPIO
+    assert lat == pytest.approx(-23.54) and lon == pytest.approx(-46.78)
+
+
+def test_nao_encontrado(gazetteer):
+    assert gazetteer.localizar("Campinas", "SP", "Centro") == (None, None, None)
+
+
+def test_sem_arquivo():
+    assert carregar_gazetteer("") is None
+    assert carregar_gazetteer("nao_existe.csv") is None
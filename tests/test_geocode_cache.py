@@ -0,0 +1,26 @@
+import time
+
+from geocode_cache import CacheGeocode
+
+
+def test_grava_e_busca_pela_chave_normalizada(tmp_path):
+    cache = CacheGeocode(str(tmp_path / "cache.sqlite"))
+    assert cache.buscar("Rua A, 10") == (False, (None, None))
+    cache.gravar("Rua A, 10", -23.5, -46.6)
+    assert cache.buscar("  RUA a ,10 ") == (True, (-23.5, -46.6))
+    assert cache.taxa_acerto() == 0.5
+    cache.fechar()
+
+    reaberto = CacheGeocode(str(tmp_path / "cache.sqlite"))
+    assert reaberto.buscar("rua a, 10") == (True, (-23.5, -46.6))
+    reaberto.fechar()
+
+
+def test_falha_vale_ate_o_ttl(tmp_path):
+    cache = CacheGeocode(str(tmp_path / "cache.sqlite"), ttl_falha=60)
+    cache.gravar("Endereço inexistente", None, None)
+    assert cache.buscar("endereco inexistente") == (True, (None, None))
+
+    cache.conexao.execute("UPDATE enderecos SET atualizado_em = ?", (time.time() - 120,))
+    assert cache.buscar("endereco inexistente") == (False, (None, None))
+    cache.fechar()
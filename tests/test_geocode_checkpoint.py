@@ -0,0 +1,33 @@
+import os
+
+from geocode_checkpoint import CheckpointGeocode, caminho_checkpoint
+
+
+def test_caminho_depende_do_conteudo_e_da_saida(tmp_path):
+    a, b, c = tmp_path / "a.xlsx", tmp_path / "b.xlsx", tmp_path / "c.xlsx"
+    a.write_bytes(b"mesmo conteudo")
+    b.write_bytes(b"mesmo conteudo")
+    c.write_bytes(b"outro conteudo")
+    pasta = str(tmp_path / "ck")
+    assert caminho_checkpoint(str(a), "saida.xlsx", pasta) == caminho_checkpoint(str(b), "saida.xlsx", pasta)
+    assert caminho_checkpoint(str(a), "saida.xlsx", pasta) != caminho_checkpoint(str(c), "saida.xlsx", pasta)
+    assert caminho_checkpoint(str(a), "saida.xlsx", pasta) != caminho_checkpoint(str(a), "outra.xlsx", pasta)
+
+
+def test_retoma_as_linhas_gravadas(tmp_path):
+    caminho = str(tmp_path / "ck" / "execucao.sqlite")
+    checkpoint = CheckpointGeocode(caminho, gravar_a_cada=2)
+    checkpoint.registrar(0, -23.5, -46.6, "endereco")
+    assert CheckpointGeocode(caminho).carregar() == {} # Ainda só em memória
+    checkpoint.registrar(1, None, None, None)
+    checkpoint.registrar(2, -23.6, -46.7, "bairro")
+    checkpoint.fechar() # Grava o que estava pendente
+
+    retomado = CheckpointGeocode(caminho)
+    assert retomado.carregar() == {
+        0: (-23.5, -46.6, "endereco"),
+        1: (None, None, None),
+        2: (-23.6, -46.7, "bairro"),
+    }
+    retomado.concluir()
+    assert not os.path.exists(caminho)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import config
+import rotas
+
+
+def comprimento(ordem, distancias):
+    return sum(distancias[a, b] for a, b in zip(ordem[:-1], ordem[1:]))
+
+
+def test_matriz_haversine():
+    distancias = rotas.matriz_haversine([0.0, 1.0, -23.5], [0.0, 0.0, -46.6])
+    assert distancias[0, 1] == pytest.approx(111.19, abs=0.01)
+    np.testing.assert_allclose(distancias, distancias.T)
+    np.testing.assert_allclose(np.diag(distancias), 0)
+
+
+def test_2opt_nunca_piora_o_vizinho_mais_proximo():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        n = int(rng.integers(3, 25))
+        distancias = rotas.matriz_haversine(rng.uniform(-23.7, -23.4, n), rng.uniform(-46.8, -46.5, n))
+        gulosa = [0] + rotas.vizinho_mais_proximo(distancias, range(1, n), 0)
+        melhorada = rotas.melhorar_2opt(gulosa, distancias)
+        assert melhorada[0] == 0 and sorted(melhorada) == list(range(n))
+        assert comprimento(melhorada, distancias) <= comprimento(gulosa, distancias) + 1e-9
+
+
+def test_ordenar_paradas_por_faixa_de_urgencia():
+    rng = np.random.default_rng(4)
+    n = 15
+    distancias = rotas.matriz_haversine(rng.uniform(-23.7, -23.4, n), rng.uniform(-46.8, -46.5, n))
+    urgencia = rng.integers(0, 3, n)
+    restante = rng.uniform(-3600, 3600, n)
+    ordem = rotas.ordenar_paradas(distancias, urgencia, restante)
+    assert sorted(ordem) == list(range(n))
+    assert np.all(np.diff(urgencia[ordem]) >= 0)
+    mais_urgentes = np.flatnonzero(urgencia == urgencia.min())
+    assert ordem[0] == mais_urgentes[np.argmin(restante[mais_urgentes])]
+
+
+def test_planejar_rotas(df_sla):
+    paradas, resumo = rotas.planejar_rotas(df_sla, df_sla['SLA_Prazo'].min())
+    validos = df_sla[config.COLUNA_TECNICO].notna()
+    assert sorted(paradas.index) == sorted(df_sla.index[validos])
+    assert resumo['Paradas'].sum() == validos.sum()
+
+    for tecnico, rota in paradas.groupby(config.COLUNA_TECNICO, observed=True):
+        assert rota['Ordem_Rota'].tolist() == list(range(1, len(rota) + 1))
+        assert rota['Distancia_Acumulada_Km'].is_monotonic_increasing
+        assert rota['Chegada_Prevista'].is_monotonic_increasing
+        assert np.all(np.diff(rotas.urgencia_sla(df_sla.loc[rota.index])) >= 0)
+        assert resumo.loc[tecnico, 'Distancia_Total_Km'] == pytest.approx(rota['Distancia_Acumulada_Km'].iloc[-1])
+        assert resumo.loc[tecnico, 'Paradas_Apos_Prazo'] == rota['Chega_Apos_Prazo'].sum()
+    assert (paradas['Chega_Apos_Prazo'] == (paradas['Folga_SLA_Segundos'] < 0)).all()
+
+
+def test_planejar_rotas_sem_tecnicos(df_sla):
+    paradas, resumo = rotas.planejar_rotas(df_sla.drop(columns=config.COLUNA_TECNICO))
+    assert paradas.empty and resumo.empty
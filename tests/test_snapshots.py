@@ -0,0 +1,49 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import dados
+import snapshots
+
+from conftest import exportacao
+
+pytest.importorskip("pyarrow")
+
+
+def test_snapshot_devolve_exatamente_o_dataframe_processado(tmp_path):
+    bruto = exportacao()
+    # Coluna de tipos misturados (número e "S/N"): precisa virar texto para caber no formato colunar
+    bruto["Numero"] = [10, "S/N"] * (len(bruto) // 2)
+    bruto.loc[3, "Numero"] = None
+    bruto.loc[5, "Nome Cliente"] = None
+    try:
+        dados.config.COLUNAS_EXTRAS.append("Numero")
+        df = dados.processar_dataframe(bruto)
+    finally:
+        dados.config.COLUNAS_EXTRAS.remove("Numero")
+
+    assert snapshots.salvar_snapshot("chave", df, str(tmp_path))
+    lido = snapshots.carregar_snapshot("chave", str(tmp_path))
+    pd.testing.assert_frame_equal(lido, df)
+    assert lido.attrs["memoria_original_bytes"] == df.attrs["memoria_original_bytes"]
+    assert not [nome for nome in os.listdir(tmp_path) if nome.endswith(".tmp")]
+
+
+def test_snapshot_inexistente_ou_corrompido(tmp_path):
+    assert snapshots.carregar_snapshot("nada", str(tmp_path)) is None
+    (tmp_path / "ruim.arrow").write_bytes(b"nao e arrow")
+    assert snapshots.carregar_snapshot("ruim", str(tmp_path)) is None
+
+
+def test_limpeza_por_idade_tamanho_e_temporarios(tmp_path):
+    agora = time.time()
+    for nome, tamanho, idade in [("velho.arrow", 10, 40 * 24 * 3600), ("antigo.arrow", 100, 300),
+                                 ("recente.arrow", 100, 100), ("parado.1.tmp", 10, 7200), ("gravando.2.tmp", 10, 10)]:
+        caminho = tmp_path / nome
+        caminho.write_bytes(b"x" * tamanho)
+        os.utime(caminho, (agora - idade, agora - idade))
+
+    snapshots.limpar_snapshots(str(tmp_path), max_bytes=150)
+    assert sorted(os.listdir(tmp_path)) == ["gravando.2.tmp", "recente.arrow"]
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from tabelas import buscar, exportar_csv, ordenar
+
+
+def tabela():
+    return pd.DataFrame({
+        'Cidade': pd.Categorical(["São Paulo", "Osasco", None, "SÃO CAETANO"]),
+        'Nome': pd.Series(["Ana", None, "Paulo", "Bia"], dtype=object),
+        'Valor': [3.5, np.nan, 1.0, 2.0],
+    })
+
+
+def test_buscar_em_categorias_e_textos():
+    df = tabela()
+    assert buscar(df, "  paulo ", ['Cidade', 'Nome']).tolist() == [True, False, True, False]
+    assert buscar(df, "são", ['Cidade']).tolist() == [True, False, False, True]
+    assert buscar(df, "", ['Cidade']).all()
+    assert not buscar(df, "ana", ['Inexistente']).any()
+
+
+def test_ordenar_vazios_no_fim_e_estavel():
+    df = tabela()
+    posicoes = np.array([0, 1, 2, 3])
+    assert ordenar(df, posicoes, 'Valor').tolist() == [2, 3, 0, 1]
+    assert ordenar(df, posicoes, 'Valor', crescente=False).tolist() == [0, 3, 2, 1]
+    assert ordenar(df, np.array([3, 1]), 'Nome').tolist() == [3, 1]
+
+
+def test_exportar_csv_no_padrao_do_excel():
+    csv = exportar_csv(pd.DataFrame({'Cidade': ["Osasco"], 'Valor': [1.5]}))
+    assert csv == "\ufeffCidade;Valor\nOsasco;1,5\n".encode('utf-8')